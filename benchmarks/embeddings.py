@@ -0,0 +1,48 @@
+"""
+Measures the time to decode a batch of embeddings and the memory the result retains, for each embedding format:
+
+  python benchmarks/embeddings.py --inputs 512 --dimensions 1024
+"""
+
+import time
+import random
+import argparse
+import tracemalloc
+
+from ollama._codec import CODECS, get_codec
+from ollama._embedding import decode_embeddings
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--inputs', type=int, default=512, help='embeddings per response')
+  parser.add_argument('--dimensions', type=int, default=1024, help='dimensions per embedding')
+  args = parser.parse_args()
+
+  embeddings = [[random.uniform(-1, 1) for _ in range(args.dimensions)] for _ in range(args.inputs)]
+  content = get_codec('json').dumps({'model': 'all-minilm', 'embeddings': embeddings})
+  print(f'response {len(content) / 1e6:.1f} MB')
+
+  for name in CODECS:
+    for format in ('list', 'array', 'numpy'):
+      try:
+        codec = get_codec(name)
+        decode_embeddings(b'{"embeddings": [[0]]}', codec.loads, 'embeddings', format)
+      except ImportError:
+        continue
+
+      start = time.perf_counter()
+      decode_embeddings(content, codec.loads, 'embeddings', format)
+      elapsed = time.perf_counter() - start
+
+      tracemalloc.start()
+      response = decode_embeddings(content, codec.loads, 'embeddings', format)
+      retained, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+      del response
+
+      print(f'{name:8} {format:6} {elapsed * 1e3:8.1f} ms  {retained / 1e6:8.1f} MB retained  {peak / 1e6:8.1f} MB peak')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,57 @@
+"""
+Compares HTTP/1.1 and HTTP/2 for many concurrent streaming chat requests.
+
+HTTP/2 is only negotiated over TLS, so point `--host` at a TLS-terminating proxy in front of Ollama:
+
+  python benchmarks/http2.py --host https://ollama.example.com --model llama3.1 --concurrency 256
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+import ollama
+
+
+async def run(host: str, model: str, concurrency: int, requests: int, http2: bool) -> None:
+  client = ollama.AsyncClient(host, http2=http2, limits=httpx.Limits(max_connections=concurrency))
+  semaphore = asyncio.Semaphore(concurrency)
+  first_chunk, total = [], []
+
+  async def one():
+    async with semaphore:
+      start, first = time.perf_counter(), None
+      stream = await client.chat(model, messages=[{'role': 'user', 'content': 'Say hello.'}], stream=True, options={'num_predict': 16})
+      async for _ in stream:
+        first = first or time.perf_counter() - start
+      first_chunk.append(first)
+      total.append(time.perf_counter() - start)
+
+  start = time.perf_counter()
+  await asyncio.gather(*(one() for _ in range(requests)))
+  elapsed = time.perf_counter() - start
+
+  first_chunk.sort()
+  total.sort()
+  print(
+    f'{"HTTP/2  " if http2 else "HTTP/1.1"}',
+    f'{requests / elapsed:8.1f} req/s',
+    f'ttfc p50 {statistics.median(first_chunk) * 1000:8.1f} ms',
+    f'p99 {first_chunk[int(len(first_chunk) * 0.99) - 1] * 1000:8.1f} ms',
+    f'total p99 {total[int(len(total) * 0.99) - 1] * 1000:8.1f} ms',
+  )
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--host', required=True)
+  parser.add_argument('--model', default='llama3.1')
+  parser.add_argument('--concurrency', type=int, default=128)
+  parser.add_argument('--requests', type=int, default=1024)
+  args = parser.parse_args()
+
+  for http2 in (False, True):
+    asyncio.run(run(args.host, args.model, args.concurrency, args.requests, http2))
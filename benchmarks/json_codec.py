@@ -0,0 +1,52 @@
+"""
+Measures the cost of decoding one streamed chunk and encoding one chat request with each installed JSON codec:
+
+  python benchmarks/json_codec.py --number 200000
+"""
+
+import json
+import timeit
+import argparse
+
+from ollama._codec import CODECS, get_codec
+
+CHUNK = json.dumps(
+  {
+    'model': 'llama3.1',
+    'created_at': '2024-07-25T12:00:00.000000000Z',
+    'message': {'role': 'assistant', 'content': ' the'},
+    'done': False,
+  }
+)
+
+REQUEST = {
+  'model': 'llama3.1',
+  'messages': [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': 'Why is the sky blue? ' * 20} for i in range(20)],
+  'tools': [],
+  'stream': True,
+  'format': '',
+  'options': {},
+  'keep_alive': None,
+}
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--number', type=int, default=100000, help='chunks decoded per measurement')
+  args = parser.parse_args()
+
+  line = CHUNK.encode('utf-8')
+  for name in CODECS:
+    try:
+      codec = get_codec(name)
+    except ImportError:
+      print(f'{name:8} not installed')
+      continue
+
+    decode = min(timeit.repeat(lambda codec=codec: codec.loads(line), number=args.number, repeat=5)) / args.number
+    encode = min(timeit.repeat(lambda codec=codec: codec.dumps(REQUEST), number=args.number // 100, repeat=5)) / (args.number // 100)
+    print(f'{name:8} decode {decode * 1e9:8.0f} ns/chunk  encode {encode * 1e6:8.1f} us/request')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,89 @@
+"""
+Measures streaming throughput on a synthetic multi-megabyte `/api/generate` stream served by a mock transport.
+
+Compares the byte-level NDJSON decoder with the previous line-based decoding for each installed JSON codec:
+
+  python benchmarks/ndjson.py --size 16 --read 4096
+"""
+
+import json
+import time
+import argparse
+
+import httpx
+
+from ollama import Client
+from ollama._codec import CODECS, get_codec
+from ollama._stream import NDJSONDecoder
+
+CHUNK = {
+  'model': 'llama3.1',
+  'created_at': '2024-07-25T12:00:00.000000000Z',
+  'response': ' the',
+  'done': False,
+}
+
+
+def payload(size: int) -> bytes:
+  line = json.dumps(CHUNK).encode('utf-8') + b'\n'
+  return line * (size * 1024 * 1024 // len(line))
+
+
+def transport(data: bytes, read: int) -> httpx.MockTransport:
+  def handler(_: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=(data[i : i + read] for i in range(0, len(data), read)))
+
+  return httpx.MockTransport(handler)
+
+
+def lines(client: Client, codec) -> int:
+  "Decodes the stream the way the client did before, one str line at a time."
+  n = 0
+  with client._client.stream('POST', '/api/generate', json={}) as r:
+    for line in r.iter_lines():
+      partial = codec.loads(line)
+      if partial.get('error'):
+        raise RuntimeError(partial['error'])
+      n += 1
+  return n
+
+
+def decoder(client: Client, codec) -> int:
+  n = 0
+  with client._client.stream('POST', '/api/generate', json={}) as r:
+    decoder = NDJSONDecoder(codec.loads)
+    for chunk in r.iter_bytes():
+      for _ in decoder.decode(chunk):
+        n += 1
+  return n
+
+
+def generate(client: Client, _) -> int:
+  "Decodes the stream through `Client.generate`."
+  return sum(1 for _ in client.generate('llama3.1', 'Why is the sky blue?', stream=True))
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--size', type=int, default=16, help='stream size in MiB')
+  parser.add_argument('--read', type=int, default=4096, help='bytes per network read')
+  args = parser.parse_args()
+
+  data = payload(args.size)
+  for name in CODECS:
+    try:
+      codec = get_codec(name)
+    except ImportError:
+      print(f'{name:8} not installed')
+      continue
+
+    for method in (lines, decoder, generate):
+      client = Client(transport=transport(data, args.read), json_codec=codec)
+      start = time.perf_counter()
+      n = method(client, codec)
+      elapsed = time.perf_counter() - start
+      print(f'{name:8} {method.__name__:8} {len(data) / elapsed / 2**20:8.1f} MiB/s {n / elapsed:12.0f} chunks/s')
+
+
+if __name__ == '__main__':
+  main()
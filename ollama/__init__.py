@@ -1,4 +1,6 @@
-from ollama._client import Client, AsyncClient
+import threading
+from typing import TYPE_CHECKING
+
 from ollama._types import (
   GenerateResponse,
   ChatResponse,
@@ -9,9 +11,43 @@ from ollama._types import (
   ResponseError,
 )
 
+if TYPE_CHECKING:
+  from ollama._client import Client, AsyncClient
+  from ollama._pool import HedgePolicy, CircuitBreaker
+  from ollama._retry import RetryPolicy
+  from ollama._compression import CompressionPolicy
+  from ollama._codec import JSONCodec
+  from ollama._stream import Stream, AsyncStream, StreamAccumulator
+  from ollama._broadcast import Broadcast
+  from ollama._metrics import ServerStats, StreamLatency
+  from ollama._corpus import EmbeddingFile
+  from ollama._cache import EmbeddingCache
+  from ollama._coalesce import EmbedCoalescer, AsyncEmbedCoalescer
+  from ollama._stop import StopCondition, StopOnRegex, StopOnLength, StopOnJSON, StopUnless
+
 __all__ = [
   'Client',
   'AsyncClient',
+  'RetryPolicy',
+  'HedgePolicy',
+  'CircuitBreaker',
+  'CompressionPolicy',
+  'JSONCodec',
+  'Stream',
+  'AsyncStream',
+  'StreamAccumulator',
+  'Broadcast',
+  'StreamLatency',
+  'ServerStats',
+  'EmbeddingFile',
+  'EmbeddingCache',
+  'EmbedCoalescer',
+  'AsyncEmbedCoalescer',
+  'StopCondition',
+  'StopOnRegex',
+  'StopOnLength',
+  'StopOnJSON',
+  'StopUnless',
   'GenerateResponse',
   'ChatResponse',
   'ProgressResponse',
@@ -31,19 +67,64 @@ __all__ = [
   'copy',
   'show',
   'ps',
+  'warmup',
+  'embed_corpus',
 ]
 
-_client = Client()
-
-generate = _client.generate
-chat = _client.chat
-embed = _client.embed
-embeddings = _client.embeddings
-pull = _client.pull
-push = _client.push
-create = _client.create
-delete = _client.delete
-list = _client.list
-copy = _client.copy
-show = _client.show
-ps = _client.ps
+# the client modules import httpx, so they are only loaded on first use
+_lazy = {
+  'Client': 'ollama._client',
+  'AsyncClient': 'ollama._client',
+  'RetryPolicy': 'ollama._retry',
+  'HedgePolicy': 'ollama._pool',
+  'CircuitBreaker': 'ollama._pool',
+  'CompressionPolicy': 'ollama._compression',
+  'JSONCodec': 'ollama._codec',
+  'Stream': 'ollama._stream',
+  'AsyncStream': 'ollama._stream',
+  'StreamAccumulator': 'ollama._stream',
+  'Broadcast': 'ollama._broadcast',
+  'StreamLatency': 'ollama._metrics',
+  'ServerStats': 'ollama._metrics',
+  'EmbeddingFile': 'ollama._corpus',
+  'EmbeddingCache': 'ollama._cache',
+  'EmbedCoalescer': 'ollama._coalesce',
+  'AsyncEmbedCoalescer': 'ollama._coalesce',
+  'StopCondition': 'ollama._stop',
+  'StopOnRegex': 'ollama._stop',
+  'StopOnLength': 'ollama._stop',
+  'StopOnJSON': 'ollama._stop',
+  'StopUnless': 'ollama._stop',
+}
+
+# not `_client`, which is shadowed by the ollama._client submodule once it is imported
+_default = None
+_default_lock = threading.Lock()
+
+
+def _default_client() -> 'Client':
+  global _default
+  with _default_lock:
+    if _default is None:
+      from ollama._client import Client
+
+      _default = Client()
+    return _default
+
+
+def __getattr__(name: str):
+  if name in _lazy:
+    import importlib
+
+    value = getattr(importlib.import_module(_lazy[name]), name)
+  elif name in __all__:
+    value = getattr(_default_client(), name)
+  else:
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,147 @@
+import asyncio
+from concurrent import futures
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, Mapping, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+
+Requests = Union[Iterable[Mapping[str, Any]], AsyncIterable[Mapping[str, Any]]]
+
+
+async def _aiter(requests: Requests) -> AsyncIterator[Mapping[str, Any]]:
+  if isinstance(requests, AsyncIterable):
+    async for request in requests:
+      yield request
+  else:
+    for request in requests:
+      yield request
+
+
+async def _amap(
+  fn: Callable[..., Awaitable[T]],
+  requests: Requests,
+  concurrency: int,
+  ordered: bool,
+  return_exceptions: bool,
+) -> AsyncIterator[Tuple[int, Union[T, BaseException]]]:
+  """
+  Calls `fn(**request)` for every request, with at most `concurrency` calls running at once, and
+  yields `(index, result)` pairs, where `index` is the position of the request in `requests`.
+
+  Requests are read lazily, so `requests` may be an unbounded iterator. Results are yielded as
+  they complete, or in the order of `requests` if `ordered`. In that case completed results wait
+  for the earlier ones and count towards `concurrency`, so at most `concurrency` results are held
+  at any time.
+
+  The first exception is raised after cancelling the calls still running, unless
+  `return_exceptions`, in which case it is yielded as the result of its request.
+  """
+  if concurrency < 1:
+    raise ValueError('concurrency must be at least 1')
+
+  requests = _aiter(requests)
+  running: Dict[asyncio.Future, int] = {}
+  completed: Dict[int, Union[T, BaseException]] = {}
+  submitted = 0
+  yielded = 0
+  exhausted = False
+
+  try:
+    while True:
+      while not exhausted and len(running) + len(completed) < concurrency:
+        try:
+          request = await requests.__anext__()
+        except StopAsyncIteration:
+          exhausted = True
+          break
+
+        running[asyncio.ensure_future(fn(**request))] = submitted
+        submitted += 1
+
+      while yielded in completed:
+        yield yielded, completed.pop(yielded)
+        yielded += 1
+
+      if not running:
+        if exhausted and not completed:
+          return
+        continue
+
+      done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+      for future in sorted(done, key=running.__getitem__):
+        index = running.pop(future)
+        try:
+          result = future.result()
+        except Exception as e:
+          if not return_exceptions:
+            raise
+          result = e
+
+        if ordered:
+          completed[index] = result
+        else:
+          yield index, result
+  finally:
+    for future in running:
+      future.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    await requests.aclose()
+
+
+def _map(
+  fn: Callable[..., T],
+  requests: Iterable[Mapping[str, Any]],
+  concurrency: int,
+  ordered: bool,
+  return_exceptions: bool,
+) -> Iterator[Tuple[int, Union[T, BaseException]]]:
+  """
+  Calls `fn(**request)` for every request on a pool of `concurrency` threads. See `_amap`.
+
+  Calls that are running when an exception is raised, or when the iterator is closed, cannot be
+  cancelled and are waited for.
+  """
+  if concurrency < 1:
+    raise ValueError('concurrency must be at least 1')
+
+  requests = iter(requests)
+  running: Dict[futures.Future, int] = {}
+  completed: Dict[int, Union[T, BaseException]] = {}
+  submitted = 0
+  yielded = 0
+  exhausted = False
+
+  with futures.ThreadPoolExecutor(concurrency, thread_name_prefix='ollama') as executor:
+    while True:
+      while not exhausted and len(running) + len(completed) < concurrency:
+        try:
+          request = next(requests)
+        except StopIteration:
+          exhausted = True
+          break
+
+        running[executor.submit(fn, **request)] = submitted
+        submitted += 1
+
+      while yielded in completed:
+        yield yielded, completed.pop(yielded)
+        yielded += 1
+
+      if not running:
+        if exhausted and not completed:
+          return
+        continue
+
+      done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+      for future in sorted(done, key=running.__getitem__):
+        index = running.pop(future)
+        try:
+          result = future.result()
+        except Exception as e:
+          if not return_exceptions:
+            raise
+          result = e
+
+        if ordered:
+          completed[index] = result
+        else:
+          yield index, result
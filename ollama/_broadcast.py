@@ -0,0 +1,205 @@
+import time
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Callable, List, Literal, Mapping, Optional, Union
+
+from ollama._stream import StreamAccumulator
+
+Overflow = Literal['block', 'drop_oldest', 'coalesce']
+
+
+class Subscriber(AsyncIterator[Mapping[str, Any]]):
+  """
+  One consumer of a `Broadcast`, with its own bounded queue of parts.
+  """
+
+  def __init__(self, broadcast: 'Broadcast', maxsize: int, overflow: Overflow) -> None:
+    if maxsize < 1:
+      raise ValueError('maxsize must be at least 1')
+    if overflow not in ('block', 'drop_oldest', 'coalesce'):
+      raise ValueError(f'unknown overflow policy: {overflow}')
+
+    self.maxsize = maxsize
+    'Maximum number of parts queued for this consumer.'
+
+    self.overflow = overflow
+    """
+    What happens to a new part when the queue is full:
+
+    - `block`: wait until the consumer catches up, slowing down every consumer and the stream itself
+    - `drop_oldest`: discard the oldest queued part
+    - `coalesce`: merge the part into the newest queued one, joining their text
+    """
+
+    self.delivered = 0
+    'Number of parts handed to the consumer.'
+
+    self.dropped = 0
+    'Number of parts discarded by the `drop_oldest` policy.'
+
+    self.coalesced = 0
+    'Number of parts merged into another by the `coalesce` policy.'
+
+    self.max_lag = 0
+    'Largest number of parts that were queued at once.'
+
+    self._broadcast = broadcast
+    self._queue: deque = deque()
+    self._readable = asyncio.Event()
+    self._writable = asyncio.Event()
+    self._writable.set()
+    self._error: Optional[BaseException] = None
+    self._done = False
+    self._detached = False
+
+  @property
+  def lag(self) -> int:
+    "Number of parts queued and not yet consumed."
+    return len(self._queue)
+
+  @property
+  def lag_seconds(self) -> float:
+    "Time the oldest queued part has been waiting, in seconds."
+    return time.monotonic() - self._queue[0][0] if self._queue else 0.0
+
+  def __aiter__(self) -> 'Subscriber':
+    return self
+
+  async def __anext__(self) -> Mapping[str, Any]:
+    if self._detached:
+      raise StopAsyncIteration
+
+    self._broadcast._start()
+    while not self._queue:
+      if self._done:
+        if self._error:
+          raise self._error
+        raise StopAsyncIteration
+      self._readable.clear()
+      await self._readable.wait()
+
+    _, part = self._queue.popleft()
+    self._writable.set()
+    self.delivered += 1
+    if isinstance(part, StreamAccumulator):
+      part = part.result()
+      return self._broadcast._hook(part) if self._broadcast._hook else part
+    return part
+
+  async def aclose(self) -> None:
+    "Stops consuming. The broadcast no longer waits for or queues parts for this consumer."
+    self._detached = True
+    self._queue.clear()
+    self._writable.set()
+    await self._broadcast._detached()
+
+  async def _put(self, part: Mapping[str, Any]) -> None:
+    if self._detached:
+      return
+
+    if len(self._queue) >= self.maxsize:
+      if self.overflow == 'block':
+        while len(self._queue) >= self.maxsize and not self._detached:
+          self._writable.clear()
+          await self._writable.wait()
+        if self._detached:
+          return
+      elif self.overflow == 'drop_oldest':
+        self._queue.popleft()
+        self.dropped += 1
+      else:
+        self._coalesce(part)
+        return
+
+    self._queue.append((time.monotonic(), part))
+    self.max_lag = max(self.max_lag, len(self._queue))
+    self._readable.set()
+
+  def _coalesce(self, part: Mapping[str, Any]) -> None:
+    queued_at, newest = self._queue[-1]
+    if not isinstance(newest, StreamAccumulator):
+      accumulator = StreamAccumulator()
+      accumulator.add(newest)
+      self._queue[-1] = (queued_at, accumulator)
+      newest = accumulator
+    newest.add(part)
+    self.coalesced += 1
+
+  def _close(self, error: Optional[BaseException]) -> None:
+    self._done = True
+    self._error = error
+    self._readable.set()
+
+
+class Broadcast:
+  """
+  Fans the parts of an asynchronous stream out to several consumers.
+
+  Every consumer created with `subscribe()` receives every part through its own bounded queue, and
+  its overflow policy decides what happens when it falls behind. The stream is read as soon as any
+  consumer starts iterating, so all consumers must subscribe before that. An error raised by the
+  stream is raised by every consumer after the parts queued before it.
+  """
+
+  def __init__(self, stream: AsyncIterator[Mapping[str, Any]], maxsize: int = 64, overflow: Overflow = 'block') -> None:
+    self.maxsize = maxsize
+    'Default queue size of consumers.'
+
+    self.overflow: Overflow = overflow
+    'Default overflow policy of consumers.'
+
+    self._stream = stream
+    self._hook: Optional[Callable[[Any], Any]] = getattr(stream, '_hook', None)
+    self._subscribers: List[Subscriber] = []
+    self._task: Optional[asyncio.Future] = None
+
+  @property
+  def subscribers(self) -> List[Subscriber]:
+    return list(self._subscribers)
+
+  def subscribe(self, maxsize: Optional[int] = None, overflow: Optional[Overflow] = None) -> Subscriber:
+    if self._task:
+      raise RuntimeError('cannot subscribe to a broadcast that has started')
+
+    subscriber = Subscriber(self, self.maxsize if maxsize is None else maxsize, overflow or self.overflow)
+    self._subscribers.append(subscriber)
+    return subscriber
+
+  async def aclose(self) -> None:
+    "Stops reading the stream and ends every consumer."
+    if self._task:
+      self._task.cancel()
+      await asyncio.gather(self._task, return_exceptions=True)
+    else:
+      await self._aclose_stream()
+      for subscriber in self._subscribers:
+        subscriber._close(None)
+
+  def _start(self) -> None:
+    if not self._task:
+      self._task = asyncio.ensure_future(self._pump())
+
+  async def _pump(self) -> None:
+    error: Union[BaseException, None] = None
+    try:
+      async for part in self._stream:
+        for subscriber in self._subscribers:
+          await subscriber._put(part)
+        if all(subscriber._detached for subscriber in self._subscribers):
+          break
+    except asyncio.CancelledError:
+      pass
+    except Exception as e:
+      error = e
+    finally:
+      await self._aclose_stream()
+      for subscriber in self._subscribers:
+        subscriber._close(error)
+
+  async def _detached(self) -> None:
+    if all(subscriber._detached for subscriber in self._subscribers):
+      await self.aclose()
+
+  async def _aclose_stream(self) -> None:
+    if aclose := getattr(self._stream, 'aclose', None):
+      await aclose()
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, AnyStr, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ollama._embedding import EmbeddingFormat
+from ollama._types import Options
+
+# SQLite limits the number of parameters of a statement
+_QUERY_SIZE = 500
+
+
+def _pack(embedding: 'array[float]') -> bytes:
+  if sys.byteorder == 'big':
+    embedding = array('f', embedding)
+    embedding.byteswap()
+  return embedding.tobytes()
+
+
+def _unpack(data: bytes) -> 'array[float]':
+  embedding = array('f')
+  embedding.frombytes(data)
+  if sys.byteorder == 'big':
+    embedding.byteswap()
+  return embedding
+
+
+class EmbeddingCache:
+  """
+  Content-addressed cache of the embeddings returned by `embed`, used by clients created with
+  `embedding_cache=cache`. Only the texts that miss the cache are sent to the server.
+
+  Embeddings are keyed by the digest of the model, `truncate`, `options` and the SHA-256 of the
+  text, so that pulling a new version of a model invalidates them. Model digests are looked up
+  with `list()` and refreshed after `digest_ttl` seconds.
+
+  The `max_entries` most recently used embeddings are kept in memory. With a `path`, every
+  embedding is also stored in the SQLite database at `path`, which survives restarts and can be
+  shared by several processes.
+
+  Embeddings are stored as float32, the precision Ollama computes them in. `AsyncClient` reads and
+  writes the database in the default executor, so that it does not block the event loop.
+  """
+
+  def __init__(self, path: Optional[Union[str, 'os.PathLike[str]']] = None, max_entries: int = 10000, digest_ttl: float = 300) -> None:
+    self.max_entries = max_entries
+    'Number of embeddings kept in memory.'
+
+    self.digest_ttl = digest_ttl
+    'Seconds after which model digests are looked up again.'
+
+    self.memory_hits = 0
+    'Number of texts found in memory.'
+
+    self.disk_hits = 0
+    'Number of texts found in the database.'
+
+    self.misses = 0
+    'Number of texts sent to the server.'
+
+    self._lock = threading.Lock()
+    self._memory: 'OrderedDict[bytes, array[float]]' = OrderedDict()
+    self._digests: Dict[str, Tuple[float, str]] = {}
+    self._db: Optional[sqlite3.Connection] = None
+
+    if path is not None:
+      self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+      self._db.execute('PRAGMA journal_mode=WAL')
+      self._db.execute('CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, embedding BLOB NOT NULL) WITHOUT ROWID')
+      self._db.commit()
+
+  @property
+  def hits(self) -> int:
+    return self.memory_hits + self.disk_hits
+
+  @property
+  def hit_rate(self) -> float:
+    "Fraction of texts found in the cache."
+    total = self.hits + self.misses
+    return self.hits / total if total else 0.0
+
+  def clear(self) -> None:
+    "Removes every embedding from memory and from the database."
+    with self._lock:
+      self._memory.clear()
+      if self._db:
+        self._db.execute('DELETE FROM embeddings')
+        self._db.commit()
+
+  def close(self) -> None:
+    "Closes the database."
+    with self._lock:
+      if self._db:
+        self._db.close()
+        self._db = None
+
+  def _digest(self, model: str) -> Optional[str]:
+    digest = self._digests.get(model)
+    if digest and time.monotonic() - digest[0] < self.digest_ttl:
+      return digest[1]
+    return None
+
+  def _update_digests(self, model: str, tags: Mapping[str, Any]) -> str:
+    "Records the digests of the models listed by `list()` and returns that of `model`."
+    now = time.monotonic()
+    for listed in tags.get('models', []):
+      for name in (listed.get('name'), listed.get('model')):
+        if name:
+          self._digests[name] = (now, listed['digest'])
+          if name.endswith(':latest'):
+            self._digests[name[: -len(':latest')]] = (now, listed['digest'])
+
+    # unknown models are cached under their name until the next lookup
+    self._digests.setdefault(model, (now, model))
+    return self._digests[model][1]
+
+  async def _offload(self, fn: Callable[..., Any], *args: Any) -> Any:
+    "Calls `fn` in the default executor if it may use the database."
+    if self._db is None:
+      return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+  def _lookup(self, digest: str, truncate: bool, options: Optional[Options], input: Union[str, Sequence[AnyStr]]) -> '_Lookup':
+    texts = [input] if isinstance(input, (str, bytes)) else list(input)
+
+    prefix = hashlib.sha256(f'{digest}\0{truncate}\0{json.dumps(options or {}, sort_keys=True)}\0'.encode('utf-8'))
+    keys = []
+    for text in texts:
+      key = prefix.copy()
+      key.update(hashlib.sha256(text.encode('utf-8') if isinstance(text, str) else text).digest())
+      keys.append(key.digest())
+
+    return _Lookup(self, keys, texts, self._get(keys))
+
+  def _get(self, keys: List[bytes]) -> 'List[Optional[array[float]]]':
+    with self._lock:
+      embeddings = [self._memory.get(key) for key in keys]
+      for key, embedding in zip(keys, embeddings):
+        if embedding is not None:
+          self._memory.move_to_end(key)
+          self.memory_hits += 1
+
+      missing = list({key for key, embedding in zip(keys, embeddings) if embedding is None})
+      found: Dict[bytes, array] = {}
+      if self._db:
+        for i in range(0, len(missing), _QUERY_SIZE):
+          chunk = missing[i : i + _QUERY_SIZE]
+          rows = self._db.execute(f'SELECT key, embedding FROM embeddings WHERE key IN ({",".join("?" * len(chunk))})', chunk)
+          found.update((key, _unpack(embedding)) for key, embedding in rows)
+
+      for i, key in enumerate(keys):
+        if embeddings[i] is None and key in found:
+          embeddings[i] = found[key]
+          self.disk_hits += 1
+      self._remember(found)
+      return embeddings
+
+  def _put(self, embeddings: 'Dict[bytes, array[float]]') -> None:
+    with self._lock:
+      self._remember(embeddings)
+      if self._db:
+        self._db.executemany('INSERT OR REPLACE INTO embeddings (key, embedding) VALUES (?, ?)', [(key, _pack(embedding)) for key, embedding in embeddings.items()])
+        self._db.commit()
+
+  def _remember(self, embeddings: 'Dict[bytes, array[float]]') -> None:
+    for key, embedding in embeddings.items():
+      self._memory[key] = embedding
+      self._memory.move_to_end(key)
+    while len(self._memory) > self.max_entries:
+      self._memory.popitem(last=False)
+
+
+class _Lookup:
+  "The embeddings of the texts of one `embed` call found in a cache, and the texts to request."
+
+  def __init__(self, cache: EmbeddingCache, keys: List[bytes], texts: List[Any], embeddings: 'List[Optional[array[float]]]') -> None:
+    self.cache = cache
+    self.keys = keys
+    self.embeddings = embeddings
+
+    missing = {key: text for key, text, embedding in zip(keys, texts, embeddings) if embedding is None}
+    self.misses: List[Any] = list(missing.values())
+    'Texts to send to the server, without duplicates.'
+
+    self._missing = list(missing)
+    with cache._lock:
+      cache.misses += len(self.misses)
+
+  def fill(self, embeddings: 'array[float]') -> None:
+    "Stores the embeddings of `misses`, returned by the server as one array, one after the other."
+    dimensions = len(embeddings) // len(self.misses)
+    found = {key: embeddings[i * dimensions : (i + 1) * dimensions] for i, key in enumerate(self._missing)}
+    self.cache._put(found)
+    self.embeddings = [embedding if embedding is not None else found[key] for key, embedding in zip(self.keys, self.embeddings)]
+
+  def response(self, model: str, format: EmbeddingFormat) -> Dict[str, Any]:
+    if format not in ('list', 'array', 'numpy'):
+      raise ValueError(f'unknown embedding format: {format!r}')
+
+    if format == 'list':
+      return {'model': model, 'embeddings': [embedding.tolist() for embedding in self.embeddings]}
+
+    embeddings = array('f')
+    for embedding in self.embeddings:
+      embeddings.extend(embedding)
+
+    if format == 'numpy':
+      import numpy
+
+      return {'model': model, 'embeddings': numpy.frombuffer(embeddings, dtype=numpy.float32).reshape(len(self.embeddings), -1 if self.embeddings else 0)}
+    return {'model': model, 'embeddings': embeddings}
@@ -1,17 +1,18 @@
 import os
 import io
-import json
 import httpx
 import binascii
 import platform
 import urllib.parse
+import functools
 from os import PathLike
 from pathlib import Path
 from copy import deepcopy
+from contextlib import ExitStack, AsyncExitStack
 from hashlib import sha256
 from base64 import b64encode, b64decode
 
-from typing import Any, AnyStr, Union, Optional, Sequence, Mapping, Literal, overload
+from typing import Any, AnyStr, Callable, Dict, Iterable, Type, Union, Optional, Sequence, Mapping, Literal, Tuple, overload
 
 import sys
 
@@ -20,23 +21,69 @@ if sys.version_info < (3, 9):
 else:
   from collections.abc import Iterator, AsyncIterator
 
-from importlib import metadata
+from ollama import _pool
+from ollama._batch import Requests, _amap, _map
+from ollama._cache import EmbeddingCache
+from ollama._codec import JSONCodec, get_codec
+from ollama._compression import CompressionPolicy
+from ollama._corpus import EmbeddingFile, embed_corpus
+from ollama._embedding import EmbeddingFormat, decode_embeddings
+from ollama._stream import NDJSONDecoder, Stream, AsyncStream
+from ollama._stop import StopCondition, _checkers
+from ollama._metrics import ServerStats, StreamLatency
+from ollama._response import CompactResponse, CompactGenerateResponse, CompactChatResponse
+from ollama._retry import RetryPolicy
+from ollama._types import Message, Options, RequestError, ResponseError, Tool
 
-try:
-  __version__ = metadata.version('ollama')
-except metadata.PackageNotFoundError:
-  __version__ = '0.0.0'
 
-from ollama._types import Message, Options, RequestError, ResponseError, Tool
+def __getattr__(name: str):
+  if name == '__version__':
+    return _version()
+  raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+@functools.lru_cache(maxsize=None)
+def _version() -> str:
+  from importlib import metadata
+
+  try:
+    return metadata.version('ollama')
+  except metadata.PackageNotFoundError:
+    return '0.0.0'
+
+
+@functools.lru_cache(maxsize=None)
+def _user_agent() -> str:
+  return f'ollama-python/{_version()} ({platform.machine()} {platform.system().lower()}) Python/{platform.python_version()}'
+
+
+# httpx client arguments that configure the underlying transport rather than the client
+_TRANSPORT_KWARGS = ('verify', 'cert', 'http1', 'http2', 'limits', 'trust_env')
+
+# request extensions marking requests that are safe to retry or hedge
+_IDEMPOTENT = {'idempotent': True}
 
 
 class BaseClient:
   def __init__(
     self,
     client,
-    host: Optional[str] = None,
+    host: Optional[Union[str, Sequence[str], Mapping[str, float]]] = None,
     follow_redirects: bool = True,
     timeout: Any = None,
+    http2: bool = False,
+    max_connections: Optional[int] = 100,
+    max_keepalive_connections: Optional[int] = 100,
+    keepalive_expiry: Optional[float] = 30,
+    retry: Optional[RetryPolicy] = None,
+    hedge: Optional[_pool.HedgePolicy] = None,
+    circuit_breaker: Optional[_pool.CircuitBreaker] = None,
+    compression: Optional[CompressionPolicy] = None,
+    json_codec: Optional[Union[str, JSONCodec]] = None,
+    compact_responses: bool = False,
+    stream_latency: bool = False,
+    stats: Optional[ServerStats] = None,
+    embedding_cache: Optional[EmbeddingCache] = None,
     **kwargs,
   ) -> None:
     """
@@ -45,27 +92,133 @@ class BaseClient:
     - `follow_redirects`: True
     - `timeout`: None
     `kwargs` are passed to the httpx client.
+
+    `http2` enables HTTP/2 for `https` hosts, multiplexing concurrent requests and streams over
+    a small number of connections. It requires the `h2` package (`pip install httpx[http2]`).
+    Plain `http` hosts, including a local Ollama server, always use HTTP/1.1.
+
+    `max_connections`, `max_keepalive_connections` and `keepalive_expiry` size the connection pool
+    of each host. The defaults keep every connection of a burst alive for reuse. An explicit httpx
+    `limits` argument takes precedence.
+
+    `retry` retries idempotent requests (`generate`, `chat`, `embed`, `embeddings`, `list`, `show`
+    and `ps`) that fail with a transport error or a retryable status. Streams are only retried until
+    their first part is received.
+
+    `hedge` sends a duplicate of a slow idempotent request to another host of a multi-host client
+    and uses whichever answers first. It has no effect with a single host.
+
+    `circuit_breaker` takes a failing or wedged host out of rotation until health probes succeed,
+    failing fast while no host is available.
+
+    `compression` compresses large request bodies and negotiates compressed responses for requests
+    that are not streamed, keeping count of the bytes saved.
+
+    `json_codec` serializes request bodies and parses responses. It is a `JSONCodec` or the name of
+    one of `orjson`, `msgspec` and `json`. By default the first of these that is installed is used.
+
+    `compact_responses` makes `generate` and `chat` return read-only mappings that keep their fields
+    in `__slots__`, and that are also readable as attributes, instead of dicts.
+
+    `stream_latency` records client-side timestamps of streamed responses, available as the
+    `latency` attribute of each stream: time to first token, gaps between parts and tokens/s.
+
+    `stats` aggregates the server timings of completed `generate` and `chat` requests per model
+    and host: prompt and generation tokens/s, load times and how often the model was loaded.
+
+    `embedding_cache` is an `EmbeddingCache` in front of `embed`: embeddings of texts that were
+    embedded before with the same model and options are returned from it, and only the other texts
+    are sent to the server. Responses then only have `model` and `embeddings`.
+
+    `host` may also be a sequence of hosts, or a mapping of hosts to relative weights.
+    Requests are then routed to the host with the fewest outstanding requests per unit of weight.
     """
 
     headers = kwargs.pop('headers', {})
     headers['Content-Type'] = 'application/json'
     headers['Accept'] = 'application/json'
-    headers['User-Agent'] = f'ollama-python/{__version__} ({platform.machine()} {platform.system().lower()}) Python/{platform.python_version()}'
+    headers['User-Agent'] = _user_agent()
+
+    self._retry = retry
+    self._compression = compression
+    self._codec = get_codec(json_codec)
+    self._compact_responses = compact_responses
+    self._stream_latency = stream_latency
+    self._stats = stats
+    self._embedding_cache = embedding_cache
+
+    kwargs['http2'] = http2
+    kwargs.setdefault(
+      'limits',
+      httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+      ),
+    )
+
+    if host is None or isinstance(host, str):
+      host = [host or os.getenv('OLLAMA_HOST')]
+
+    weights = host if isinstance(host, Mapping) else dict.fromkeys(host, 1)
+    hosts = [(_parse_host(h), weight) for h, weight in weights.items()]
+
+    self._pool = None
+    if len(hosts) == 1 and not hosts[0][0].startswith('unix://') and not circuit_breaker:
+      base_url = hosts[0][0]
+    else:
+      transport_kwargs = {k: kwargs.pop(k) for k in _TRANSPORT_KWARGS if k in kwargs}
+      routes = [_pool.Host(*self._host_transport(h, **transport_kwargs), weight) for h, weight in hosts]
+      if len(routes) > 1 or circuit_breaker:
+        self._pool = self._pool_transport(routes, hedge=hedge, breaker=circuit_breaker)
+      kwargs['transport'] = self._pool or routes[0].transport
+      base_url = str(routes[0].url)
 
     self._client = client(
-      base_url=_parse_host(host or os.getenv('OLLAMA_HOST')),
+      base_url=base_url,
       follow_redirects=follow_redirects,
       timeout=timeout,
       headers=headers,
       **kwargs,
     )
 
+  def _encode(self, kwargs: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+    """
+    Serializes the `json` argument of a request with the client's codec, compressing it if
+    the client has a compression policy. Arguments that were already encoded are returned unchanged.
+    """
+    if 'json' not in kwargs:
+      return kwargs
+
+    kwargs = dict(kwargs)
+    kwargs['content'] = self._codec.dumps(kwargs.pop('json'))
+    return self._compression._encode(kwargs, stream) if self._compression else kwargs
+
+  def _host_transport(self, host: str, **kwargs) -> Tuple[str, Any]:
+    """
+    Returns the base URL and transport used to reach a parsed host.
+    Unix domain sockets are reached through a `uds` transport at `http://localhost`.
+    """
+    if host.startswith('unix://'):
+      return 'http://localhost', self._http_transport(uds=host[len('unix://') :], **kwargs)
+    return host, self._http_transport(**kwargs)
+
 
 class Client(BaseClient):
-  def __init__(self, host: Optional[str] = None, **kwargs) -> None:
+  _http_transport = httpx.HTTPTransport
+  _pool_transport = _pool.PoolTransport
+
+  def __init__(self, host: Optional[Union[str, Sequence[str], Mapping[str, float]]] = None, **kwargs) -> None:
     super().__init__(httpx.Client, host, **kwargs)
 
-  def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+  def _request(self, method: str, url: str, idempotent: bool = False, **kwargs) -> httpx.Response:
+    kwargs = self._encode(kwargs, stream=False)
+
+    if idempotent:
+      kwargs['extensions'] = _IDEMPOTENT
+      if self._retry:
+        return self._retry.call(lambda: self._request(method, url, **kwargs))
+
     response = self._client.request(method, url, **kwargs)
 
     try:
@@ -73,29 +226,86 @@ class Client(BaseClient):
     except httpx.HTTPStatusError as e:
       raise ResponseError(e.response.text, e.response.status_code) from None
 
+    if self._compression:
+      self._compression._received(response)
+
     return response
 
-  def _stream(self, method: str, url: str, **kwargs) -> Iterator[Mapping[str, Any]]:
+  def _stream(self, method: str, url: str, idempotent: bool = False, hook: Optional[Callable[[Mapping[str, Any]], Any]] = None, latency: Optional[StreamLatency] = None, **kwargs) -> Iterator[Mapping[str, Any]]:
+    kwargs = self._encode(kwargs, stream=True)
+
+    if idempotent:
+      kwargs['extensions'] = _IDEMPOTENT
+
+    def start():
+      parts = self._iter_stream(method, url, hook, latency, **kwargs)
+      try:
+        return next(parts), parts
+      except StopIteration:
+        return None, parts
+
+    # streams are only retried until their first part arrives
+    first, parts = self._retry.call(start) if idempotent and self._retry else start()
+    try:
+      if first is not None:
+        yield first
+      yield from parts
+    finally:
+      parts.close()
+
+  def _iter_stream(self, method: str, url: str, hook: Optional[Callable[[Mapping[str, Any]], Any]] = None, latency: Optional[StreamLatency] = None, **kwargs) -> Iterator[Mapping[str, Any]]:
+    if latency:
+      latency._sent()
+
     with self._client.stream(method, url, **kwargs) as r:
+      if latency:
+        latency._headers()
+
       try:
         r.raise_for_status()
       except httpx.HTTPStatusError as e:
         e.response.read()
         raise ResponseError(e.response.text, e.response.status_code) from None
 
-      for line in r.iter_lines():
-        partial = json.loads(line)
-        if e := partial.get('error'):
-          raise ResponseError(e)
-        yield partial
+      decoder = NDJSONDecoder(self._codec.loads, hook)
+      for chunk in r.iter_bytes():
+        yield from decoder.decode(chunk)
+      yield from decoder.flush()
+
+      if self._stats and decoder.last:
+        self._stats._record(_origin(r.url), decoder.last)
 
   def _request_stream(
     self,
     *args,
     stream: bool = False,
+    response_type: Optional[Type[CompactResponse]] = None,
+    stop: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
     **kwargs,
-  ) -> Union[Mapping[str, Any], Iterator[Mapping[str, Any]]]:
-    return self._stream(*args, **kwargs) if stream else self._request(*args, **kwargs).json()
+  ) -> Union[Mapping[str, Any], Stream]:
+    hook = response_type if self._compact_responses else None
+    if stream:
+      latency = StreamLatency() if self._stream_latency else None
+      return Stream(self._stream(*args, hook=hook, latency=latency, **kwargs), hook, latency, _checkers(stop) if stop else None)
+
+    r = self._request(*args, **kwargs)
+    response = self._codec.loads(r.content)
+    if self._stats:
+      self._stats._record(_origin(r.url), response)
+    return hook(response) if hook else response
+
+  def warmup(self, n_connections: int = 1) -> None:
+    """
+    Opens `n_connections` connections, per host for a multi-host client, and parks them in the
+    connection pool so that subsequent requests skip connection setup.
+
+    Connections beyond `max_keepalive_connections` are closed as soon as they are released.
+    """
+    with ExitStack() as stack:
+      # hold every response open until all connections exist, then drain them back into the pool
+      responses = [stack.enter_context(self._client.stream('HEAD', '/')) for _ in range(n_connections * (len(self._pool.hosts) if self._pool else 1))]
+      for response in responses:
+        response.read()
 
   @overload
   def generate(
@@ -112,6 +322,7 @@ class Client(BaseClient):
     images: Optional[Sequence[AnyStr]] = None,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
   ) -> Mapping[str, Any]: ...
 
   @overload
@@ -129,7 +340,8 @@ class Client(BaseClient):
     images: Optional[Sequence[AnyStr]] = None,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> Iterator[Mapping[str, Any]]: ...
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> Stream: ...
 
   def generate(
     self,
@@ -145,7 +357,8 @@ class Client(BaseClient):
     images: Optional[Sequence[AnyStr]] = None,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> Union[Mapping[str, Any], Iterator[Mapping[str, Any]]]:
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> Union[Mapping[str, Any], Stream]:
     """
     Create a response using the requested model.
 
@@ -153,13 +366,17 @@ class Client(BaseClient):
 
     Raises `ResponseError` if the request could not be fulfilled.
 
-    Returns `GenerateResponse` if `stream` is `False`, otherwise returns a `GenerateResponse` generator.
+    Returns `GenerateResponse` if `stream` is `False`, otherwise returns a `Stream` of `GenerateResponse` parts. `Stream.collect()` joins them into a `GenerateResponse`.
+
+    `stop_conditions` end the stream on the client, as soon as any of them matches, and cancel the request.
+    They are `StopCondition`s, or callables that stop the stream when they return False for a part.
+    Without `stream`, the text generated until then is returned.
     """
 
     if not model:
       raise RequestError('must provide a model')
 
-    return self._request_stream(
+    response = self._request_stream(
       'POST',
       '/api/generate',
       json={
@@ -169,16 +386,21 @@ class Client(BaseClient):
         'system': system,
         'template': template,
         'context': context or [],
-        'stream': stream,
+        'stream': stream or bool(stop_conditions),
         'raw': raw,
         'images': [_encode_image(image) for image in images or []],
         'format': format,
         'options': options or {},
         'keep_alive': keep_alive,
       },
-      stream=stream,
+      stream=stream or bool(stop_conditions),
+      idempotent=True,
+      response_type=CompactGenerateResponse,
+      stop=stop_conditions,
     )
 
+    return response.collect() if stop_conditions and not stream else response
+
   @overload
   def chat(
     self,
@@ -189,6 +411,7 @@ class Client(BaseClient):
     format: Literal['', 'json'] = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
   ) -> Mapping[str, Any]: ...
 
   @overload
@@ -201,7 +424,8 @@ class Client(BaseClient):
     format: Literal['', 'json'] = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> Iterator[Mapping[str, Any]]: ...
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> Stream: ...
 
   def chat(
     self,
@@ -212,7 +436,8 @@ class Client(BaseClient):
     format: Literal['', 'json'] = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> Union[Mapping[str, Any], Iterator[Mapping[str, Any]]]:
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> Union[Mapping[str, Any], Stream]:
     """
     Create a chat response using the requested model.
 
@@ -220,7 +445,11 @@ class Client(BaseClient):
 
     Raises `ResponseError` if the request could not be fulfilled.
 
-    Returns `ChatResponse` if `stream` is `False`, otherwise returns a `ChatResponse` generator.
+    Returns `ChatResponse` if `stream` is `False`, otherwise returns a `Stream` of `ChatResponse` parts. `Stream.collect()` joins them into a `ChatResponse`.
+
+    `stop_conditions` end the stream on the client, as soon as any of them matches, and cancel the request.
+    They are `StopCondition`s, or callables that stop the stream when they return False for a part.
+    Without `stream`, the text generated until then is returned.
     """
 
     if not model:
@@ -232,21 +461,90 @@ class Client(BaseClient):
       if images := message.get('images'):
         message['images'] = [_encode_image(image) for image in images]
 
-    return self._request_stream(
+    response = self._request_stream(
       'POST',
       '/api/chat',
       json={
         'model': model,
         'messages': messages,
         'tools': tools or [],
-        'stream': stream,
+        'stream': stream or bool(stop_conditions),
         'format': format,
         'options': options or {},
         'keep_alive': keep_alive,
       },
-      stream=stream,
+      stream=stream or bool(stop_conditions),
+      idempotent=True,
+      response_type=CompactChatResponse,
+      stop=stop_conditions,
     )
 
+    return response.collect() if stop_conditions and not stream else response
+
+  def map(
+    self,
+    fn: Union[str, Callable[..., Any]],
+    requests: Iterable[Mapping[str, Any]],
+    concurrency: int = 8,
+    ordered: bool = True,
+    return_exceptions: bool = False,
+  ) -> Iterator[Tuple[int, Any]]:
+    """
+    Runs `fn(**request)` for every request on a pool of `concurrency` threads, which share the
+    connection pool of this client. `fn` is a method of the client, such as `'embed'`, or any callable.
+
+    `requests` is an iterable of keyword arguments, read lazily, so it may be larger than memory.
+
+    Returns an iterator of `(index, result)` pairs, where `index` is the position of the request, in
+    the order of `requests` like `Executor.map` or, unless `ordered`, in completion order. At most
+    `concurrency` requests are in flight or waiting to be returned.
+
+    Raises the first error once the requests in flight have finished, unless `return_exceptions`, in
+    which case errors are returned in place of their results.
+
+    Concurrency beyond `max_connections` waits for a connection.
+    """
+    return _map(getattr(self, fn) if isinstance(fn, str) else fn, requests, concurrency, ordered, return_exceptions)
+
+  def generate_many(
+    self,
+    requests: Iterable[Mapping[str, Any]],
+    concurrency: int = 8,
+    ordered: bool = True,
+    return_exceptions: bool = False,
+  ) -> Iterator[Tuple[int, Union[Mapping[str, Any], BaseException]]]:
+    "Runs `generate(**request)` for every request. See `map`."
+    return self.map(self.generate, requests, concurrency, ordered, return_exceptions)
+
+  def chat_many(
+    self,
+    requests: Iterable[Mapping[str, Any]],
+    concurrency: int = 8,
+    ordered: bool = True,
+    return_exceptions: bool = False,
+  ) -> Iterator[Tuple[int, Union[Mapping[str, Any], BaseException]]]:
+    "Runs `chat(**request)` for every request. See `map`."
+    return self.map(self.chat, requests, concurrency, ordered, return_exceptions)
+
+  def embed_corpus(
+    self,
+    model: str,
+    texts: Iterable[str],
+    path: Union[str, PathLike],
+    batch_size: int = 64,
+    concurrency: int = 4,
+    truncate: bool = True,
+    options: Optional[Options] = None,
+    keep_alive: Optional[Union[float, str]] = None,
+  ) -> EmbeddingFile:
+    """
+    Embeds a corpus of texts into the float32 matrix file at `path`, resuming from its checkpoint
+    if it has one. Returns the `EmbeddingFile`.
+
+    See `ollama._corpus.embed_corpus`.
+    """
+    return embed_corpus(self, model, texts, path, batch_size, concurrency, truncate, options, keep_alive)
+
   def embed(
     self,
     model: str = '',
@@ -254,11 +552,37 @@ class Client(BaseClient):
     truncate: bool = True,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    embedding_format: EmbeddingFormat = 'list',
   ) -> Mapping[str, Any]:
+    """
+    Creates embeddings of `input`, a string or a list of strings.
+
+    With `embedding_format='array'`, `embeddings` is a contiguous float32 `array('f')` of every
+    embedding, one after the other, and with `embedding_format='numpy'` a 2-D float32 numpy array
+    with one embedding per row. Neither holds a Python float per number.
+    """
     if not model:
       raise RequestError('must provide a model')
 
-    return self._request(
+    if cache := self._embedding_cache:
+      digest = cache._digest(model) or cache._update_digests(model, self.list())
+      lookup = cache._lookup(digest, truncate, options, input)
+      if lookup.misses:
+        lookup.fill((self._embed(model, lookup.misses, truncate, options, keep_alive, 'array'))['embeddings'])
+      return lookup.response(model, embedding_format)
+
+    return self._embed(model, input, truncate, options, keep_alive, embedding_format)
+
+  def _embed(
+    self,
+    model: str,
+    input: Union[str, Sequence[AnyStr]],
+    truncate: bool,
+    options: Optional[Options],
+    keep_alive: Optional[Union[float, str]],
+    embedding_format: EmbeddingFormat,
+  ) -> Mapping[str, Any]:
+    response = self._request(
       'POST',
       '/api/embed',
       json={
@@ -268,7 +592,10 @@ class Client(BaseClient):
         'options': options or {},
         'keep_alive': keep_alive,
       },
-    ).json()
+      idempotent=True,
+    )
+
+    return decode_embeddings(response.content, self._codec.loads, 'embeddings', embedding_format)
 
   def embeddings(
     self,
@@ -276,8 +603,15 @@ class Client(BaseClient):
     prompt: str = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    embedding_format: EmbeddingFormat = 'list',
   ) -> Mapping[str, Sequence[float]]:
-    return self._request(
+    """
+    Creates the embedding of `prompt` with the legacy `/api/embeddings` endpoint.
+
+    `embedding_format` is `'list'`, `'array'` for a float32 `array('f')`, or `'numpy'` for a 1-D
+    float32 numpy array. See `embed`.
+    """
+    response = self._request(
       'POST',
       '/api/embeddings',
       json={
@@ -286,7 +620,10 @@ class Client(BaseClient):
         'options': options or {},
         'keep_alive': keep_alive,
       },
-    ).json()
+      idempotent=True,
+    )
+
+    return decode_embeddings(response.content, self._codec.loads, 'embedding', embedding_format)
 
   @overload
   def pull(
@@ -461,24 +798,34 @@ class Client(BaseClient):
     return {'status': 'success' if response.status_code == 200 else 'error'}
 
   def list(self) -> Mapping[str, Any]:
-    return self._request('GET', '/api/tags').json()
+    return self._codec.loads(self._request('GET', '/api/tags', idempotent=True).content)
 
   def copy(self, source: str, destination: str) -> Mapping[str, Any]:
     response = self._request('POST', '/api/copy', json={'source': source, 'destination': destination})
     return {'status': 'success' if response.status_code == 200 else 'error'}
 
   def show(self, model: str) -> Mapping[str, Any]:
-    return self._request('POST', '/api/show', json={'name': model}).json()
+    return self._codec.loads(self._request('POST', '/api/show', json={'name': model}, idempotent=True).content)
 
   def ps(self) -> Mapping[str, Any]:
-    return self._request('GET', '/api/ps').json()
+    return self._codec.loads(self._request('GET', '/api/ps', idempotent=True).content)
 
 
 class AsyncClient(BaseClient):
-  def __init__(self, host: Optional[str] = None, **kwargs) -> None:
+  _http_transport = httpx.AsyncHTTPTransport
+  _pool_transport = _pool.AsyncPoolTransport
+
+  def __init__(self, host: Optional[Union[str, Sequence[str], Mapping[str, float]]] = None, **kwargs) -> None:
     super().__init__(httpx.AsyncClient, host, **kwargs)
 
-  async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+  async def _request(self, method: str, url: str, idempotent: bool = False, **kwargs) -> httpx.Response:
+    kwargs = self._encode(kwargs, stream=False)
+
+    if idempotent:
+      kwargs['extensions'] = _IDEMPOTENT
+      if self._retry:
+        return await self._retry.acall(lambda: self._request(method, url, **kwargs))
+
     response = await self._client.request(method, url, **kwargs)
 
     try:
@@ -486,36 +833,92 @@ class AsyncClient(BaseClient):
     except httpx.HTTPStatusError as e:
       raise ResponseError(e.response.text, e.response.status_code) from None
 
+    if self._compression:
+      self._compression._received(response)
+
     return response
 
-  async def _stream(self, method: str, url: str, **kwargs) -> AsyncIterator[Mapping[str, Any]]:
+  async def _stream(self, method: str, url: str, idempotent: bool = False, hook: Optional[Callable[[Mapping[str, Any]], Any]] = None, latency: Optional[StreamLatency] = None, **kwargs) -> AsyncIterator[Mapping[str, Any]]:
+    kwargs = self._encode(kwargs, stream=True)
+
+    if idempotent:
+      kwargs['extensions'] = _IDEMPOTENT
+
+    async def start():
+      parts = self._iter_stream(method, url, hook, latency, **kwargs)
+      try:
+        return await parts.__anext__(), parts
+      except StopAsyncIteration:
+        return None, parts
+
     async def inner():
-      async with self._client.stream(method, url, **kwargs) as r:
-        try:
-          r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-          e.response.read()
-          raise ResponseError(e.response.text, e.response.status_code) from None
-
-        async for line in r.aiter_lines():
-          partial = json.loads(line)
-          if e := partial.get('error'):
-            raise ResponseError(e)
-          yield partial
+      # streams are only retried until their first part arrives
+      first, parts = await self._retry.acall(start) if idempotent and self._retry else await start()
+      try:
+        if first is not None:
+          yield first
+        async for part in parts:
+          yield part
+      finally:
+        await parts.aclose()
 
     return inner()
 
+  async def _iter_stream(self, method: str, url: str, hook: Optional[Callable[[Mapping[str, Any]], Any]] = None, latency: Optional[StreamLatency] = None, **kwargs) -> AsyncIterator[Mapping[str, Any]]:
+    if latency:
+      latency._sent()
+
+    async with self._client.stream(method, url, **kwargs) as r:
+      if latency:
+        latency._headers()
+
+      try:
+        r.raise_for_status()
+      except httpx.HTTPStatusError as e:
+        await e.response.aread()
+        raise ResponseError(e.response.text, e.response.status_code) from None
+
+      decoder = NDJSONDecoder(self._codec.loads, hook)
+      async for chunk in r.aiter_bytes():
+        for part in decoder.decode(chunk):
+          yield part
+      for part in decoder.flush():
+        yield part
+
+      if self._stats and decoder.last:
+        self._stats._record(_origin(r.url), decoder.last)
+
   async def _request_stream(
     self,
     *args,
     stream: bool = False,
+    response_type: Optional[Type[CompactResponse]] = None,
+    stop: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
     **kwargs,
-  ) -> Union[Mapping[str, Any], AsyncIterator[Mapping[str, Any]]]:
+  ) -> Union[Mapping[str, Any], AsyncStream]:
+    hook = response_type if self._compact_responses else None
     if stream:
-      return await self._stream(*args, **kwargs)
+      latency = StreamLatency() if self._stream_latency else None
+      return AsyncStream(await self._stream(*args, hook=hook, latency=latency, **kwargs), hook, latency, _checkers(stop) if stop else None)
+
+    r = await self._request(*args, **kwargs)
+    response = self._codec.loads(r.content)
+    if self._stats:
+      self._stats._record(_origin(r.url), response)
+    return hook(response) if hook else response
+
+  async def warmup(self, n_connections: int = 1) -> None:
+    """
+    Opens `n_connections` connections, per host for a multi-host client, and parks them in the
+    connection pool so that subsequent requests skip connection setup.
 
-    response = await self._request(*args, **kwargs)
-    return response.json()
+    Connections beyond `max_keepalive_connections` are closed as soon as they are released.
+    """
+    async with AsyncExitStack() as stack:
+      # hold every response open until all connections exist, then drain them back into the pool
+      responses = [await stack.enter_async_context(self._client.stream('HEAD', '/')) for _ in range(n_connections * (len(self._pool.hosts) if self._pool else 1))]
+      for response in responses:
+        await response.aread()
 
   @overload
   async def generate(
@@ -532,6 +935,7 @@ class AsyncClient(BaseClient):
     images: Optional[Sequence[AnyStr]] = None,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
   ) -> Mapping[str, Any]: ...
 
   @overload
@@ -549,7 +953,8 @@ class AsyncClient(BaseClient):
     images: Optional[Sequence[AnyStr]] = None,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> AsyncIterator[Mapping[str, Any]]: ...
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> AsyncStream: ...
 
   async def generate(
     self,
@@ -565,7 +970,8 @@ class AsyncClient(BaseClient):
     images: Optional[Sequence[AnyStr]] = None,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> Union[Mapping[str, Any], AsyncIterator[Mapping[str, Any]]]:
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> Union[Mapping[str, Any], AsyncStream]:
     """
     Create a response using the requested model.
 
@@ -573,12 +979,16 @@ class AsyncClient(BaseClient):
 
     Raises `ResponseError` if the request could not be fulfilled.
 
-    Returns `GenerateResponse` if `stream` is `False`, otherwise returns an asynchronous `GenerateResponse` generator.
+    Returns `GenerateResponse` if `stream` is `False`, otherwise returns an `AsyncStream` of `GenerateResponse` parts. `AsyncStream.collect()` joins them into a `GenerateResponse`.
+
+    `stop_conditions` end the stream on the client, as soon as any of them matches, and cancel the request.
+    They are `StopCondition`s, or callables that stop the stream when they return False for a part.
+    Without `stream`, the text generated until then is returned.
     """
     if not model:
       raise RequestError('must provide a model')
 
-    return await self._request_stream(
+    response = await self._request_stream(
       'POST',
       '/api/generate',
       json={
@@ -588,16 +998,21 @@ class AsyncClient(BaseClient):
         'system': system,
         'template': template,
         'context': context or [],
-        'stream': stream,
+        'stream': stream or bool(stop_conditions),
         'raw': raw,
         'images': [_encode_image(image) for image in images or []],
         'format': format,
         'options': options or {},
         'keep_alive': keep_alive,
       },
-      stream=stream,
+      stream=stream or bool(stop_conditions),
+      idempotent=True,
+      response_type=CompactGenerateResponse,
+      stop=stop_conditions,
     )
 
+    return await response.collect() if stop_conditions and not stream else response
+
   @overload
   async def chat(
     self,
@@ -608,6 +1023,7 @@ class AsyncClient(BaseClient):
     format: Literal['', 'json'] = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
   ) -> Mapping[str, Any]: ...
 
   @overload
@@ -620,7 +1036,8 @@ class AsyncClient(BaseClient):
     format: Literal['', 'json'] = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> AsyncIterator[Mapping[str, Any]]: ...
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> AsyncStream: ...
 
   async def chat(
     self,
@@ -631,7 +1048,8 @@ class AsyncClient(BaseClient):
     format: Literal['', 'json'] = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
-  ) -> Union[Mapping[str, Any], AsyncIterator[Mapping[str, Any]]]:
+    stop_conditions: Optional[Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]] = None,
+  ) -> Union[Mapping[str, Any], AsyncStream]:
     """
     Create a chat response using the requested model.
 
@@ -639,7 +1057,11 @@ class AsyncClient(BaseClient):
 
     Raises `ResponseError` if the request could not be fulfilled.
 
-    Returns `ChatResponse` if `stream` is `False`, otherwise returns an asynchronous `ChatResponse` generator.
+    Returns `ChatResponse` if `stream` is `False`, otherwise returns an `AsyncStream` of `ChatResponse` parts. `AsyncStream.collect()` joins them into a `ChatResponse`.
+
+    `stop_conditions` end the stream on the client, as soon as any of them matches, and cancel the request.
+    They are `StopCondition`s, or callables that stop the stream when they return False for a part.
+    Without `stream`, the text generated until then is returned.
     """
     if not model:
       raise RequestError('must provide a model')
@@ -650,21 +1072,61 @@ class AsyncClient(BaseClient):
       if images := message.get('images'):
         message['images'] = [_encode_image(image) for image in images]
 
-    return await self._request_stream(
+    response = await self._request_stream(
       'POST',
       '/api/chat',
       json={
         'model': model,
         'messages': messages,
         'tools': tools or [],
-        'stream': stream,
+        'stream': stream or bool(stop_conditions),
         'format': format,
         'options': options or {},
         'keep_alive': keep_alive,
       },
-      stream=stream,
+      stream=stream or bool(stop_conditions),
+      idempotent=True,
+      response_type=CompactChatResponse,
+      stop=stop_conditions,
     )
 
+    return await response.collect() if stop_conditions and not stream else response
+
+  def generate_many(
+    self,
+    requests: Requests,
+    concurrency: int = 8,
+    ordered: bool = False,
+    return_exceptions: bool = False,
+  ) -> AsyncIterator[Tuple[int, Union[Mapping[str, Any], BaseException]]]:
+    """
+    Runs `generate(**request)` for every request, with at most `concurrency` requests in flight.
+
+    `requests` is an iterable or asynchronous iterable of keyword arguments to `generate`, without
+    `stream`, and is read lazily, so it may be larger than memory.
+
+    Returns an asynchronous iterator of `(index, response)` pairs, where `index` is the position of
+    the request, in completion order or, if `ordered`, in the order of `requests`.
+
+    Raises the first `ResponseError` after cancelling the requests in flight, unless
+    `return_exceptions`, in which case errors are yielded in place of their responses.
+    """
+    return _amap(self.generate, requests, concurrency, ordered, return_exceptions)
+
+  def chat_many(
+    self,
+    requests: Requests,
+    concurrency: int = 8,
+    ordered: bool = False,
+    return_exceptions: bool = False,
+  ) -> AsyncIterator[Tuple[int, Union[Mapping[str, Any], BaseException]]]:
+    """
+    Runs `chat(**request)` for every request, with at most `concurrency` requests in flight.
+
+    See `generate_many`.
+    """
+    return _amap(self.chat, requests, concurrency, ordered, return_exceptions)
+
   async def embed(
     self,
     model: str = '',
@@ -672,10 +1134,36 @@ class AsyncClient(BaseClient):
     truncate: bool = True,
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    embedding_format: EmbeddingFormat = 'list',
   ) -> Mapping[str, Any]:
+    """
+    Creates embeddings of `input`, a string or a list of strings.
+
+    With `embedding_format='array'`, `embeddings` is a contiguous float32 `array('f')` of every
+    embedding, one after the other, and with `embedding_format='numpy'` a 2-D float32 numpy array
+    with one embedding per row. Neither holds a Python float per number.
+    """
     if not model:
       raise RequestError('must provide a model')
 
+    if cache := self._embedding_cache:
+      digest = cache._digest(model) or cache._update_digests(model, await self.list())
+      lookup = await cache._offload(cache._lookup, digest, truncate, options, input)
+      if lookup.misses:
+        await cache._offload(lookup.fill, (await self._embed(model, lookup.misses, truncate, options, keep_alive, 'array'))['embeddings'])
+      return lookup.response(model, embedding_format)
+
+    return await self._embed(model, input, truncate, options, keep_alive, embedding_format)
+
+  async def _embed(
+    self,
+    model: str,
+    input: Union[str, Sequence[AnyStr]],
+    truncate: bool,
+    options: Optional[Options],
+    keep_alive: Optional[Union[float, str]],
+    embedding_format: EmbeddingFormat,
+  ) -> Mapping[str, Any]:
     response = await self._request(
       'POST',
       '/api/embed',
@@ -686,9 +1174,10 @@ class AsyncClient(BaseClient):
         'options': options or {},
         'keep_alive': keep_alive,
       },
+      idempotent=True,
     )
 
-    return response.json()
+    return decode_embeddings(response.content, self._codec.loads, 'embeddings', embedding_format)
 
   async def embeddings(
     self,
@@ -696,7 +1185,14 @@ class AsyncClient(BaseClient):
     prompt: str = '',
     options: Optional[Options] = None,
     keep_alive: Optional[Union[float, str]] = None,
+    embedding_format: EmbeddingFormat = 'list',
   ) -> Mapping[str, Sequence[float]]:
+    """
+    Creates the embedding of `prompt` with the legacy `/api/embeddings` endpoint.
+
+    `embedding_format` is `'list'`, `'array'` for a float32 `array('f')`, or `'numpy'` for a 1-D
+    float32 numpy array. See `embed`.
+    """
     response = await self._request(
       'POST',
       '/api/embeddings',
@@ -706,9 +1202,10 @@ class AsyncClient(BaseClient):
         'options': options or {},
         'keep_alive': keep_alive,
       },
+      idempotent=True,
     )
 
-    return response.json()
+    return decode_embeddings(response.content, self._codec.loads, 'embedding', embedding_format)
 
   @overload
   async def pull(
@@ -890,20 +1387,24 @@ class AsyncClient(BaseClient):
     return {'status': 'success' if response.status_code == 200 else 'error'}
 
   async def list(self) -> Mapping[str, Any]:
-    response = await self._request('GET', '/api/tags')
-    return response.json()
+    response = await self._request('GET', '/api/tags', idempotent=True)
+    return self._codec.loads(response.content)
 
   async def copy(self, source: str, destination: str) -> Mapping[str, Any]:
     response = await self._request('POST', '/api/copy', json={'source': source, 'destination': destination})
     return {'status': 'success' if response.status_code == 200 else 'error'}
 
   async def show(self, model: str) -> Mapping[str, Any]:
-    response = await self._request('POST', '/api/show', json={'name': model})
-    return response.json()
+    response = await self._request('POST', '/api/show', json={'name': model}, idempotent=True)
+    return self._codec.loads(response.content)
 
   async def ps(self) -> Mapping[str, Any]:
-    response = await self._request('GET', '/api/ps')
-    return response.json()
+    response = await self._request('GET', '/api/ps', idempotent=True)
+    return self._codec.loads(response.content)
+
+
+def _origin(url: httpx.URL) -> str:
+  return f'{url.scheme}://{url.netloc.decode("ascii")}'
 
 
 def _encode_image(image) -> str:
@@ -987,11 +1488,15 @@ def _parse_host(host: Optional[str]) -> str:
   'http://example.com:11434'
   >>> _parse_host('example.com:56789/')
   'http://example.com:56789'
+  >>> _parse_host('unix:///var/run/ollama.sock')
+  'unix:///var/run/ollama.sock'
   """
 
   host, port = host or '', 11434
   scheme, _, hostport = host.partition('://')
-  if not hostport:
+  if scheme == 'unix':
+    return f'unix://{hostport}'
+  elif not hostport:
     scheme, hostport = 'http', host
   elif scheme == 'http':
     port = 80
@@ -0,0 +1,199 @@
+import json
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any, AnyStr, Dict, Hashable, List, Optional, Sequence, Set, Union
+
+from ollama._types import Options
+
+if TYPE_CHECKING:
+  from ollama._client import Client, AsyncClient
+
+
+def _key(model: str, truncate: bool, options: Optional[Options], keep_alive: Optional[Union[float, str]]) -> Hashable:
+  return model, truncate, json.dumps(options or {}, sort_keys=True), keep_alive
+
+
+def _texts(input: Union[str, Sequence[AnyStr]]) -> List[Any]:
+  return [input] if isinstance(input, (str, bytes)) else list(input)
+
+
+class _Batch:
+  def __init__(self, model: str, truncate: bool, options: Optional[Options], keep_alive: Optional[Union[float, str]]) -> None:
+    self.model = model
+    self.truncate = truncate
+    self.options = options
+    self.keep_alive = keep_alive
+    self.texts: List[Any] = []
+
+  def scatter(self, response: Dict[str, Any], start: int, count: int) -> Dict[str, Any]:
+    return {'model': response.get('model', self.model), 'embeddings': response['embeddings'][start : start + count]}
+
+
+class _ThreadBatch(_Batch):
+  def __init__(self, *args) -> None:
+    super().__init__(*args)
+    self.full = threading.Event()
+    self.done = threading.Event()
+    self.response: Dict[str, Any] = {}
+    self.error: Optional[BaseException] = None
+
+
+class _TaskBatch(_Batch):
+  def __init__(self, *args) -> None:
+    super().__init__(*args)
+    loop = asyncio.get_running_loop()
+    self.response: asyncio.Future = loop.create_future()
+    # retrieve the error even if every call waiting for it has been cancelled
+    self.response.add_done_callback(lambda future: future.cancelled() or future.exception())
+    self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbedCoalescer:
+  """
+  Gathers `embed` calls made concurrently from several threads into batched `/api/embed` requests.
+
+  Calls for the same model, `truncate`, `options` and `keep_alive` are held for up to `max_wait`
+  seconds, or until `max_batch` texts are waiting, then sent as one request. Each call returns the
+  embeddings of its own input, and raises the error of the batch request if it fails.
+  """
+
+  def __init__(self, client: 'Client', max_batch: int = 64, max_wait: float = 0.005) -> None:
+    if max_batch < 1:
+      raise ValueError('max_batch must be at least 1')
+
+    self.client = client
+
+    self.max_batch = max_batch
+    'Number of texts that sends a batch before `max_wait` has elapsed.'
+
+    self.max_wait = max_wait
+    'Seconds the first call of a batch waits for others to join it.'
+
+    self.calls = 0
+    'Number of `embed` calls.'
+
+    self.batches = 0
+    'Number of batch requests sent.'
+
+    self._lock = threading.Lock()
+    self._pending: Dict[Hashable, _ThreadBatch] = {}
+
+  def embed(
+    self,
+    model: str = '',
+    input: Union[str, Sequence[AnyStr]] = '',
+    truncate: bool = True,
+    options: Optional[Options] = None,
+    keep_alive: Optional[Union[float, str]] = None,
+  ) -> Dict[str, Any]:
+    "Same as `Client.embed`. The response only has `model` and `embeddings`."
+    texts = _texts(input)
+    key = _key(model, truncate, options, keep_alive)
+
+    with self._lock:
+      self.calls += 1
+      batch = self._pending.get(key)
+      if leader := batch is None:
+        batch = self._pending[key] = _ThreadBatch(model, truncate, options, keep_alive)
+
+      start = len(batch.texts)
+      batch.texts.extend(texts)
+      if len(batch.texts) >= self.max_batch:
+        del self._pending[key]
+        batch.full.set()
+
+    if leader:
+      # the first caller sends the batch once it is full or its wait is over
+      batch.full.wait(self.max_wait)
+      with self._lock:
+        if self._pending.get(key) is batch:
+          del self._pending[key]
+        self.batches += 1
+
+      try:
+        batch.response = self.client.embed(model, batch.texts, truncate, options, keep_alive)
+      except Exception as e:
+        batch.error = e
+      finally:
+        batch.done.set()
+    else:
+      batch.done.wait()
+
+    if batch.error:
+      raise batch.error
+    return batch.scatter(batch.response, start, len(texts))
+
+
+class AsyncEmbedCoalescer:
+  """
+  Gathers `embed` calls made concurrently from several tasks into batched `/api/embed` requests.
+  See `EmbedCoalescer`.
+
+  Batches are sent from their own task, so cancelling a call does not cancel the calls batched
+  with it.
+  """
+
+  def __init__(self, client: 'AsyncClient', max_batch: int = 64, max_wait: float = 0.005) -> None:
+    if max_batch < 1:
+      raise ValueError('max_batch must be at least 1')
+
+    self.client = client
+
+    self.max_batch = max_batch
+    'Number of texts that sends a batch before `max_wait` has elapsed.'
+
+    self.max_wait = max_wait
+    'Seconds the first call of a batch waits for others to join it.'
+
+    self.calls = 0
+    'Number of `embed` calls.'
+
+    self.batches = 0
+    'Number of batch requests sent.'
+
+    self._pending: Dict[Hashable, _TaskBatch] = {}
+    self._requests: Set[asyncio.Task] = set()
+
+  async def embed(
+    self,
+    model: str = '',
+    input: Union[str, Sequence[AnyStr]] = '',
+    truncate: bool = True,
+    options: Optional[Options] = None,
+    keep_alive: Optional[Union[float, str]] = None,
+  ) -> Dict[str, Any]:
+    "Same as `AsyncClient.embed`. The response only has `model` and `embeddings`."
+    texts = _texts(input)
+    key = _key(model, truncate, options, keep_alive)
+
+    self.calls += 1
+    batch = self._pending.get(key)
+    if batch is None:
+      batch = self._pending[key] = _TaskBatch(model, truncate, options, keep_alive)
+      batch.timer = asyncio.get_running_loop().call_later(self.max_wait, self._send, key, batch)
+
+    start = len(batch.texts)
+    batch.texts.extend(texts)
+    if len(batch.texts) >= self.max_batch:
+      if batch.timer:
+        batch.timer.cancel()
+      self._send(key, batch)
+
+    return batch.scatter(await asyncio.shield(batch.response), start, len(texts))
+
+  def _send(self, key: Hashable, batch: _TaskBatch) -> None:
+    if self._pending.get(key) is batch:
+      del self._pending[key]
+    self.batches += 1
+    # keep a reference so that the request task is not garbage collected while it runs
+    task = asyncio.ensure_future(self._request(batch))
+    self._requests.add(task)
+    task.add_done_callback(self._requests.discard)
+
+  async def _request(self, batch: _TaskBatch) -> None:
+    try:
+      response = await self.client.embed(batch.model, batch.texts, batch.truncate, batch.options, batch.keep_alive)
+    except Exception as e:
+      batch.response.set_exception(e)
+    else:
+      batch.response.set_result(response)
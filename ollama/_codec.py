@@ -0,0 +1,109 @@
+import json
+import math
+import functools
+from typing import Any, Optional, Tuple, Type, Union
+
+
+class JSONCodec:
+  """
+  Serializes request bodies and parses responses with the standard library `json` module.
+
+  Subclasses plug in faster JSON libraries. `dumps` returns UTF-8 encoded bytes and `loads`
+  accepts `str` or `bytes`.
+  """
+
+  name = 'json'
+
+  def dumps(self, obj: Any) -> bytes:
+    return json.dumps(obj).encode('utf-8')
+
+  def loads(self, data: Union[str, bytes]) -> Any:
+    return json.loads(data)
+
+  def __repr__(self) -> str:
+    return f'{type(self).__name__}()'
+
+
+def _non_finite_options(obj: Any) -> bool:
+  options = obj.get('options') if isinstance(obj, dict) else None
+  return bool(options) and isinstance(options, dict) and any(isinstance(value, float) and not math.isfinite(value) for value in options.values())
+
+
+class _NativeCodec(JSONCodec):
+  """
+  Base for codecs backed by a native JSON library.
+
+  Values the library rejects, such as numpy scalars or integers wider than 64 bits, are serialized
+  with `json.dumps` instead, as are request bodies whose `options` hold NaN or infinity. Elsewhere
+  the libraries write non-finite floats as `null`.
+  """
+
+  _errors: Tuple[Type[Exception], ...] = (TypeError, ValueError, OverflowError)
+
+  def _dumps(self, obj: Any) -> bytes:
+    raise NotImplementedError
+
+  def dumps(self, obj: Any) -> bytes:
+    if _non_finite_options(obj):
+      return super().dumps(obj)
+
+    try:
+      return self._dumps(obj)
+    except self._errors:
+      return super().dumps(obj)
+
+
+class OrjsonCodec(_NativeCodec):
+  "JSON codec backed by `orjson`."
+
+  name = 'orjson'
+
+  def __init__(self) -> None:
+    import orjson
+
+    self._dumps = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+    self.loads = orjson.loads
+
+
+class MsgspecCodec(_NativeCodec):
+  "JSON codec backed by `msgspec`."
+
+  name = 'msgspec'
+
+  def __init__(self) -> None:
+    import msgspec
+
+    self._errors = (*_NativeCodec._errors, msgspec.EncodeError)
+    self._dumps = msgspec.json.Encoder().encode
+    self.loads = msgspec.json.Decoder().decode
+
+
+CODECS = {codec.name: codec for codec in (OrjsonCodec, MsgspecCodec, JSONCodec)}
+
+
+def get_codec(codec: Optional[Union[str, JSONCodec]] = None) -> JSONCodec:
+  """
+  Returns a JSON codec by name, or the fastest installed one if `codec` is None.
+
+  >>> get_codec('json')
+  JSONCodec()
+  >>> get_codec('yaml')
+  Traceback (most recent call last):
+  ...
+  ValueError: unknown JSON codec: 'yaml'
+  """
+  if isinstance(codec, JSONCodec):
+    return codec
+
+  if codec is not None:
+    if codec not in CODECS:
+      raise ValueError(f'unknown JSON codec: {codec!r}')
+    return CODECS[codec]()
+
+  for cls in CODECS.values():
+    try:
+      return cls()
+    except ImportError:
+      continue
+
+  return JSONCodec()
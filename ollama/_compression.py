@@ -0,0 +1,93 @@
+import gzip
+import zlib
+import threading
+from typing import Any, Dict, Literal
+
+import httpx
+
+
+class CompressionPolicy:
+  """
+  Compresses large JSON request bodies and negotiates compressed responses.
+
+  Request bodies of at least `threshold` bytes, such as long chat histories with inlined images, are
+  sent with a `Content-Encoding` header. The Ollama server does not decompress request bodies itself,
+  so this is meant for hosts behind a gateway that does.
+
+  Non-streaming requests accept gzip or deflate encoded responses, which benefits large payloads like
+  `list()`, `show()` and batch `embed`. Streams ask for uncompressed responses so that parts are not
+  held back by the compressor.
+  """
+
+  def __init__(
+    self,
+    encoding: Literal['gzip', 'deflate'] = 'gzip',
+    threshold: int = 16384,
+    level: int = 6,
+  ) -> None:
+    if encoding not in ('gzip', 'deflate'):
+      raise ValueError(f'unsupported encoding: {encoding}')
+
+    self.encoding = encoding
+    'Content encoding of compressed request bodies.'
+
+    self.threshold = threshold
+    'Minimum size in bytes of a request body to compress it.'
+
+    self.level = level
+    'Compression level from 1 (fastest) to 9 (smallest).'
+
+    self.request_bytes = 0
+    'Size of request bodies before compression.'
+
+    self.request_bytes_sent = 0
+    'Size of request bodies as sent.'
+
+    self.response_bytes = 0
+    'Size of non-streaming response bodies after decompression.'
+
+    self.response_bytes_received = 0
+    'Size of non-streaming response bodies as received.'
+
+    self._lock = threading.Lock()
+
+  @property
+  def bytes_saved(self) -> int:
+    "Bytes not transferred thanks to compression, in both directions."
+    return self.request_bytes - self.request_bytes_sent + self.response_bytes - self.response_bytes_received
+
+  def compress(self, data: bytes) -> bytes:
+    if self.encoding == 'gzip':
+      return gzip.compress(data, compresslevel=self.level, mtime=0)
+    return zlib.compress(data, self.level)
+
+  def _encode(self, kwargs: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+    """
+    Compresses the serialized `content` of a request if it is large enough and sets the
+    encoding headers.
+    """
+    content = kwargs['content']
+    headers = {'Accept-Encoding': 'identity' if stream else 'gzip, deflate'}
+
+    sent = content
+    if len(content) >= self.threshold:
+      compressed = self.compress(content)
+      if len(compressed) < len(content):
+        sent = compressed
+        headers['Content-Encoding'] = self.encoding
+
+    with self._lock:
+      self.request_bytes += len(content)
+      self.request_bytes_sent += len(sent)
+
+    kwargs['content'] = sent
+    kwargs['headers'] = {**kwargs.get('headers', {}), **headers}
+    return kwargs
+
+  def _received(self, response: httpx.Response) -> None:
+    with self._lock:
+      self.response_bytes += len(response.content)
+      self.response_bytes_received += response.num_bytes_downloaded
+
+  def __repr__(self) -> str:
+    return f'CompressionPolicy(encoding={self.encoding!r}, threshold={self.threshold}, level={self.level})'
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import itertools
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from ollama._types import Options
+
+if TYPE_CHECKING:
+  from ollama._client import Client
+
+
+class EmbeddingFile:
+  """
+  Matrix of float32 embeddings stored row by row in a raw little-endian binary file, with a JSON
+  checkpoint next to it, at `path + '.json'`, that records the model, the number of dimensions
+  and the number of rows written.
+
+  Rows are only counted in `rows` once they and every row before them are on disk, so the file
+  can be read while `embed_corpus` is writing it and a run that was interrupted can resume.
+  """
+
+  def __init__(self, path: Union[str, 'os.PathLike[str]']) -> None:
+    self.path = os.fspath(path)
+    'Path of the binary file.'
+
+    self.model: Optional[str] = None
+    'Model the embeddings were created with.'
+
+    self.dimensions: Optional[int] = None
+    'Number of dimensions of each embedding.'
+
+    self.rows = 0
+    'Number of embeddings written.'
+
+    try:
+      with open(self.checkpoint) as f:
+        checkpoint = json.load(f)
+    except FileNotFoundError:
+      return
+
+    self.model = checkpoint['model']
+    self.dimensions = checkpoint['dimensions']
+    self.rows = checkpoint['rows']
+
+  @property
+  def checkpoint(self) -> str:
+    return self.path + '.json'
+
+  def __len__(self) -> int:
+    return self.rows
+
+  def __getitem__(self, index: int) -> List[float]:
+    if index < 0:
+      index += self.rows
+    if not 0 <= index < self.rows:
+      raise IndexError('embedding index out of range')
+
+    row = array('f')
+    with open(self.path, 'rb') as f:
+      f.seek(index * self.dimensions * row.itemsize)
+      row.fromfile(f, self.dimensions)
+    if sys.byteorder == 'big':
+      row.byteswap()
+    return row.tolist()
+
+  def memmap(self) -> Any:
+    "Maps the file as a read-only `numpy.memmap` of shape `(rows, dimensions)`. Requires `numpy`."
+    import numpy
+
+    return numpy.memmap(self.path, dtype='<f4', mode='r', shape=(self.rows, self.dimensions or 0))
+
+  def _save(self) -> None:
+    with open(self.checkpoint + '.tmp', 'w') as f:
+      json.dump({'model': self.model, 'dimensions': self.dimensions, 'rows': self.rows}, f)
+    os.replace(self.checkpoint + '.tmp', self.checkpoint)
+
+
+def _batches(texts: Iterator[str], size: int) -> Iterator[List[str]]:
+  while batch := list(itertools.islice(texts, size)):
+    yield batch
+
+
+def _pack(embeddings: Sequence[Sequence[float]], dimensions: int) -> bytes:
+  if any(len(embedding) != dimensions for embedding in embeddings):
+    raise ValueError(f'expected embeddings of {dimensions} dimensions')
+
+  data = array('f', itertools.chain.from_iterable(embeddings))
+  if sys.byteorder == 'big':
+    data.byteswap()
+  return data.tobytes()
+
+
+def embed_corpus(
+  client: 'Client',
+  model: str,
+  texts: Iterable[str],
+  path: Union[str, 'os.PathLike[str]'],
+  batch_size: int = 64,
+  concurrency: int = 4,
+  truncate: bool = True,
+  options: Optional[Options] = None,
+  keep_alive: Optional[Union[float, str]] = None,
+) -> EmbeddingFile:
+  """
+  Embeds `texts` in batches of `batch_size`, with `concurrency` batches in flight, and writes the
+  embedding of the n-th text to row n of the `EmbeddingFile` at `path`.
+
+  `texts` is read lazily and embeddings are written as soon as their batch completes, so memory
+  use does not grow with the size of the corpus.
+
+  If `path` has a checkpoint, the texts it already holds are skipped and the run resumes after
+  them. `texts` must then yield the same texts in the same order.
+
+  Raises `ValueError` if the checkpoint is for another model.
+  """
+  if batch_size < 1:
+    raise ValueError('batch_size must be at least 1')
+
+  matrix = EmbeddingFile(path)
+  if matrix.model is not None and matrix.model != model:
+    raise ValueError(f'{matrix.path} holds embeddings of {matrix.model!r}, not {model!r}')
+
+  matrix.model = model
+  start = matrix.rows
+  requests = (
+    {
+      'model': model,
+      'input': batch,
+      'truncate': truncate,
+      'options': options,
+      'keep_alive': keep_alive,
+    }
+    for batch in _batches(itertools.islice(iter(texts), start, None), batch_size)
+  )
+
+  # rows of the batches completed after a batch that is still in flight
+  completed: Dict[int, int] = {}
+  pending = 0
+
+  with open(matrix.path, 'r+b' if start else 'w+b') as f:
+    for index, response in client.map('embed', requests, concurrency):
+      embeddings = response['embeddings']
+      if matrix.dimensions is None and embeddings:
+        matrix.dimensions = len(embeddings[0])
+
+      if embeddings:
+        f.seek((start + index * batch_size) * matrix.dimensions * 4)
+        f.write(_pack(embeddings, matrix.dimensions))
+
+      completed[index] = len(embeddings)
+      if pending not in completed:
+        continue
+
+      while pending in completed:
+        matrix.rows += completed.pop(pending)
+        pending += 1
+
+      f.flush()
+      os.fsync(f.fileno())
+      matrix._save()
+
+    f.truncate(matrix.rows * (matrix.dimensions or 0) * 4)
+
+  matrix._save()
+  return matrix
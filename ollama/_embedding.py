@@ -0,0 +1,79 @@
+import re
+from array import array
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
+EmbeddingFormat = Literal['list', 'array', 'numpy']
+
+_KEYS = {
+  'embeddings': re.compile(rb'"embeddings"\s*:\s*\['),
+  'embedding': re.compile(rb'"embedding"\s*:\s*\['),
+}
+
+# the next embedding of a list of embeddings, or its end
+_NEXT = re.compile(rb'[\s,]*([\[\]])')
+
+
+def _rows(content: bytes, key: str) -> Optional[Tuple[List[Tuple[int, int]], int, int]]:
+  "Locates the embeddings of a response, and returns the span of each one and of all of them."
+  match = _KEYS[key].search(content)
+  if not match:
+    return None
+
+  start = match.end() - 1
+  if key == 'embedding':
+    end = content.index(b']', start) + 1
+    return [(start, end)], start, end
+
+  rows = []
+  pos = start + 1
+  while True:
+    match = _NEXT.match(content, pos)
+    if match.group(1) == b']':
+      return rows, start, match.end()
+    pos = content.index(b']', match.end()) + 1
+    rows.append((match.start(1), pos))
+
+
+def _array(content: bytes, rows: List[Tuple[int, int]], loads: Callable[[bytes], Any]) -> 'array[float]':
+  embeddings = array('f')
+  # only the floats of one embedding exist at a time
+  for start, end in rows:
+    embeddings.extend(loads(content[start:end]))
+  return embeddings
+
+
+def decode_embeddings(content: bytes, loads: Callable[[bytes], Any], key: str, format: EmbeddingFormat) -> Dict[str, Any]:
+  """
+  Parses an `/api/embed` response, with `key` `'embeddings'`, or an `/api/embeddings` response,
+  with `key` `'embedding'`.
+
+  With `format` `'list'`, embeddings are lists of floats. With `'array'`, they are parsed one at a
+  time into a single contiguous `array('f')` holding every embedding, one after the other, so
+  that only the floats of one embedding exist at once. With `'numpy'`, that array is wrapped without
+  copying in a 2-D float32 numpy array with one embedding per row, or a 1-D array for `'embedding'`.
+
+  >>> decode_embeddings(b'{"model": "m", "embeddings": [[1, 2.5], [-3e0, 4]]}', __import__('json').loads, 'embeddings', 'array')
+  {'model': 'm', 'embeddings': array('f', [1.0, 2.5, -3.0, 4.0])}
+  >>> decode_embeddings(b'{"embedding": []}', __import__('json').loads, 'embedding', 'array')
+  {'embedding': array('f')}
+  """
+  if format not in ('list', 'array', 'numpy'):
+    raise ValueError(f'unknown embedding format: {format!r}')
+
+  located = _rows(content, key) if format != 'list' else None
+  if not located:
+    return loads(content)
+
+  rows, start, end = located
+  response = loads(content[:start] + b'[]' + content[end:])
+  embeddings = _array(content, rows, loads)
+  if format == 'numpy':
+    import numpy
+
+    # a view of the array, without copying it
+    embeddings = numpy.frombuffer(embeddings, dtype=numpy.float32)
+    if key == 'embeddings':
+      embeddings = embeddings.reshape(len(rows), -1 if rows else 0)
+
+  response[key] = embeddings
+  return response
@@ -0,0 +1,229 @@
+import time
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+def _percentile(values: Sequence[float], percentile: float) -> Optional[float]:
+  if not values:
+    return None
+  values = sorted(values)
+  return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+class StreamLatency:
+  """
+  Client-side timing of a streamed response, as the caller of the stream experiences it.
+
+  Timestamps come from `time.perf_counter()`. The request is sent when iteration starts, and the
+  time of every part is taken when it is handed to the caller. With retries, times are measured
+  from the first attempt.
+  """
+
+  def __init__(self) -> None:
+    self.request_sent: Optional[float] = None
+    'Time the request was sent.'
+
+    self.headers_received: Optional[float] = None
+    'Time the response headers were received.'
+
+    self.chunks = array('d')
+    'Time each part was received.'
+
+  @property
+  def time_to_headers(self) -> Optional[float]:
+    "Seconds from sending the request to receiving the response headers."
+    if self.request_sent is None or self.headers_received is None:
+      return None
+    return self.headers_received - self.request_sent
+
+  @property
+  def ttft(self) -> Optional[float]:
+    "Time to first token: seconds from sending the request to receiving the first part."
+    if self.request_sent is None or not self.chunks:
+      return None
+    return self.chunks[0] - self.request_sent
+
+  @property
+  def gaps(self) -> List[float]:
+    "Seconds between consecutive parts."
+    chunks = self.chunks
+    return [b - a for a, b in zip(chunks, chunks[1:])]
+
+  @property
+  def gap_p50(self) -> Optional[float]:
+    return _percentile(self.gaps, 50)
+
+  @property
+  def gap_p99(self) -> Optional[float]:
+    return _percentile(self.gaps, 99)
+
+  @property
+  def tokens_per_second(self) -> Optional[float]:
+    "Parts received per second after the first one. Each streamed part carries one token."
+    if len(self.chunks) < 2 or self.chunks[-1] == self.chunks[0]:
+      return None
+    return (len(self.chunks) - 1) / (self.chunks[-1] - self.chunks[0])
+
+  def summary(self) -> Dict[str, Any]:
+    return {
+      'time_to_headers': self.time_to_headers,
+      'ttft': self.ttft,
+      'gap_p50': self.gap_p50,
+      'gap_p99': self.gap_p99,
+      'tokens_per_second': self.tokens_per_second,
+      'chunks': len(self.chunks),
+    }
+
+  def _sent(self) -> None:
+    if self.request_sent is None:
+      self.request_sent = time.perf_counter()
+
+  def _headers(self) -> None:
+    self.headers_received = time.perf_counter()
+
+  def __repr__(self) -> str:
+    return f'StreamLatency({self.summary()})'
+
+
+class ModelStats:
+  """
+  Rolling server-side timings of the requests served by one model, on one host or merged across hosts.
+
+  Samples are kept for the last `window` requests. Durations are in seconds.
+  """
+
+  METRICS = ('prompt_tokens_per_second', 'eval_tokens_per_second', 'load_seconds', 'total_seconds')
+
+  def __init__(self, window: int = 1000) -> None:
+    self.requests = 0
+    'Number of completed requests.'
+
+    self.cold_loads = 0
+    'Number of requests that had to load the model first.'
+
+    self.prompt_tokens = 0
+    'Total prompt tokens evaluated.'
+
+    self.eval_tokens = 0
+    'Total tokens generated.'
+
+    self._samples: Dict[str, deque] = {metric: deque(maxlen=window) for metric in self.METRICS}
+
+  @property
+  def cold_load_rate(self) -> float:
+    "Fraction of requests that loaded the model. A high rate means the model is being evicted and reloaded."
+    return self.cold_loads / self.requests if self.requests else 0.0
+
+  def samples(self, metric: str) -> List[float]:
+    return list(self._samples[metric])
+
+  def percentile(self, metric: str, percentile: float) -> Optional[float]:
+    return _percentile(self._samples[metric], percentile)
+
+  def histogram(self, metric: str, bounds: Sequence[float]) -> List[int]:
+    """
+    Counts the samples of `metric` at or below each of the ascending `bounds`, plus those above the last one.
+
+    >>> stats = ModelStats()
+    >>> for load in (0.01, 0.02, 3.5):
+    ...   stats._record({'load_duration': int(load * 1e9)}, cold_load=1)
+    >>> stats.histogram('load_seconds', [0.1, 1, 10])
+    [2, 0, 1, 0]
+    """
+    counts = [0] * (len(bounds) + 1)
+    for value in self._samples[metric]:
+      counts[bisect_left(bounds, value)] += 1
+    return counts
+
+  def summary(self) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {'requests': self.requests, 'cold_load_rate': self.cold_load_rate}
+    for metric in self.METRICS:
+      summary[metric] = {'p50': self.percentile(metric, 50), 'p90': self.percentile(metric, 90), 'p99': self.percentile(metric, 99)}
+    return summary
+
+  def _record(self, response: Mapping[str, Any], cold_load: float) -> None:
+    self.requests += 1
+
+    prompt_eval_count = response.get('prompt_eval_count') or 0
+    prompt_eval_duration = response.get('prompt_eval_duration')
+    eval_count = response.get('eval_count') or 0
+    eval_duration = response.get('eval_duration')
+    load_duration = response.get('load_duration')
+    total_duration = response.get('total_duration')
+
+    self.prompt_tokens += prompt_eval_count
+    self.eval_tokens += eval_count
+
+    if prompt_eval_count and prompt_eval_duration:
+      self._samples['prompt_tokens_per_second'].append(prompt_eval_count / prompt_eval_duration * 1e9)
+    if eval_count and eval_duration:
+      self._samples['eval_tokens_per_second'].append(eval_count / eval_duration * 1e9)
+    if load_duration is not None:
+      self._samples['load_seconds'].append(load_duration / 1e9)
+      self.cold_loads += load_duration / 1e9 >= cold_load
+    if total_duration is not None:
+      self._samples['total_seconds'].append(total_duration / 1e9)
+
+  def _merge(self, other: 'ModelStats') -> None:
+    self.requests += other.requests
+    self.cold_loads += other.cold_loads
+    self.prompt_tokens += other.prompt_tokens
+    self.eval_tokens += other.eval_tokens
+    for metric in self.METRICS:
+      self._samples[metric].extend(other._samples[metric])
+
+  def __repr__(self) -> str:
+    return f'ModelStats(requests={self.requests}, cold_loads={self.cold_loads})'
+
+
+class ServerStats:
+  """
+  Aggregates the server timings reported by the final `generate` and `chat` responses, per model and host.
+
+  A request counts as a cold load when the server spent at least `cold_load` seconds loading the
+  model. Statistics can be shared by several clients.
+  """
+
+  def __init__(self, window: int = 1000, cold_load: float = 0.5) -> None:
+    self.window = window
+    'Number of recent requests kept per model and host.'
+
+    self.cold_load = cold_load
+    'Load duration in seconds from which a request counts as a cold load.'
+
+    self._stats: Dict[Tuple[str, str], ModelStats] = {}
+    self._lock = threading.Lock()
+
+  def keys(self) -> List[Tuple[str, str]]:
+    "Returns the (model, host) pairs seen so far."
+    with self._lock:
+      return list(self._stats)
+
+  def get(self, model: Optional[str] = None, host: Optional[str] = None) -> ModelStats:
+    "Returns the statistics of `model` on `host`. Either can be left out to merge all models or hosts."
+    with self._lock:
+      merged = ModelStats(self.window * len(self._stats) or 1)
+      for (m, h), stats in self._stats.items():
+        if (model is None or m == model) and (host is None or h == host):
+          merged._merge(stats)
+    return merged
+
+  def summary(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    with self._lock:
+      return {key: stats.summary() for key, stats in self._stats.items()}
+
+  def _record(self, host: str, response: Mapping[str, Any]) -> None:
+    if not response.get('done') or 'total_duration' not in response:
+      return
+
+    key = (response.get('model', ''), host)
+    with self._lock:
+      if (stats := self._stats.get(key)) is None:
+        stats = self._stats[key] = ModelStats(self.window)
+      stats._record(response, self.cold_load)
+
+  def __repr__(self) -> str:
+    return f'ServerStats(keys={self.keys()})'
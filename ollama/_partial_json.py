@@ -0,0 +1,175 @@
+import re
+import json
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+_STRING = re.compile(r'["\\]')
+_NESTED = re.compile(r'["{}\[\]]')
+_TOP = re.compile(r'["{}\[\],:]|[^\s"{}\[\],:]+')
+_START = re.compile(r'\S')
+
+Item = Tuple[Union[str, int, None], Any]
+
+
+class IncrementalJSONParser:
+  """
+  Parses a JSON document that arrives in fragments and returns each top-level object member or array
+  element as soon as it is complete.
+
+  Members are returned as `(key, value)` and array elements as `(index, value)`. Strings, objects and
+  arrays are complete when they close, numbers and literals when the following `,` or the closing
+  bracket arrives. A top-level scalar is returned as `(None, value)` by `close()`.
+
+  Fragments are only scanned once, and the text of the current member is joined only when one of
+  its values is complete, so parsing time is linear in the size of the document.
+
+  >>> parser = IncrementalJSONParser()
+  >>> parser.feed('{"title": "Why the sky ')
+  []
+  >>> parser.feed('is blue", "tags": ["phys')
+  [('title', 'Why the sky is blue')]
+  >>> parser.feed('ics", "optics"], "score": 0.9')
+  [('tags', ['physics', 'optics'])]
+  >>> parser.feed('}')
+  [('score', 0.9)]
+  """
+
+  def __init__(self, loads: Callable[[str], Any] = json.loads) -> None:
+    self._loads = loads
+    self._parts: List[str] = []
+    self._length = 0
+    self._depth = 0
+    self._in_string = False
+    self._escape = False
+    self._container: Optional[str] = None
+    self._done = False
+    self._index = 0
+    self._reset()
+
+  def _reset(self) -> None:
+    self._key: Optional[str] = None
+    self._key_start = 0
+    self._expect_value = self._container == '['
+    self._value_start: Optional[int] = None
+    self._emitted = False
+
+  def feed(self, text: str) -> List[Item]:
+    "Adds the next fragment of the document and returns the members it completed."
+    items: List[Item] = []
+    if self._container == '':
+      self._parts.append(text)
+    if self._done:
+      return items
+
+    # positions in `text` are offset by `base` in the text of the current member
+    base = self._length
+    self._parts.append(text)
+    self._length += len(text)
+
+    pos = 0
+    if self._escape and text:
+      self._escape = False
+      pos = 1
+
+    while pos < len(text):
+      if self._in_string:
+        match = _STRING.search(text, pos)
+        if not match:
+          break
+
+        pos = match.end()
+        if match.group() == '\\':
+          if pos == len(text):
+            self._escape = True
+          pos += 1
+          continue
+
+        self._in_string = False
+        if self._depth == 1:
+          if self._expect_value:
+            self._emit(items, self._value_start, base + pos)
+          else:
+            self._key = self._loads(self._text(self._key_start, base + pos))
+        continue
+
+      if self._depth == 0:
+        match = _START.search(text, pos)
+        if not match:
+          break
+
+        if match.group() not in '{[':
+          # a top-level scalar is parsed by close()
+          self._container = ''
+          self._done = True
+          break
+
+        pos = match.end()
+        self._container = match.group()
+        self._depth = 1
+        self._parts = [text[pos:]]
+        self._length = len(text) - pos
+        base = -pos
+        self._reset()
+        continue
+
+      match = (_TOP if self._depth == 1 else _NESTED).search(text, pos)
+      if not match:
+        break
+
+      token, start, pos = match.group(), base + match.start(), match.end()
+      if token == '"':
+        self._in_string = True
+        if self._depth == 1:
+          if self._expect_value:
+            self._value_start = start
+          else:
+            self._key_start = start
+      elif token in '{[':
+        if self._depth == 1:
+          self._value_start = start
+        self._depth += 1
+      elif token in '}]':
+        self._depth -= 1
+        if self._depth == 1:
+          self._emit(items, self._value_start, base + pos)
+        elif self._depth == 0:
+          self._emit(items, self._value_start, start)
+          # ignore anything after the top-level container
+          self._done = True
+          break
+      elif token == ':':
+        self._expect_value = True
+      elif token == ',':
+        self._emit(items, self._value_start, start)
+        # drop the text of completed members
+        self._parts = [text[pos:]]
+        self._length = len(text) - pos
+        base = -pos
+        self._reset()
+      elif self._expect_value and self._value_start is None:
+        self._value_start = start
+
+    return items
+
+  @property
+  def done(self) -> bool:
+    "True once the top-level object or array has closed."
+    return self._done and self._container != ''
+
+  def close(self) -> List[Item]:
+    "Ends the document and returns a top-level scalar."
+    if self._container == '':
+      self._container = None
+      return [(None, self._loads(''.join(self._parts)))]
+    return []
+
+  def _text(self, start: int, end: int) -> str:
+    if len(self._parts) > 1:
+      self._parts = [''.join(self._parts)]
+    return self._parts[0][start:end]
+
+  def _emit(self, items: List[Item], start: Optional[int], end: int) -> None:
+    if start is None or self._emitted:
+      return
+    self._emitted = True
+    items.append((self._key if self._container == '{' else self._index, self._loads(self._text(start, end).strip())))
+    self._index += 1
@@ -0,0 +1,507 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import closing
+from typing import Callable, Optional, Sequence
+
+import httpx
+
+from ollama._metrics import _percentile
+from ollama._types import ResponseError
+
+
+class Host:
+  """
+  Routing state for a single upstream Ollama server.
+  """
+
+  def __init__(self, url: str, transport, weight: float = 1) -> None:
+    if weight <= 0:
+      raise ValueError(f'host weight must be positive: {url}={weight}')
+
+    self.url = httpx.URL(url)
+    'Base URL of the host.'
+
+    self.transport = transport
+    'Transport used to reach the host.'
+
+    self.weight = weight
+    'Relative capacity of the host.'
+
+    self.inflight = 0
+    'Number of requests, including open streams, currently outstanding on the host.'
+
+    self.failures = 0
+    'Number of consecutive failed requests counted by the circuit breaker.'
+
+    self.open_until = 0.0
+    'Monotonic time at which an open circuit breaker starts probing the host, or 0 if the host is in rotation.'
+
+    self._waiting = []
+    self._probing = False
+
+  def __repr__(self) -> str:
+    return f'Host({str(self.url)!r}, weight={self.weight}, inflight={self.inflight}, open={bool(self.open_until)})'
+
+
+class CircuitBreaker:
+  """
+  Takes a host out of rotation after `failures` consecutive failed requests. A request fails if it
+  raises a transport error, gets a 5xx response or, when `latency` is set, takes longer than
+  `latency` seconds to respond. A request still waiting for its response after `latency` seconds
+  trips the breaker straight away, so a wedged host stops receiving requests even without a timeout.
+
+  After `reset_timeout` seconds the host is probed in the background with `GET /api/ps` and put
+  back into rotation once a probe succeeds within `probe_timeout` seconds. While every host is out
+  of rotation, requests fail fast with a 503 `ResponseError`.
+  """
+
+  def __init__(
+    self,
+    failures: int = 5,
+    latency: Optional[float] = None,
+    reset_timeout: float = 30,
+    probe_timeout: float = 2,
+  ) -> None:
+    self.failures = failures
+    'Consecutive failures that open the breaker.'
+
+    self.latency = latency
+    'Response time in seconds above which a request counts as failed.'
+
+    self.reset_timeout = reset_timeout
+    'Seconds an open breaker waits before probing the host.'
+
+    self.probe_timeout = probe_timeout
+    'Timeout in seconds for a health probe.'
+
+  def __repr__(self) -> str:
+    return f'CircuitBreaker(failures={self.failures}, latency={self.latency}, reset_timeout={self.reset_timeout})'
+
+
+class HedgePolicy:
+  """
+  Sends a duplicate of a slow idempotent request to a second host and uses whichever responds first.
+
+  The hedge is sent once the first attempt has been outstanding for longer than `percentile` of
+  recently observed response times, or `delay` seconds until `min_samples` responses have been seen.
+  Ollama sends response headers together with the first part of a stream, so a streaming request
+  counts as answered once its first part arrives.
+
+  Counters are shared by every client using the policy.
+  """
+
+  def __init__(
+    self,
+    percentile: float = 95,
+    delay: float = 0.05,
+    min_samples: int = 20,
+    window: int = 1000,
+  ) -> None:
+    self.percentile = percentile
+    'Percentile of recent response times after which a hedge is sent.'
+
+    self.initial_delay = delay
+    'Hedge delay in seconds used until enough response times have been observed.'
+
+    self.min_samples = min_samples
+    'Number of observed response times required before the percentile is used.'
+
+    self.requests = 0
+    'Number of requests eligible for hedging.'
+
+    self.hedged = 0
+    'Number of requests for which a hedge was sent.'
+
+    self.wins = 0
+    'Number of hedged requests answered first by the hedge.'
+
+    self._latencies = deque(maxlen=window)
+    self._lock = threading.Lock()
+
+  @property
+  def hedge_rate(self) -> float:
+    return self.hedged / self.requests if self.requests else 0.0
+
+  @property
+  def win_rate(self) -> float:
+    return self.wins / self.hedged if self.hedged else 0.0
+
+  def delay(self) -> float:
+    with self._lock:
+      latencies = list(self._latencies)
+
+    delay = _percentile(latencies, self.percentile) if len(latencies) >= self.min_samples else None
+    return self.initial_delay if delay is None else delay
+
+  def _record(self, latency: float, hedged: bool, won: bool) -> None:
+    with self._lock:
+      self._latencies.append(latency)
+      self.requests += 1
+      self.hedged += hedged
+      self.wins += won
+
+  def __repr__(self) -> str:
+    return f'HedgePolicy(requests={self.requests}, hedged={self.hedged}, wins={self.wins})'
+
+
+class BasePoolTransport:
+  """
+  Routes each request to the host with the fewest outstanding requests relative to its weight.
+  Ties are broken round-robin so that idle hosts share sequential traffic.
+  """
+
+  def __init__(self, hosts: Sequence[Host], hedge: Optional[HedgePolicy] = None, breaker: Optional[CircuitBreaker] = None) -> None:
+    if not hosts:
+      raise ValueError('must provide at least one host')
+
+    self.hosts = list(hosts)
+    self.hedge = hedge
+    self.breaker = breaker
+    self._lock = threading.Lock()
+    self._next = 0
+
+  def _checkout(self) -> Host:
+    if (host := self._acquire()) is None:
+      raise ResponseError('no host available: circuit breaker open', 503)
+    return host
+
+  def _acquire(self, exclude: Optional[Host] = None) -> Optional[Host]:
+    now = time.monotonic()
+    with self._lock:
+      n = len(self.hosts)
+      best = None
+      for i in range(n):
+        host = self.hosts[(self._next + i) % n]
+        if host is exclude or (self.breaker and not self._available(host, now)):
+          continue
+        if best is None or (host.inflight + 1) / host.weight < (best.inflight + 1) / best.weight:
+          best = host
+
+      self._next = (self._next + 1) % n
+      if best is not None:
+        best.inflight += 1
+      return best
+
+  def _release(self, host: Host) -> None:
+    with self._lock:
+      host.inflight -= 1
+
+  def _available(self, host: Host, now: float) -> bool:
+    """
+    Checks the circuit breaker of `host`, starting a probe once an open breaker is due. Called with the lock held.
+    """
+    if host.open_until:
+      if now >= host.open_until and not host._probing:
+        host._probing = True
+        self._start_probe(host)
+      return False
+
+    if self.breaker.latency and host._waiting and now - host._waiting[0] > self.breaker.latency:
+      self._trip(host, now)
+      return False
+
+    return True
+
+  def _trip(self, host: Host, now: float) -> None:
+    host.open_until = now + self.breaker.reset_timeout
+    host.failures = 0
+
+  def _sending(self, host: Host) -> Optional[float]:
+    if not self.breaker:
+      return None
+
+    start = time.monotonic()
+    with self._lock:
+      host._waiting.append(start)
+    return start
+
+  def _sent(self, host: Host, start: Optional[float], failed: Optional[bool]) -> None:
+    """
+    Records the outcome of a request for the circuit breaker. `failed` is None for requests that were interrupted.
+    """
+    if start is None:
+      return
+
+    now = time.monotonic()
+    with self._lock:
+      host._waiting.remove(start)
+      if failed is None or host.open_until:
+        return
+
+      if failed or (self.breaker.latency and now - start > self.breaker.latency):
+        host.failures += 1
+        if host.failures >= self.breaker.failures:
+          self._trip(host, now)
+      else:
+        host.failures = 0
+
+  def _probed(self, host: Host, ok: bool) -> None:
+    with self._lock:
+      host._probing = False
+      host.open_until = 0.0 if ok else time.monotonic() + self.breaker.reset_timeout
+
+  def _start_probe(self, host: Host) -> None:
+    raise NotImplementedError
+
+  def _probe_request(self, host: Host) -> httpx.Request:
+    timeout = self.breaker.probe_timeout
+    return httpx.Request('GET', host.url.join('/api/ps'), extensions={'timeout': dict.fromkeys(('connect', 'read', 'write', 'pool'), timeout)})
+
+  def _release_unless_sent(self, host: Host) -> Callable:
+    """
+    Returns a done callback that releases `host` if its attempt failed or was cancelled.
+    Successful attempts release the host when their response is closed.
+    """
+
+    def callback(attempt):
+      if attempt.cancelled() or attempt.exception() is not None:
+        self._release(host)
+
+    return callback
+
+  def _hedgeable(self, request: httpx.Request) -> bool:
+    return self.hedge is not None and len(self.hosts) > 1 and request.extensions.get('idempotent', False)
+
+  def _won(self, request: httpx.Request, hosts: Sequence[Host], index: int, start: float) -> None:
+    self.hedge._record(time.perf_counter() - start, hedged=len(hosts) > 1, won=index > 0)
+    # point the request at the host that answered so that callers see where it was served
+    self._route(request, hosts[index])
+
+  def _route(self, request: httpx.Request, host: Host) -> None:
+    request.url = request.url.copy_with(scheme=host.url.scheme, host=host.url.host, port=host.url.port)
+    request.headers['Host'] = request.url.netloc.decode('ascii')
+
+
+class PoolTransport(BasePoolTransport, httpx.BaseTransport):
+  def __init__(self, hosts: Sequence[Host], hedge: Optional[HedgePolicy] = None, breaker: Optional[CircuitBreaker] = None) -> None:
+    super().__init__(hosts, hedge, breaker)
+    self._executor = ThreadPoolExecutor(max_workers=128, thread_name_prefix='ollama-hedge') if hedge else None
+
+  def handle_request(self, request: httpx.Request) -> httpx.Response:
+    if self._hedgeable(request):
+      return self._handle_hedged(request)
+
+    host = self._checkout()
+    try:
+      return self._send(request, host)
+    except BaseException:
+      self._release(host)
+      raise
+
+  def _send(self, request: httpx.Request, host: Host) -> httpx.Response:
+    self._route(request, host)
+    start = self._sending(host)
+    try:
+      response = host.transport.handle_request(request)
+    except Exception:
+      self._sent(host, start, True)
+      raise
+    except BaseException:
+      self._sent(host, start, None)
+      raise
+
+    self._sent(host, start, response.status_code >= 500)
+    response.stream = _ReleasingStream(response.stream, lambda: self._release(host))
+    return response
+
+  def _submit(self, request: httpx.Request, host: Host, started: Optional[threading.Event] = None) -> Future:
+    def send() -> httpx.Response:
+      if started:
+        started.set()
+      return self._send(request, host)
+
+    future = self._executor.submit(send)
+    future.add_done_callback(self._release_unless_sent(host))
+    if started:
+      future.add_done_callback(lambda _: started.set())
+    return future
+
+  def _handle_hedged(self, request: httpx.Request) -> httpx.Response:
+    hosts = [self._checkout()]
+    started = threading.Event()
+    attempts = [self._submit(request, hosts[0], started)]
+
+    # under load the attempt may wait for a worker, which must not count towards the hedge delay
+    started.wait()
+    start = time.perf_counter()
+    done, _ = wait(attempts, timeout=self.hedge.delay())
+    if not done and (secondary := self._acquire(exclude=hosts[0])):
+      hosts.append(secondary)
+      attempts.append(self._submit(_copy_request(request), secondary))
+
+    winner, pending = None, set(attempts)
+    while pending and winner is None:
+      done, pending = wait(pending, return_when=FIRST_COMPLETED)
+      winner = next((attempt for attempt in attempts if attempt in done and attempt.exception() is None), None)
+
+    # a sync attempt cannot be interrupted, so a losing response is closed as soon as it arrives
+    for attempt in attempts:
+      if attempt is not winner:
+        attempt.add_done_callback(_close_response)
+
+    if winner is None:
+      raise attempts[0].exception()
+
+    self._won(request, hosts, attempts.index(winner), start)
+    return winner.result()
+
+  def _start_probe(self, host: Host) -> None:
+    threading.Thread(target=self._probe, args=(host,), name='ollama-probe', daemon=True).start()
+
+  def _probe(self, host: Host) -> None:
+    try:
+      with closing(host.transport.handle_request(self._probe_request(host))) as response:
+        response.read()
+        ok = response.status_code == 200
+    except Exception:
+      ok = False
+
+    self._probed(host, ok)
+
+  def close(self) -> None:
+    if self._executor:
+      self._executor.shutdown(wait=False)
+    for host in self.hosts:
+      host.transport.close()
+
+
+class AsyncPoolTransport(BasePoolTransport, httpx.AsyncBaseTransport):
+  def __init__(self, hosts: Sequence[Host], hedge: Optional[HedgePolicy] = None, breaker: Optional[CircuitBreaker] = None) -> None:
+    super().__init__(hosts, hedge, breaker)
+    self._probes = set()
+
+  async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+    if self._hedgeable(request):
+      return await self._handle_hedged(request)
+
+    host = self._checkout()
+    try:
+      return await self._send(request, host)
+    except BaseException:
+      self._release(host)
+      raise
+
+  async def _send(self, request: httpx.Request, host: Host) -> httpx.Response:
+    self._route(request, host)
+    start = self._sending(host)
+    try:
+      response = await host.transport.handle_async_request(request)
+    except Exception:
+      self._sent(host, start, True)
+      raise
+    except BaseException:
+      self._sent(host, start, None)
+      raise
+
+    self._sent(host, start, response.status_code >= 500)
+    response.stream = _AsyncReleasingStream(response.stream, lambda: self._release(host))
+    return response
+
+  def _submit(self, request: httpx.Request, host: Host) -> asyncio.Future:
+    task = asyncio.ensure_future(self._send(request, host))
+    task.add_done_callback(self._release_unless_sent(host))
+    return task
+
+  async def _handle_hedged(self, request: httpx.Request) -> httpx.Response:
+    start = time.perf_counter()
+    hosts = [self._checkout()]
+    attempts = [self._submit(request, hosts[0])]
+    winner = None
+
+    try:
+      done, _ = await asyncio.wait(attempts, timeout=self.hedge.delay())
+      if not done and (secondary := self._acquire(exclude=hosts[0])):
+        hosts.append(secondary)
+        attempts.append(self._submit(_copy_request(request), secondary))
+
+      pending = set(attempts)
+      while pending and winner is None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        winner = next((attempt for attempt in attempts if attempt in done and attempt.exception() is None), None)
+    finally:
+      for attempt in attempts:
+        if attempt is not winner:
+          attempt.cancel()
+          attempt.add_done_callback(_aclose_response)
+
+    if winner is None:
+      raise attempts[0].exception()
+
+    self._won(request, hosts, attempts.index(winner), start)
+    return winner.result()
+
+  def _start_probe(self, host: Host) -> None:
+    # keep a reference so that the probe task is not garbage collected while it runs
+    task = asyncio.ensure_future(self._probe(host))
+    self._probes.add(task)
+    task.add_done_callback(self._probes.discard)
+
+  async def _probe(self, host: Host) -> None:
+    try:
+      response = await host.transport.handle_async_request(self._probe_request(host))
+      try:
+        await response.aread()
+        ok = response.status_code == 200
+      finally:
+        await response.aclose()
+    except Exception:
+      ok = False
+
+    self._probed(host, ok)
+
+  async def aclose(self) -> None:
+    for host in self.hosts:
+      await host.transport.aclose()
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+  def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]) -> None:
+    self._stream = stream
+    self._release: Optional[Callable[[], None]] = release
+
+  def __iter__(self):
+    yield from self._stream
+
+  def close(self) -> None:
+    try:
+      self._stream.close()
+    finally:
+      if release := self._release:
+        self._release = None
+        release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+  def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+    self._stream = stream
+    self._release: Optional[Callable[[], None]] = release
+
+  async def __aiter__(self):
+    async for chunk in self._stream:
+      yield chunk
+
+  async def aclose(self) -> None:
+    try:
+      await self._stream.aclose()
+    finally:
+      if release := self._release:
+        self._release = None
+        release()
+
+
+def _copy_request(request: httpx.Request) -> httpx.Request:
+  # idempotent requests carry an in-memory body that can be replayed
+  return httpx.Request(request.method, request.url, headers=request.headers, stream=request.stream, extensions=request.extensions)
+
+
+def _close_response(attempt: Future) -> None:
+  if not attempt.cancelled() and attempt.exception() is None:
+    attempt.result().close()
+
+
+def _aclose_response(attempt: asyncio.Future) -> None:
+  if not attempt.cancelled() and attempt.exception() is None:
+    asyncio.ensure_future(attempt.result().aclose())
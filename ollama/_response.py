@@ -0,0 +1,103 @@
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple, Type
+
+_MISSING = object()
+
+
+class CompactResponse(Mapping[str, Any]):
+  """
+  Read-only mapping that stores the known fields of a response in `__slots__` instead of a dict.
+
+  Fields are also readable as attributes. Keys the server sends that are not declared in `_fields`
+  are kept in a separate dict, so no data is lost. Compact responses compare equal to dicts with
+  the same items; use `dict(response)` where a real dict is needed, for example for `json.dumps`.
+  """
+
+  __slots__ = ('_extra',)
+
+  _fields: Tuple[str, ...] = ()
+  _nested: Mapping[str, Type['CompactResponse']] = {}
+
+  def __init__(self, data: Mapping[str, Any]) -> None:
+    extra: Optional[Dict[str, Any]] = None
+    for key, value in data.items():
+      if key in self._nested and isinstance(value, Mapping):
+        value = self._nested[key](value)
+
+      if key in self._fields:
+        object.__setattr__(self, key, value)
+      else:
+        extra = extra or {}
+        extra[key] = value
+
+    self._extra = extra
+
+  def __getitem__(self, key: str) -> Any:
+    if key in self._fields:
+      value = getattr(self, key, _MISSING)
+      if value is not _MISSING:
+        return value
+    elif self._extra and key in self._extra:
+      return self._extra[key]
+    raise KeyError(key)
+
+  def __iter__(self) -> Iterator[str]:
+    for key in self._fields:
+      if hasattr(self, key):
+        yield key
+    if self._extra:
+      yield from self._extra
+
+  def __len__(self) -> int:
+    return sum(1 for _ in self)
+
+  def __setattr__(self, name: str, value: Any) -> None:
+    if name != '_extra':
+      raise AttributeError(f'{type(self).__name__} is read-only')
+    object.__setattr__(self, name, value)
+
+  def __getattr__(self, name: str) -> Any:
+    # only called for unset slots and unknown names
+    if name != '_extra' and (extra := self._extra) and name in extra:
+      return extra[name]
+    raise AttributeError(name)
+
+  def __reduce__(self):
+    return type(self), (dict(self),)
+
+  def __repr__(self) -> str:
+    return f'{type(self).__name__}({dict(self)!r})'
+
+
+_BASE_FIELDS = (
+  'model',
+  'created_at',
+  'done',
+  'done_reason',
+  'total_duration',
+  'load_duration',
+  'prompt_eval_count',
+  'prompt_eval_duration',
+  'eval_count',
+  'eval_duration',
+)
+
+
+class CompactMessage(CompactResponse):
+  "Compact `Message` of a chat response."
+
+  __slots__ = _fields = ('role', 'content', 'images', 'tool_calls')
+
+
+class CompactGenerateResponse(CompactResponse):
+  "Compact `GenerateResponse`."
+
+  __slots__ = ('response', 'context', *_BASE_FIELDS)
+  _fields = __slots__
+
+
+class CompactChatResponse(CompactResponse):
+  "Compact `ChatResponse`."
+
+  __slots__ = ('message', *_BASE_FIELDS)
+  _fields = __slots__
+  _nested = {'message': CompactMessage}
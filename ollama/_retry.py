@@ -0,0 +1,107 @@
+import time
+import random
+import asyncio
+import threading
+from typing import Awaitable, Callable, Sequence, TypeVar
+
+import httpx
+
+from ollama._types import ResponseError
+
+T = TypeVar('T')
+
+
+class RetryPolicy:
+  """
+  Retries idempotent requests that fail with a transport error or a retryable status code.
+
+  Attempts are spaced by capped exponential backoff with jitter. A retry budget shared by all
+  requests using the policy bounds the extra load retries put on the server: every request adds
+  `budget_ratio` tokens to the budget, up to `budget_max`, and every retry spends one.
+  """
+
+  def __init__(
+    self,
+    max_attempts: int = 3,
+    backoff: float = 0.1,
+    max_backoff: float = 5.0,
+    jitter: float = 1.0,
+    statuses: Sequence[int] = (429, 502, 503, 504),
+    budget_ratio: float = 0.2,
+    budget_max: float = 10,
+  ) -> None:
+    self.max_attempts = max_attempts
+    'Maximum number of attempts, including the first.'
+
+    self.backoff = backoff
+    'Delay in seconds before the first retry. Doubles after every retry.'
+
+    self.max_backoff = max_backoff
+    'Upper bound in seconds for the delay between attempts.'
+
+    self.jitter = jitter
+    'Fraction of each delay that is randomized. 1.0 draws the delay uniformly from zero to the backoff.'
+
+    self.statuses = frozenset(statuses)
+    'HTTP status codes that are retried.'
+
+    self.budget_ratio = budget_ratio
+    'Retry tokens earned by each request.'
+
+    self.budget_max = budget_max
+    'Maximum number of retry tokens that can be saved up.'
+
+    self._tokens = budget_max
+    self._lock = threading.Lock()
+
+  def retryable(self, e: BaseException) -> bool:
+    if isinstance(e, ResponseError):
+      return e.status_code in self.statuses
+    return isinstance(e, httpx.TransportError)
+
+  def delay(self, attempt: int) -> float:
+    """
+    Returns the delay in seconds before retry number `attempt`, counting from zero.
+    """
+    delay = min(self.max_backoff, self.backoff * 2**attempt)
+    return delay * (1 - self.jitter * random.random())
+
+  def call(self, fn: Callable[[], T]) -> T:
+    self._deposit()
+    attempt = 0
+    while True:
+      try:
+        return fn()
+      except Exception as e:
+        if attempt + 1 >= self.max_attempts or not self.retryable(e) or not self._withdraw():
+          raise
+
+      time.sleep(self.delay(attempt))
+      attempt += 1
+
+  async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+    self._deposit()
+    attempt = 0
+    while True:
+      try:
+        return await fn()
+      except Exception as e:
+        if attempt + 1 >= self.max_attempts or not self.retryable(e) or not self._withdraw():
+          raise
+
+      await asyncio.sleep(self.delay(attempt))
+      attempt += 1
+
+  def _deposit(self) -> None:
+    with self._lock:
+      self._tokens = min(self.budget_max, self._tokens + self.budget_ratio)
+
+  def _withdraw(self) -> bool:
+    with self._lock:
+      if self._tokens < 1:
+        return False
+      self._tokens -= 1
+      return True
+
+  def __repr__(self) -> str:
+    return f'RetryPolicy(max_attempts={self.max_attempts}, backoff={self.backoff}, max_backoff={self.max_backoff})'
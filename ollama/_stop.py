@@ -0,0 +1,88 @@
+import re
+from typing import Any, Callable, Mapping, Pattern, Sequence, Union
+
+from ollama._partial_json import IncrementalJSONParser
+
+Checker = Callable[[str, Mapping[str, Any]], bool]
+
+
+class StopCondition:
+  """
+  Client-side condition that ends a stream of `generate` or `chat` parts.
+
+  Conditions can be shared between requests: `checker()` returns a fresh function for every stream,
+  which is called with the text fragment and the part received, and returns True to stop.
+  """
+
+  def checker(self) -> Checker:
+    raise NotImplementedError
+
+
+class StopOnRegex(StopCondition):
+  """
+  Stops once the generated text matches `pattern`.
+
+  Only the latest fragment and the `overlap` characters before it are searched, so a match must be
+  at most `overlap` characters long.
+  """
+
+  def __init__(self, pattern: Union[str, Pattern[str]], overlap: int = 256) -> None:
+    self.pattern = re.compile(pattern)
+    self.overlap = overlap
+
+  def checker(self) -> Checker:
+    tail = ''
+
+    def check(fragment: str, _: Mapping[str, Any]) -> bool:
+      nonlocal tail
+      window = tail + fragment
+      if self.pattern.search(window):
+        return True
+      tail = window[-self.overlap :]
+      return False
+
+    return check
+
+
+class StopOnLength(StopCondition):
+  "Stops once at least `max_chars` characters have been generated."
+
+  def __init__(self, max_chars: int) -> None:
+    self.max_chars = max_chars
+
+  def checker(self) -> Checker:
+    length = 0
+
+    def check(fragment: str, _: Mapping[str, Any]) -> bool:
+      nonlocal length
+      length += len(fragment)
+      return length >= self.max_chars
+
+    return check
+
+
+class StopOnJSON(StopCondition):
+  "Stops once the generated text is a complete JSON object or array, ignoring anything the model adds after it."
+
+  def checker(self) -> Checker:
+    parser = IncrementalJSONParser()
+
+    def check(fragment: str, _: Mapping[str, Any]) -> bool:
+      parser.feed(fragment)
+      return parser.done
+
+    return check
+
+
+class StopUnless(StopCondition):
+  "Stops as soon as `callback`, called with every part, returns False."
+
+  def __init__(self, callback: Callable[[Mapping[str, Any]], bool]) -> None:
+    self.callback = callback
+
+  def checker(self) -> Checker:
+    return lambda _, part: not self.callback(part)
+
+
+def _checkers(conditions: Sequence[Union[StopCondition, Callable[[Mapping[str, Any]], bool]]]) -> Sequence[Checker]:
+  return [(condition if isinstance(condition, StopCondition) else StopUnless(condition)).checker() for condition in conditions]
@@ -0,0 +1,304 @@
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Generator, Iterator, List, Mapping, Optional, Sequence
+
+from ollama._metrics import StreamLatency
+from ollama._partial_json import IncrementalJSONParser, Item
+from ollama._stop import Checker
+from ollama._types import ResponseError
+
+
+class NDJSONDecoder:
+  """
+  Incrementally decodes a newline-delimited JSON stream from raw byte chunks.
+
+  A line that spans reads is kept as a list of fragments and joined once its newline arrives.
+  All complete lines of a read are parsed in a single call to `loads` as one JSON array, and only
+  reads that contain an `"error"` key are inspected for errors. `hook`, if given, is applied to every part.
+
+  >>> import json
+  >>> decoder = NDJSONDecoder(json.loads)
+  >>> list(decoder.decode(b'{"response": "Because "}\\n{"respo'))
+  [{'response': 'Because '}]
+  >>> list(decoder.decode(b'nse": "it is."}\\n'))
+  [{'response': 'it is.'}]
+  >>> list(decoder.decode(b'{"error": "out of memory"}'))
+  []
+  >>> list(decoder.flush())
+  Traceback (most recent call last):
+  ...
+  ollama._types.ResponseError: out of memory
+  """
+
+  def __init__(self, loads: Callable[[bytes], Any], hook: Optional[Callable[[Any], Any]] = None) -> None:
+    self._loads = loads
+    self._hook = hook
+    self._pending: List[bytes] = []
+
+    self.last: Any = None
+    'Last decoded part, before `hook` is applied.'
+
+  def decode(self, chunk: bytes) -> Iterator[Any]:
+    """
+    Returns the parts completed by `chunk`. `ResponseError` is raised in place of an error part.
+    """
+    end = chunk.rfind(b'\n')
+    if end < 0:
+      if chunk:
+        self._pending.append(chunk)
+      return iter(())
+
+    data = chunk[:end]
+    if self._pending:
+      self._pending.append(data)
+      data = b''.join(self._pending)
+      self._pending = []
+
+    if end + 1 < len(chunk):
+      self._pending.append(chunk[end + 1 :])
+
+    return self._parse(data)
+
+  def flush(self) -> Iterator[Any]:
+    "Returns the last part if the stream did not end with a newline."
+    data = b''.join(self._pending)
+    self._pending = []
+    return self._parse(data)
+
+  def _parse(self, data: bytes) -> Iterator[Any]:
+    if b'\n' in data:
+      lines = [line for line in data.split(b'\n') if line.strip()]
+      parts = self._loads(b'[' + b','.join(lines) + b']')
+    elif data.strip():
+      parts = [self._loads(data)]
+    else:
+      return iter(())
+
+    if parts:
+      self.last = parts[-1]
+    parts = _raise_errors(parts) if b'"error"' in data else iter(parts)
+    return map(self._hook, parts) if self._hook else parts
+
+
+def _raise_errors(parts: List[Any]) -> Iterator[Any]:
+  for part in parts:
+    if isinstance(part, dict) and (e := part.get('error')):
+      raise ResponseError(e)
+    yield part
+
+
+class StreamAccumulator:
+  """
+  Rebuilds the response of a non-streaming request from the parts of a stream.
+
+  Text fragments are collected in a list and joined once, tool calls of all parts are merged,
+  and the statistics are taken from the last part.
+
+  >>> accumulator = StreamAccumulator()
+  >>> for part in [{'response': 'Because ', 'done': False}, {'response': 'it is.', 'done': False}, {'response': '', 'done': True, 'eval_count': 2}]:
+  ...   accumulator.add(part)
+  >>> accumulator.result()
+  {'response': 'Because it is.', 'done': True, 'eval_count': 2}
+  """
+
+  def __init__(self) -> None:
+    self._text: List[str] = []
+    self._tool_calls: List[Any] = []
+    self._role: Optional[str] = None
+    self._last: Optional[Mapping[str, Any]] = None
+
+  def add(self, part: Mapping[str, Any]) -> None:
+    self._last = part
+    if (message := part.get('message')) is not None:
+      if content := message.get('content'):
+        self._text.append(content)
+      if tool_calls := message.get('tool_calls'):
+        self._tool_calls.extend(tool_calls)
+      self._role = self._role or message.get('role')
+    elif response := part.get('response'):
+      self._text.append(response)
+
+  def result(self) -> Dict[str, Any]:
+    "Returns a `GenerateResponse` or `ChatResponse` shaped dict, or an empty dict if no part was added."
+    if self._last is None:
+      return {}
+
+    result = dict(self._last)
+    if 'message' in result:
+      message = dict(result['message'])
+      message['content'] = ''.join(self._text)
+      if self._role:
+        message['role'] = self._role
+      if self._tool_calls:
+        message['tool_calls'] = self._tool_calls
+      result['message'] = message
+    elif 'response' in result:
+      result['response'] = ''.join(self._text)
+    return result
+
+
+class _BaseStream:
+  _stop: Optional[Sequence[Checker]]
+  _hook: Optional[Callable[[Any], Any]]
+  _accumulator: StreamAccumulator
+  stopped: bool
+
+  def _stopping(self, part: Mapping[str, Any]) -> bool:
+    fragment = _content(part)
+    # every checker sees every fragment, as some keep state
+    if not any([check(fragment, part) for check in self._stop]):
+      return False
+    self.stopped = True
+    return True
+
+  def _result(self) -> Mapping[str, Any]:
+    result = self._accumulator.result()
+    if self.stopped and result:
+      result['done'] = True
+      result['done_reason'] = 'client_stop'
+    return self._hook(result) if self._hook and result else result
+
+
+class Stream(_BaseStream, Iterator[Mapping[str, Any]]):
+  """
+  Iterator over the parts of a streamed response.
+
+  `collect()` consumes the rest of the stream and returns the response the request would have
+  returned with `stream=False`, including parts that were already iterated over.
+
+  Breaking out of a loop over a stream leaves its response open until the stream is garbage
+  collected. `cancel()`, or using the stream as a context manager, closes it right away: the
+  connection is released to the pool and the server stops generating.
+
+  A stream with stop conditions is cancelled as soon as one of them matches a part. That part is
+  still returned, then the stream ends and `collect()` returns the text generated so far, with
+  `done_reason` set to `'client_stop'`.
+  """
+
+  def __init__(
+    self,
+    parts: Generator[Mapping[str, Any], None, None],
+    hook: Optional[Callable[[Any], Any]] = None,
+    latency: Optional[StreamLatency] = None,
+    stop: Optional[Sequence[Checker]] = None,
+  ) -> None:
+    self._parts = parts
+    self._hook = hook
+    self._stop = stop
+    self._accumulator = StreamAccumulator()
+
+    self.latency = latency
+    'Client-side timing of the stream, if the client records it.'
+
+    self.stopped = False
+    'True if a stop condition ended the stream.'
+
+  def __iter__(self) -> 'Stream':
+    return self
+
+  def __next__(self) -> Mapping[str, Any]:
+    part = next(self._parts)
+    if self.latency is not None:
+      self.latency.chunks.append(time.perf_counter())
+    self._accumulator.add(part)
+    if self._stop and self._stopping(part):
+      self.cancel()
+    return part
+
+  def collect(self) -> Mapping[str, Any]:
+    for _ in self:
+      pass
+    return self._result()
+
+  def iter_json(self) -> Iterator[Item]:
+    """
+    Parses the text of a `format='json'` response while it streams, yielding `(key, value)` for each
+    top-level member of an object, or `(index, value)` for each element of an array, as soon as it
+    is complete. The stream can still be collected afterwards.
+    """
+    parser = IncrementalJSONParser()
+    for part in self:
+      if text := _content(part):
+        yield from parser.feed(text)
+    yield from parser.close()
+
+  def cancel(self) -> None:
+    "Closes the response. Iterating afterwards ends the stream."
+    self._parts.close()
+
+  close = cancel
+
+  def __enter__(self) -> 'Stream':
+    return self
+
+  def __exit__(self, *_) -> None:
+    self.close()
+
+
+class AsyncStream(_BaseStream, AsyncIterator[Mapping[str, Any]]):
+  """
+  Asynchronous iterator over the parts of a streamed response. See `Stream`.
+  """
+
+  def __init__(
+    self,
+    parts: AsyncGenerator[Mapping[str, Any], None],
+    hook: Optional[Callable[[Any], Any]] = None,
+    latency: Optional[StreamLatency] = None,
+    stop: Optional[Sequence[Checker]] = None,
+  ) -> None:
+    self._parts = parts
+    self._hook = hook
+    self._stop = stop
+    self._accumulator = StreamAccumulator()
+
+    self.latency = latency
+    'Client-side timing of the stream, if the client records it.'
+
+    self.stopped = False
+    'True if a stop condition ended the stream.'
+
+  def __aiter__(self) -> 'AsyncStream':
+    return self
+
+  async def __anext__(self) -> Mapping[str, Any]:
+    part = await self._parts.__anext__()
+    if self.latency is not None:
+      self.latency.chunks.append(time.perf_counter())
+    self._accumulator.add(part)
+    if self._stop and self._stopping(part):
+      await self.cancel()
+    return part
+
+  async def collect(self) -> Mapping[str, Any]:
+    async for _ in self:
+      pass
+    return self._result()
+
+  async def iter_json(self) -> AsyncIterator[Item]:
+    "Parses the text of a `format='json'` response while it streams. See `Stream.iter_json`."
+    parser = IncrementalJSONParser()
+    async for part in self:
+      if text := _content(part):
+        for item in parser.feed(text):
+          yield item
+    for item in parser.close():
+      yield item
+
+  async def cancel(self) -> None:
+    "Closes the response. Iterating afterwards ends the stream."
+    await self._parts.aclose()
+
+  aclose = cancel
+
+  async def __aenter__(self) -> 'AsyncStream':
+    return self
+
+  async def __aexit__(self, *_) -> None:
+    await self.aclose()
+
+
+def _content(part: Mapping[str, Any]) -> str:
+  "Returns the text fragment of a generate or chat part."
+  if (message := part.get('message')) is not None:
+    return message.get('content') or ''
+  return part.get('response') or ''
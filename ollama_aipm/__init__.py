@@ -1,4 +1,6 @@
-from ollama_aipm._client import Client, AsyncClient  # 导入客户端类和异步客户端类
+import threading  # 导入线程模块，用于保护默认客户端的创建
+from typing import TYPE_CHECKING
+
 from ollama_aipm._types import (  # 导入Ollama库的类型定义
   GenerateResponse,  # 生成响应类型
   ChatResponse,  # 聊天响应类型
@@ -8,6 +10,10 @@ from ollama_aipm._types import (  # 导入Ollama库的类型定义
   RequestError,  # 请求错误类型
   ResponseError,  # 响应错误类型
 )
+
+# 仅在类型检查时导入客户端类，运行时在首次使用时才导入httpx
+if TYPE_CHECKING:
+  from ollama_aipm._client import Client, AsyncClient
 # 将以下符号添加到模块的全局命名空间中
 __all__ = [
   'Client',  # 客户端类
@@ -32,18 +38,31 @@ __all__ = [
   'show',  # 显示模型详情的方法
   'ps',  # 列出运行中的进程的方法
 ]
-# 创建一个客户端实例
-_client = Client()
-# 将客户端实例的方法绑定到当前模块的命名空间
-generate = _client.generate  # 生成文本的方法
-chat = _client.chat  # 聊天交互的方法
-embed = _client.embed  # 嵌入文本的方法
-embeddings = _client.embeddings  # 获取嵌入的方法
-pull = _client.pull  # 拉取模型的方法
-push = _client.push  # 推送模型的方法
-create = _client.create  # 创建模型的方法
-delete = _client.delete  # 删除模型的方法
-list = _client.list  # 列出模型的方法
-copy = _client.copy  # 复制模型的方法
-show = _client.show  # 显示模型详情的方法
-ps = _client.ps  # 列出运行中的进程的方法
+# 默认客户端在首次调用模块级函数时创建（不能命名为_client，否则会被子模块ollama_aipm._client覆盖）
+_default = None
+_default_lock = threading.Lock()
+
+
+def _default_client() -> 'Client':
+  global _default
+  with _default_lock:
+    if _default is None:
+      from ollama_aipm._client import Client
+
+      _default = Client()
+    return _default
+
+
+# 延迟导入客户端类，并将默认客户端的方法绑定到当前模块的命名空间
+def __getattr__(name: str):
+  if name in ('Client', 'AsyncClient'):
+    from ollama_aipm import _client
+
+    value = getattr(_client, name)
+  elif name in __all__:
+    value = getattr(_default_client(), name)
+  else:
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+  globals()[name] = value  # 缓存结果，之后的访问不再经过__getattr__
+  return value
@@ -5,6 +5,7 @@ import httpx  # 导入HTTP客户端模块
 import binascii  # 导入二进制和ASCII转换模块
 import platform  # 导入平台信息模块
 import urllib.parse  # 导入URL解析模块
+import functools  # 导入函数工具模块，用于缓存版本和用户代理
 from os import PathLike  # 导入路径类
 from pathlib import Path  # 导入路径操作模块
 from copy import deepcopy  # 导入深拷贝函数
@@ -20,16 +21,34 @@ if sys.version_info < (3, 9):
 else:
   from collections.abc import Iterator, AsyncIterator  # 从collections.abc导入迭代器相关类型
   
-from importlib import metadata  # 导入元数据模块，用于获取包版本信息
-# 尝试获取ollama包的版本信息
-try:
-  __version__ = metadata.version('ollama')
-except metadata.PackageNotFoundError:
-  __version__ = '0.0.0'  # 如果找不到版本信息，则默认为'0.0.0'
 # 从ollama_aipm._types导入类型定义
 from ollama_aipm._types import Message, Options, RequestError, ResponseError, Tool
 
 
+# __version__在首次访问时才计算
+def __getattr__(name: str):
+  if name == '__version__':
+    return _version()
+  raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+@functools.lru_cache(maxsize=None)
+def _version() -> str:
+  from importlib import metadata  # 导入元数据模块，用于获取包版本信息
+
+  # 尝试获取ollama包的版本信息
+  try:
+    return metadata.version('ollama')
+  except metadata.PackageNotFoundError:
+    return '0.0.0'  # 如果找不到版本信息，则默认为'0.0.0'
+
+
+# 用户代理包含ollama版本、平台信息、Python版本，只在创建第一个客户端时计算一次
+@functools.lru_cache(maxsize=None)
+def _user_agent() -> str:
+  return f'ollama-python/{_version()} ({platform.machine()} {platform.system().lower()}) Python/{platform.python_version()}'
+
+
 class BaseClient:
   def __init__(
     self,
@@ -52,7 +71,7 @@ class BaseClient:
     # 设置接受的内容类型为JSON
     headers['Accept'] = 'application/json'
     # 设置用户代理，包含ollama版本、平台信息、Python版本
-    headers['User-Agent'] = f'ollama-python/{__version__} ({platform.machine()} {platform.system().lower()}) Python/{platform.python_version()}'
+    headers['User-Agent'] = _user_agent()
     # 初始化客户端实例，使用提供的参数
     self._client = client(
       base_url=_parse_host(host or os.getenv('OLLAMA_HOST')),  # 解析主机地址，优先使用host参数，否则使用环境变量
@@ -0,0 +1,22 @@
+import pytest
+from pytest_httpserver import HTTPServer
+
+
+@pytest.fixture
+def httpserver2():
+  "A second HTTP server for tests of multi-host clients."
+  server = HTTPServer()
+  server.start()
+  yield server
+  server.clear()
+  server.stop()
+
+
+@pytest.fixture
+def threaded_httpserver():
+  "An HTTP server that handles requests concurrently, for tests of concurrent clients."
+  server = HTTPServer(threaded=True)
+  server.start()
+  yield server
+  server.clear()
+  server.stop()
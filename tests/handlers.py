@@ -0,0 +1,54 @@
+"Request handlers shared by tests."
+
+import json
+import time
+import threading
+from typing import Any, Callable, List, Optional
+from werkzeug.wrappers import Request, Response
+
+
+class EmbedHandler:
+  """
+  Handles `/api/embed` by embedding every text with `embed` and records the input of each request.
+  Requests for which `fail` returns True fail with a 500 and are not recorded.
+  """
+
+  def __init__(self, embed: Callable[[str], List[Any]] = lambda text: [len(text)], fail: Optional[Callable[[List[str]], bool]] = None):
+    self.embed = embed
+    self.fail = fail
+    self.inputs: List[List[str]] = []
+
+  def __call__(self, request: Request):
+    body = json.loads(request.data)
+    if self.fail and self.fail(body['input']):
+      return Response(json.dumps({'error': 'failed'}), status=500)
+    self.inputs.append(body['input'])
+    return Response(json.dumps({'model': body['model'], 'embeddings': [self.embed(text) for text in body['input']]}), content_type='application/json')
+
+
+def chat_handler(_: Request):
+  "Streams the chat response `'Because it is.'` in three parts, then a final part with `eval_count`."
+
+  def generate():
+    for message in ['Because ', 'it ', 'is.']:
+      yield json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': message}, 'done': False}) + '\n'
+    yield json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': ''}, 'done': True, 'eval_count': 3}) + '\n'
+
+  return Response(generate())
+
+
+def endless_handler(stopped: threading.Event):
+  "Returns a `/api/generate` handler that streams for several seconds and sets `stopped` once the client disconnects."
+
+  def handler(_: Request):
+    def generate():
+      try:
+        for i in range(500):
+          yield json.dumps({'model': 'dummy', 'response': f'{i} ', 'done': False}) + '\n'
+          time.sleep(0.01)
+      finally:
+        stopped.set()
+
+    return Response(generate())
+
+  return handler
@@ -0,0 +1,205 @@
+import json
+import time
+import asyncio
+import pytest
+import threading
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._batch import _amap, _map
+from ollama._client import Client, AsyncClient
+from ollama._types import ResponseError
+
+
+class Handler:
+  "Answers generate requests with the prompt after sleeping for `delays[prompt]` seconds, and records the peak concurrency."
+
+  def __init__(self, delays=None):
+    self.delays = delays or {}
+    self.inflight = 0
+    self.peak = 0
+    self.lock = threading.Lock()
+
+  def __call__(self, request: Request):
+    prompt = json.loads(request.data)['prompt']
+    with self.lock:
+      self.inflight += 1
+      self.peak = max(self.peak, self.inflight)
+    try:
+      time.sleep(self.delays.get(prompt, 0.01))
+      if prompt == 'fail':
+        return Response(json.dumps({'error': 'failed'}), status=500)
+      return Response(json.dumps({'model': 'dummy', 'response': prompt, 'done': True}), content_type='application/json')
+    finally:
+      with self.lock:
+        self.inflight -= 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_generate_many_concurrency(threaded_httpserver: HTTPServer):
+  handler = Handler()
+  threaded_httpserver.expect_request('/api/generate', method='POST').respond_with_handler(handler)
+
+  client = AsyncClient(threaded_httpserver.url_for('/'))
+  requests = ({'model': 'dummy', 'prompt': str(i)} for i in range(20))
+  results = [(index, response['response']) async for index, response in client.generate_many(requests, concurrency=3)]
+
+  assert sorted(results) == [(i, str(i)) for i in range(20)]
+  assert handler.peak == 3
+
+
+@pytest.mark.asyncio
+async def test_async_client_generate_many_completion_order(threaded_httpserver: HTTPServer):
+  threaded_httpserver.expect_request('/api/generate', method='POST').respond_with_handler(Handler({'slow': 0.4, 'b': 0.15}))
+
+  client = AsyncClient(threaded_httpserver.url_for('/'))
+  requests = [{'model': 'dummy', 'prompt': prompt} for prompt in ['slow', 'a', 'b']]
+  results = [index async for index, _ in client.generate_many(requests, concurrency=3)]
+  assert results == [1, 2, 0]
+
+
+@pytest.mark.asyncio
+async def test_async_client_generate_many_ordered(threaded_httpserver: HTTPServer):
+  handler = Handler({'slow': 0.3})
+  threaded_httpserver.expect_request('/api/generate', method='POST').respond_with_handler(handler)
+
+  client = AsyncClient(threaded_httpserver.url_for('/'))
+  requests = [{'model': 'dummy', 'prompt': prompt} for prompt in ['slow', 'a', 'b', 'c', 'd']]
+  results = [(index, response['response']) async for index, response in client.generate_many(requests, concurrency=2, ordered=True)]
+  assert results == [(0, 'slow'), (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')]
+  assert handler.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_async_client_chat_many_async_iterable(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_json({'model': 'dummy', 'message': {'role': 'assistant', 'content': 'Because it is.'}})
+
+  async def requests():
+    for _ in range(4):
+      yield {'model': 'dummy', 'messages': [{'role': 'user', 'content': 'Why is the sky blue?'}]}
+
+  client = AsyncClient(httpserver.url_for('/'))
+  results = [response async for _, response in client.chat_many(requests(), ordered=True)]
+  assert len(results) == 4
+  assert all(response['message']['content'] == 'Because it is.' for response in results)
+
+
+@pytest.mark.asyncio
+async def test_async_client_generate_many_error(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(Handler())
+
+  client = AsyncClient(httpserver.url_for('/'))
+  requests = [{'model': 'dummy', 'prompt': prompt} for prompt in ['a', 'fail', 'b']]
+  with pytest.raises(ResponseError):
+    async for _ in client.generate_many(requests, concurrency=1):
+      pass
+
+  results = [result async for _, result in client.generate_many(requests, ordered=True, return_exceptions=True)]
+  assert results[0]['response'] == 'a'
+  assert isinstance(results[1], ResponseError)
+  assert results[2]['response'] == 'b'
+
+
+@pytest.mark.asyncio
+async def test_amap_lazy():
+  consumed = 0
+  running = 0
+  peak = 0
+
+  def requests():
+    nonlocal consumed
+    while True:
+      consumed += 1
+      yield {'value': consumed}
+
+  async def fn(value):
+    nonlocal running, peak
+    running += 1
+    peak = max(peak, running)
+    await asyncio.sleep(0.001 * (value % 3))
+    running -= 1
+    return value
+
+  results = _amap(fn, requests(), 4, True, False)
+  assert [await results.__anext__() for _ in range(10)] == [(i, i + 1) for i in range(10)]
+  await results.aclose()
+
+  assert peak <= 4
+  assert consumed <= 14
+  assert running == 0
+
+
+@pytest.mark.asyncio
+async def test_amap_invalid_concurrency():
+  with pytest.raises(ValueError):
+    await _amap(asyncio.sleep, [], 0, False, False).__anext__()
+
+
+def test_client_generate_many(threaded_httpserver: HTTPServer):
+  handler = Handler({'slow': 0.3})
+  threaded_httpserver.expect_request('/api/generate', method='POST').respond_with_handler(handler)
+
+  client = Client(threaded_httpserver.url_for('/'))
+  requests = [{'model': 'dummy', 'prompt': prompt} for prompt in ['slow', 'a', 'b', 'c', 'd']]
+  results = [(index, response['response']) for index, response in client.generate_many(requests, concurrency=2)]
+  assert results == [(0, 'slow'), (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')]
+  assert handler.peak == 2
+
+
+def test_client_map_concurrency(threaded_httpserver: HTTPServer):
+  handler = Handler()
+  threaded_httpserver.expect_request('/api/generate', method='POST').respond_with_handler(handler)
+
+  client = Client(threaded_httpserver.url_for('/'), max_connections=4)
+  requests = ({'model': 'dummy', 'prompt': str(i)} for i in range(20))
+  results = sorted((index, response['response']) for index, response in client.map('generate', requests, concurrency=4))
+
+  assert results == [(i, str(i)) for i in range(20)]
+  assert handler.peak == 4
+  assert len(client._client._transport._pool.connections) <= 4
+
+
+def test_client_chat_many_completion_order(threaded_httpserver: HTTPServer):
+  def handler(request: Request):
+    content = json.loads(request.data)['messages'][0]['content']
+    time.sleep(0.3 if content == 'slow' else 0.01)
+    return Response(json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': content}}), content_type='application/json')
+
+  threaded_httpserver.expect_request('/api/chat', method='POST').respond_with_handler(handler)
+
+  client = Client(threaded_httpserver.url_for('/'))
+  requests = [{'model': 'dummy', 'messages': [{'role': 'user', 'content': content}]} for content in ['slow', 'fast']]
+  assert [index for index, _ in client.chat_many(requests, ordered=False)] == [1, 0]
+
+
+def test_client_map_error(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(Handler())
+
+  client = Client(httpserver.url_for('/'))
+  requests = [{'model': 'dummy', 'prompt': prompt} for prompt in ['a', 'fail', 'b']]
+  with pytest.raises(ResponseError):
+    list(client.map(client.generate, requests, concurrency=1))
+
+  results = [result for _, result in client.generate_many(requests, ordered=True, return_exceptions=True)]
+  assert results[0]['response'] == 'a'
+  assert isinstance(results[1], ResponseError)
+  assert results[2]['response'] == 'b'
+
+
+def test_map_lazy():
+  consumed = 0
+
+  def requests():
+    nonlocal consumed
+    while True:
+      consumed += 1
+      yield {'value': consumed}
+
+  def fn(value):
+    time.sleep(0.001 * (value % 3))
+    return value
+
+  results = _map(fn, requests(), 4, True, False)
+  assert [next(results) for _ in range(10)] == [(i, i + 1) for i in range(10)]
+  results.close()
+  assert consumed <= 14
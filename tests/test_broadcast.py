@@ -0,0 +1,133 @@
+import json
+import asyncio
+import pytest
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import AsyncClient
+from ollama._broadcast import Broadcast
+from ollama._types import ResponseError
+
+
+async def parts(n: int, error: bool = False):
+  for i in range(n):
+    yield {'model': 'dummy', 'message': {'role': 'assistant', 'content': f'{i} '}, 'done': False}
+    await asyncio.sleep(0)
+  if error:
+    raise ResponseError('out of memory')
+  yield {'model': 'dummy', 'message': {'role': 'assistant', 'content': ''}, 'done': True, 'eval_count': n}
+
+
+async def consume(subscriber, delay: float = 0):
+  received = []
+  async for part in subscriber:
+    received.append(part)
+    await asyncio.sleep(delay)
+  return received
+
+
+def text(received):
+  return ''.join(part['message']['content'] for part in received)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_block():
+  broadcast = Broadcast(parts(20), maxsize=2)
+  fast, slow = broadcast.subscribe(), broadcast.subscribe()
+
+  a, b = await asyncio.gather(consume(fast), consume(slow, delay=0.001))
+  assert a == b
+  assert len(a) == 21
+  assert slow.max_lag <= 2
+  assert (slow.dropped, slow.coalesced, slow.delivered) == (0, 0, 21)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_drop_oldest():
+  broadcast = Broadcast(parts(20))
+  fast, slow = broadcast.subscribe(), broadcast.subscribe(maxsize=2, overflow='drop_oldest')
+
+  a, b = await asyncio.gather(consume(fast), consume(slow, delay=0.01))
+  assert len(a) == 21
+  assert len(b) + slow.dropped == 21
+  assert slow.dropped > 0
+  assert b[-1]['done']
+
+
+@pytest.mark.asyncio
+async def test_broadcast_coalesce():
+  broadcast = Broadcast(parts(20))
+  fast, slow = broadcast.subscribe(), broadcast.subscribe(maxsize=2, overflow='coalesce')
+
+  a, b = await asyncio.gather(consume(fast), consume(slow, delay=0.01))
+  assert text(a) == text(b)
+  assert len(b) < len(a)
+  assert slow.coalesced == len(a) - len(b)
+  assert b[-1]['done'] and b[-1]['eval_count'] == 20
+
+
+@pytest.mark.asyncio
+async def test_broadcast_error():
+  broadcast = Broadcast(parts(3, error=True))
+  subscribers = [broadcast.subscribe(), broadcast.subscribe()]
+
+  for subscriber in subscribers:
+    received = []
+    with pytest.raises(ResponseError):
+      async for part in subscriber:
+        received.append(part)
+    assert len(received) == 3
+
+
+@pytest.mark.asyncio
+async def test_broadcast_detach():
+  broadcast = Broadcast(parts(20), maxsize=1)
+  first, second = broadcast.subscribe(), broadcast.subscribe()
+
+  async def one():
+    part = await first.__anext__()
+    await first.aclose()
+    return part
+
+  part, received = await asyncio.gather(one(), consume(second))
+  assert part['message']['content'] == '0 '
+  assert len(received) == 21
+  assert first.lag == 0
+
+
+@pytest.mark.asyncio
+async def test_broadcast_subscribe_started():
+  broadcast = Broadcast(parts(1))
+  subscriber = broadcast.subscribe()
+  await subscriber.__anext__()
+  with pytest.raises(RuntimeError):
+    broadcast.subscribe()
+  await broadcast.aclose()
+
+
+def test_broadcast_invalid():
+  broadcast = Broadcast(parts(1))
+  with pytest.raises(ValueError):
+    broadcast.subscribe(overflow='grow')
+  with pytest.raises(ValueError):
+    broadcast.subscribe(maxsize=0)
+
+
+@pytest.mark.asyncio
+async def test_async_client_broadcast(httpserver: HTTPServer):
+  def stream_handler(_: Request):
+    def generate():
+      for message in ['Because ', 'it ', 'is.']:
+        yield json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': message}, 'done': False}) + '\n'
+      yield json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': ''}, 'done': True}) + '\n'
+
+    return Response(generate())
+
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(stream_handler)
+
+  client = AsyncClient(httpserver.url_for('/'))
+  broadcast = Broadcast(await client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True))
+  subscribers = [broadcast.subscribe(), broadcast.subscribe(overflow='coalesce', maxsize=1)]
+
+  for received in await asyncio.gather(*(consume(subscriber) for subscriber in subscribers)):
+    assert text(received) == 'Because it is.'
@@ -0,0 +1,144 @@
+import pytest
+import threading
+from array import array
+from pytest_httpserver import HTTPServer
+
+from ollama._cache import EmbeddingCache
+from ollama._client import Client, AsyncClient
+
+from handlers import EmbedHandler
+
+
+def serve(httpserver: HTTPServer, digest: str = 'sha256:1') -> EmbedHandler:
+  "Serves `embed`, embedding the text `t` as `[len(t), 0.5]`, and `list()` with the digest of `dummy`."
+  handler = EmbedHandler(lambda text: [len(text), 0.5])
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': [{'name': 'dummy:latest', 'model': 'dummy:latest', 'digest': digest}]})
+  return handler
+
+
+def test_client_embedding_cache(httpserver: HTTPServer):
+  handler = serve(httpserver)
+  cache = EmbeddingCache()
+  client = Client(httpserver.url_for('/'), embedding_cache=cache)
+
+  assert client.embed('dummy', ['a', 'bb']) == {'model': 'dummy', 'embeddings': [[1, 0.5], [2, 0.5]]}
+  assert client.embed('dummy', ['bb', 'ccc', 'a', 'ccc']) == {'model': 'dummy', 'embeddings': [[2, 0.5], [3, 0.5], [1, 0.5], [3, 0.5]]}
+  assert client.embed('dummy', 'ccc') == {'model': 'dummy', 'embeddings': [[3, 0.5]]}
+
+  assert handler.inputs == [['a', 'bb'], ['ccc']]
+  assert (cache.memory_hits, cache.disk_hits, cache.misses) == (3, 0, 3)
+  assert cache.hit_rate == 0.5
+  assert [request.path for request, _ in httpserver.log].count('/api/tags') == 1
+
+
+def test_client_embedding_cache_keys(httpserver: HTTPServer):
+  handler = serve(httpserver)
+  client = Client(httpserver.url_for('/'), embedding_cache=EmbeddingCache())
+
+  client.embed('dummy', 'a')
+  client.embed('dummy', 'a', truncate=False)
+  client.embed('dummy', 'a', options={'num_ctx': 512})
+  client.embed('dummy:latest', 'a')
+  client.embed('dummy', 'a', options={'num_ctx': 512})
+
+  assert len(handler.inputs) == 3
+
+
+def test_client_embedding_cache_digest(httpserver: HTTPServer):
+  handler = serve(httpserver, digest='sha256:1')
+  cache = EmbeddingCache(digest_ttl=0)
+  client = Client(httpserver.url_for('/'), embedding_cache=cache)
+  client.embed('dummy', 'a')
+
+  httpserver.clear()
+  handler = serve(httpserver, digest='sha256:2')
+  client.embed('dummy', 'a')
+  assert handler.inputs == [['a']]
+
+
+def test_client_embedding_cache_lru(httpserver: HTTPServer):
+  handler = serve(httpserver)
+  cache = EmbeddingCache(max_entries=2)
+  client = Client(httpserver.url_for('/'), embedding_cache=cache)
+
+  for text in ['a', 'b', 'a', 'c', 'b']:
+    client.embed('dummy', text)
+
+  assert handler.inputs == [['a'], ['b'], ['c'], ['b']]
+
+
+def test_client_embedding_cache_disk(httpserver: HTTPServer, tmp_path):
+  handler = serve(httpserver)
+  client = Client(httpserver.url_for('/'), embedding_cache=EmbeddingCache(tmp_path / 'embeddings.db'))
+  client.embed('dummy', ['a', 'bb'])
+
+  cache = EmbeddingCache(tmp_path / 'embeddings.db')
+  client = Client(httpserver.url_for('/'), embedding_cache=cache)
+  response = client.embed('dummy', ['bb', 'a', 'ccc'], embedding_format='array')
+
+  assert response['embeddings'] == array('f', [2, 0.5, 1, 0.5, 3, 0.5])
+  assert handler.inputs == [['a', 'bb'], ['ccc']]
+  assert (cache.memory_hits, cache.disk_hits, cache.misses) == (0, 2, 1)
+
+  client.embed('dummy', 'a')
+  assert cache.memory_hits == 1
+
+  cache.clear()
+  client.embed('dummy', 'a')
+  assert handler.inputs[-1] == ['a']
+  cache.close()
+
+
+def test_client_embedding_cache_numpy(httpserver: HTTPServer):
+  numpy = pytest.importorskip('numpy')
+  serve(httpserver)
+  client = Client(httpserver.url_for('/'), embedding_cache=EmbeddingCache())
+
+  client.embed('dummy', 'a')
+  embeddings = client.embed('dummy', ['a', 'bb'], embedding_format='numpy')['embeddings']
+  assert embeddings.shape == (2, 2)
+  assert embeddings.dtype == numpy.float32
+
+
+def test_client_embedding_cache_unknown_model(httpserver: HTTPServer):
+  handler = serve(httpserver)
+  client = Client(httpserver.url_for('/'), embedding_cache=EmbeddingCache())
+
+  client.embed('other', 'a')
+  client.embed('other', 'a')
+  assert handler.inputs == [['a']]
+
+
+@pytest.mark.asyncio
+async def test_async_client_embedding_cache(httpserver: HTTPServer):
+  handler = serve(httpserver)
+  cache = EmbeddingCache()
+  client = AsyncClient(httpserver.url_for('/'), embedding_cache=cache)
+
+  assert await client.embed('dummy', ['a', 'bb']) == {'model': 'dummy', 'embeddings': [[1, 0.5], [2, 0.5]]}
+  assert await client.embed('dummy', ['bb', 'ccc']) == {'model': 'dummy', 'embeddings': [[2, 0.5], [3, 0.5]]}
+  assert handler.inputs == [['a', 'bb'], ['ccc']]
+  assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_embedding_cache_disk(httpserver: HTTPServer, tmp_path, monkeypatch):
+  handler = serve(httpserver)
+  cache = EmbeddingCache(tmp_path / 'embeddings.db')
+  client = AsyncClient(httpserver.url_for('/'), embedding_cache=cache)
+
+  threads = []
+  for name in ('_get', '_put'):
+    method = getattr(cache, name)
+    monkeypatch.setattr(cache, name, lambda *args, method=method: threads.append(threading.get_ident()) or method(*args))
+
+  assert await client.embed('dummy', ['a', 'bb']) == {'model': 'dummy', 'embeddings': [[1, 0.5], [2, 0.5]]}
+  cache._memory.clear()
+  assert await client.embed('dummy', ['bb', 'a']) == {'model': 'dummy', 'embeddings': [[2, 0.5], [1, 0.5]]}
+
+  assert handler.inputs == [['a', 'bb']]
+  assert cache.disk_hits == 2
+  assert len(threads) == 3
+  assert threading.get_ident() not in threads
+  cache.close()
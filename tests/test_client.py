@@ -1,14 +1,22 @@
 import os
 import io
+import gzip
 import json
+import httpx
 import pytest
 import tempfile
+import threading
 from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pytest_httpserver import HTTPServer, URIPattern
+from werkzeug.serving import make_server
 from werkzeug.wrappers import Request, Response
 from PIL import Image
 
 from ollama._client import Client, AsyncClient
+from ollama._retry import RetryPolicy
+from ollama._compression import CompressionPolicy
+from ollama._types import ResponseError
 
 
 class PrefixPattern(URIPattern):
@@ -520,6 +528,293 @@ def test_client_create_blob_exists(httpserver: HTTPServer):
     assert response == 'sha256:e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
 
 
+def test_client_retry(httpserver: HTTPServer):
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_response(Response(status=503))
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_response(Response(status=502))
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client(httpserver.url_for('/'), retry=RetryPolicy(backoff=0))
+  assert client.list() == {'models': []}
+  assert len(httpserver.log) == 3
+
+
+def test_client_retry_exhausted(httpserver: HTTPServer):
+  httpserver.expect_request('/api/tags', method='GET').respond_with_response(Response(status=503))
+
+  client = Client(httpserver.url_for('/'), retry=RetryPolicy(max_attempts=2, backoff=0))
+  with pytest.raises(ResponseError) as e:
+    client.list()
+
+  assert e.value.status_code == 503
+  assert len(httpserver.log) == 2
+
+
+def test_client_retry_budget(httpserver: HTTPServer):
+  httpserver.expect_request('/api/tags', method='GET').respond_with_response(Response(status=503))
+
+  client = Client(httpserver.url_for('/'), retry=RetryPolicy(backoff=0, budget_ratio=0, budget_max=1))
+  for _ in range(2):
+    with pytest.raises(ResponseError):
+      client.list()
+
+  assert len(httpserver.log) == 3
+
+
+def test_client_retry_not_idempotent(httpserver: HTTPServer):
+  httpserver.expect_request('/api/pull', method='POST').respond_with_response(Response(status=503))
+
+  client = Client(httpserver.url_for('/'), retry=RetryPolicy(backoff=0))
+  with pytest.raises(ResponseError):
+    client.pull('dummy')
+
+  assert len(httpserver.log) == 1
+
+
+def test_client_retry_transport_error():
+  attempts = []
+
+  def handler(request: httpx.Request):
+    attempts.append(request)
+    if len(attempts) < 3:
+      raise httpx.ConnectError('connection refused', request=request)
+    return httpx.Response(200, json={'models': []})
+
+  client = Client(transport=httpx.MockTransport(handler), retry=RetryPolicy(backoff=0))
+  assert client.ps() == {'models': []}
+  assert len(attempts) == 3
+
+
+def test_client_retry_stream(httpserver: HTTPServer):
+  def stream_handler(_: Request):
+    def generate():
+      yield json.dumps({'model': 'dummy', 'response': 'Because '}) + '\n'
+      yield json.dumps({'error': 'out of memory'}) + '\n'
+
+    return Response(generate())
+
+  httpserver.expect_ordered_request('/api/generate', method='POST').respond_with_response(Response(status=503))
+  httpserver.expect_ordered_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+
+  client = Client(httpserver.url_for('/'), retry=RetryPolicy(backoff=0))
+  response = client.generate('dummy', 'Why is the sky blue?', stream=True)
+  assert next(response)['response'] == 'Because '
+
+  with pytest.raises(ResponseError):
+    next(response)
+
+  assert len(httpserver.log) == 2
+
+
+def gzip_handler(request: Request):
+  assert request.headers['Content-Encoding'] == 'gzip'
+  body = json.loads(gzip.decompress(request.get_data()))
+  return Response(json.dumps({'message': {'role': 'assistant', 'content': str(len(body['messages']))}}), content_type='application/json')
+
+
+def test_client_compression_request(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(gzip_handler)
+
+  compression = CompressionPolicy(threshold=1024)
+  client = Client(httpserver.url_for('/'), compression=compression)
+  messages = [{'role': 'user', 'content': 'Why is the sky blue?'}] * 100
+  response = client.chat('dummy', messages=messages)
+
+  assert response['message']['content'] == '100'
+  assert compression.request_bytes > 1024
+  assert compression.request_bytes_sent < compression.request_bytes
+  assert compression.bytes_saved > 0
+
+
+def test_client_compression_below_threshold(httpserver: HTTPServer):
+  httpserver.expect_request('/api/show', method='POST', json={'name': 'dummy'}, headers={'Accept-Encoding': 'gzip, deflate'}).respond_with_json({'modelfile': ''})
+
+  compression = CompressionPolicy(threshold=1024)
+  client = Client(httpserver.url_for('/'), compression=compression)
+  assert client.show('dummy') == {'modelfile': ''}
+  assert 'Content-Encoding' not in httpserver.log[0][0].headers
+  assert compression.request_bytes == compression.request_bytes_sent
+
+
+def test_client_compression_response(httpserver: HTTPServer):
+  body = json.dumps({'models': [{'name': f'model-{i}'} for i in range(100)]}).encode('utf-8')
+  httpserver.expect_request('/api/tags', method='GET').respond_with_response(Response(gzip.compress(body), headers={'Content-Encoding': 'gzip'}, content_type='application/json'))
+
+  compression = CompressionPolicy()
+  client = Client(httpserver.url_for('/'), compression=compression)
+  assert len(client.list()['models']) == 100
+
+  assert compression.response_bytes == len(body)
+  assert compression.response_bytes_received < len(body)
+  assert compression.bytes_saved == len(body) - compression.response_bytes_received
+
+
+def test_client_compression_stream(httpserver: HTTPServer):
+  def stream_handler(request: Request):
+    assert request.headers['Accept-Encoding'] == 'identity'
+    assert request.headers['Content-Encoding'] == 'deflate'
+    return Response(json.dumps({'model': 'dummy', 'response': 'Because it is.'}) + '\n')
+
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+
+  client = Client(httpserver.url_for('/'), compression=CompressionPolicy(encoding='deflate', threshold=0))
+  response = client.generate('dummy', 'Why is the sky blue? ' * 100, stream=True)
+  assert [part['response'] for part in response] == ['Because it is.']
+
+
+def test_client_compression_invalid_encoding():
+  with pytest.raises(ValueError):
+    CompressionPolicy(encoding='br')
+
+
+@pytest.fixture
+def unixserver():
+  @Request.application
+  def app(request: Request):
+    return Response(json.dumps({'path': request.path, 'host': request.host}), content_type='application/json')
+
+  with tempfile.TemporaryDirectory() as temp:
+    server = make_server(f'unix://{temp}/ollama.sock', 0, app)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f'unix://{temp}/ollama.sock'
+    server.shutdown()
+    thread.join()
+
+
+def test_client_unix_socket(unixserver):
+  client = Client(unixserver)
+  assert client.ps() == {'path': '/api/ps', 'host': 'localhost'}
+
+
+def test_client_unix_socket_env(unixserver, monkeypatch):
+  monkeypatch.setenv('OLLAMA_HOST', unixserver)
+  client = Client()
+  assert client.ps() == {'path': '/api/ps', 'host': 'localhost'}
+
+
+@pytest.mark.asyncio
+async def test_async_client_unix_socket(unixserver):
+  client = AsyncClient(unixserver)
+  assert await client.ps() == {'path': '/api/ps', 'host': 'localhost'}
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def do_HEAD(self):
+    self.server.log.append((self.command, self.path))
+    self.send_response(200)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+  def do_GET(self):
+    self.server.log.append((self.command, self.path))
+    body = json.dumps({'models': []}).encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args): ...
+
+
+@pytest.fixture
+def keepaliveserver():
+  server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+  server.daemon_threads = True
+  server.log = []
+  thread = threading.Thread(target=server.serve_forever)
+  thread.start()
+  yield server
+  server.shutdown()
+  thread.join()
+
+
+def test_client_warmup(keepaliveserver):
+  client = Client(f'127.0.0.1:{keepaliveserver.server_port}')
+  client.warmup(3)
+
+  pool = client._client._transport._pool
+  assert keepaliveserver.log == [('HEAD', '/')] * 3
+  assert len(pool.connections) == 3
+  assert all(connection.is_idle() for connection in pool.connections)
+
+  client.list()
+  assert len(pool.connections) == 3
+
+
+def test_client_limits():
+  client = Client(max_connections=8, max_keepalive_connections=4, keepalive_expiry=60)
+  pool = client._client._transport._pool
+  assert pool._max_connections == 8
+  assert pool._max_keepalive_connections == 4
+  assert pool._keepalive_expiry == 60
+
+
+@pytest.mark.asyncio
+async def test_async_client_warmup(keepaliveserver):
+  client = AsyncClient(f'127.0.0.1:{keepaliveserver.server_port}')
+  await client.warmup(3)
+
+  pool = client._client._transport._pool
+  assert keepaliveserver.log == [('HEAD', '/')] * 3
+  assert len(pool.connections) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_client_retry(httpserver: HTTPServer):
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_response(Response(status=503))
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = AsyncClient(httpserver.url_for('/'), retry=RetryPolicy(backoff=0))
+  assert await client.list() == {'models': []}
+  assert len(httpserver.log) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_client_retry_stream(httpserver: HTTPServer):
+  def stream_handler(_: Request):
+    def generate():
+      for message in ['Because ', 'it ', 'is.']:
+        yield json.dumps({'model': 'dummy', 'response': message}) + '\n'
+
+    return Response(generate())
+
+  httpserver.expect_ordered_request('/api/generate', method='POST').respond_with_response(Response(status=503))
+  httpserver.expect_ordered_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+
+  client = AsyncClient(httpserver.url_for('/'), retry=RetryPolicy(backoff=0))
+  response = await client.generate('dummy', 'Why is the sky blue?', stream=True)
+  assert [part['response'] async for part in response] == ['Because ', 'it ', 'is.']
+  assert len(httpserver.log) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_client_compression(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(gzip_handler)
+
+  compression = CompressionPolicy(threshold=1024)
+  client = AsyncClient(httpserver.url_for('/'), compression=compression)
+  messages = [{'role': 'user', 'content': 'Why is the sky blue?'}] * 100
+  response = await client.chat('dummy', messages=messages)
+
+  assert response['message']['content'] == '100'
+  assert compression.bytes_saved > 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_http2(httpserver: HTTPServer):
+  pytest.importorskip('h2')
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = AsyncClient(httpserver.url_for('/'), http2=True)
+  assert client._client._transport._pool._http2
+  # a plain-http server is still reached over HTTP/1.1
+  response = await client.list()
+  assert response == {'models': []}
+
+
 @pytest.mark.asyncio
 async def test_async_client_chat(httpserver: HTTPServer):
   httpserver.expect_ordered_request(
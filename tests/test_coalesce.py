@@ -0,0 +1,128 @@
+import gc
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pytest_httpserver import HTTPServer
+
+from ollama._client import Client, AsyncClient
+from ollama._coalesce import EmbedCoalescer, AsyncEmbedCoalescer
+from ollama._types import ResponseError
+
+from handlers import EmbedHandler
+
+
+def test_embed_coalescer(threaded_httpserver: HTTPServer):
+  handler = EmbedHandler()
+  threaded_httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+
+  coalescer = EmbedCoalescer(Client(threaded_httpserver.url_for('/')), max_batch=64, max_wait=0.2)
+  texts = ['x' * i for i in range(1, 9)]
+  with ThreadPoolExecutor(8) as executor:
+    responses = list(executor.map(lambda text: coalescer.embed('dummy', text), texts))
+
+  assert responses == [{'model': 'dummy', 'embeddings': [[i]]} for i in range(1, 9)]
+  assert len(handler.inputs) == 1
+  assert sorted(handler.inputs[0]) == texts
+  assert (coalescer.calls, coalescer.batches) == (8, 1)
+
+
+def test_embed_coalescer_max_batch(threaded_httpserver: HTTPServer):
+  handler = EmbedHandler()
+  threaded_httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+
+  coalescer = EmbedCoalescer(Client(threaded_httpserver.url_for('/')), max_batch=3, max_wait=0.2)
+  with ThreadPoolExecutor(6) as executor:
+    responses = list(executor.map(lambda text: coalescer.embed('dummy', [text, text]), ['a', 'bb', 'ccc', 'dddd']))
+
+  assert [response['embeddings'] for response in responses] == [[[i], [i]] for i in range(1, 5)]
+  assert all(len(batch) >= 3 for batch in handler.inputs)
+  assert sum(len(batch) for batch in handler.inputs) == 8
+
+
+def test_embed_coalescer_keys(httpserver: HTTPServer):
+  handler = EmbedHandler()
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+
+  coalescer = EmbedCoalescer(Client(httpserver.url_for('/')), max_wait=0.05)
+  with ThreadPoolExecutor(3) as executor:
+    list(executor.map(lambda options: coalescer.embed('dummy', 'a', options=options), [{'seed': 1}, {'seed': 2}, {'seed': 1}]))
+
+  assert sorted(handler.inputs) == [['a'], ['a', 'a']]
+
+
+def test_embed_coalescer_error(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(EmbedHandler(fail=lambda inputs: 'fail' in inputs))
+
+  coalescer = EmbedCoalescer(Client(httpserver.url_for('/')), max_wait=0.1)
+
+  def embed(text):
+    try:
+      return coalescer.embed('dummy', text)
+    except ResponseError as e:
+      return e
+
+  with ThreadPoolExecutor(2) as executor:
+    results = list(executor.map(embed, ['fail', 'a']))
+
+  assert all(isinstance(result, ResponseError) for result in results)
+
+
+def test_embed_coalescer_invalid():
+  with pytest.raises(ValueError):
+    EmbedCoalescer(Client(), max_batch=0)
+
+
+@pytest.mark.asyncio
+async def test_async_embed_coalescer(httpserver: HTTPServer):
+  handler = EmbedHandler()
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+
+  coalescer = AsyncEmbedCoalescer(AsyncClient(httpserver.url_for('/')), max_batch=4, max_wait=0.05)
+  texts = ['x' * i for i in range(1, 11)]
+  responses = await asyncio.gather(*(coalescer.embed('dummy', text) for text in texts))
+
+  assert responses == [{'model': 'dummy', 'embeddings': [[i]]} for i in range(1, 11)]
+  assert handler.inputs == [texts[:4], texts[4:8], texts[8:]]
+  assert (coalescer.calls, coalescer.batches) == (10, 3)
+
+
+@pytest.mark.asyncio
+async def test_async_embed_coalescer_cancel(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(EmbedHandler())
+
+  coalescer = AsyncEmbedCoalescer(AsyncClient(httpserver.url_for('/')), max_wait=0.05)
+  first = asyncio.ensure_future(coalescer.embed('dummy', 'a'))
+  second = asyncio.ensure_future(coalescer.embed('dummy', 'bb'))
+  await asyncio.sleep(0)
+  first.cancel()
+
+  assert await second == {'model': 'dummy', 'embeddings': [[2]]}
+
+
+@pytest.mark.asyncio
+async def test_async_embed_coalescer_error(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(EmbedHandler(fail=lambda inputs: 'fail' in inputs))
+
+  coalescer = AsyncEmbedCoalescer(AsyncClient(httpserver.url_for('/')))
+  results = await asyncio.gather(coalescer.embed('dummy', 'fail'), coalescer.embed('dummy', 'a'), return_exceptions=True)
+  assert all(isinstance(result, ResponseError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_async_embed_coalescer_error_cancelled(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(EmbedHandler(fail=lambda inputs: 'fail' in inputs))
+  errors = []
+  asyncio.get_running_loop().set_exception_handler(lambda _, context: errors.append(context))
+
+  coalescer = AsyncEmbedCoalescer(AsyncClient(httpserver.url_for('/')), max_batch=1)
+  call = asyncio.ensure_future(coalescer.embed('dummy', 'fail'))
+  await asyncio.sleep(0)
+  call.cancel()
+  assert coalescer._requests
+
+  while coalescer._requests:
+    await asyncio.sleep(0.01)
+
+  del call
+  gc.collect()
+  assert errors == []
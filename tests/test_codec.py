@@ -0,0 +1,70 @@
+import json
+import pytest
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import Client
+from ollama._codec import CODECS, JSONCodec, get_codec
+
+
+@pytest.fixture(params=list(CODECS))
+def codec(request) -> JSONCodec:
+  pytest.importorskip(request.param)
+  return get_codec(request.param)
+
+
+def test_codec_roundtrip(codec: JSONCodec):
+  obj = {'model': 'dummy', 'message': {'role': 'assistant', 'content': 'Why is the sky blue? 🌈'}, 'done': False, 'eval_count': 3}
+  data = codec.dumps(obj)
+  assert isinstance(data, bytes)
+  assert json.loads(data) == obj
+  assert codec.loads(data) == obj
+  assert codec.loads(data.decode('utf-8')) == obj
+
+
+def test_codec_stdlib_values(codec: JSONCodec):
+  np = pytest.importorskip('numpy')
+  for obj in [
+    {'options': {'temperature': np.float64(0.5)}},
+    {1: 'int key'},
+    {'seed': 2**64},
+    {'model': 'dummy', 'options': {'temperature': float('nan'), 'mirostat_tau': float('inf')}, 'keep_alive': None},
+  ]:
+    assert codec.dumps(obj).replace(b' ', b'') == json.dumps(obj).encode('utf-8').replace(b' ', b'')
+
+
+def test_codec_default():
+  codec = get_codec()
+  assert codec.name == next(name for name in CODECS if _installed(name))
+
+
+def test_codec_instance():
+  codec = JSONCodec()
+  assert get_codec(codec) is codec
+
+
+def _installed(name: str) -> bool:
+  try:
+    get_codec(name)
+  except ImportError:
+    return False
+  return True
+
+
+def test_client_codec(httpserver: HTTPServer, codec: JSONCodec):
+  def stream_handler(request: Request):
+    assert json.loads(request.get_data()) == {'model': 'dummy', 'messages': [{'role': 'user', 'content': 'Why is the sky blue?'}], 'tools': [], 'stream': True, 'format': '', 'options': {}, 'keep_alive': None}
+
+    def generate():
+      for message in ['Because ', 'it ', 'is.']:
+        yield json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': message}}) + '\n'
+
+    return Response(generate())
+
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(stream_handler)
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client(httpserver.url_for('/'), json_codec=codec)
+  response = client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True)
+  assert ''.join(part['message']['content'] for part in response) == 'Because it is.'
+  assert client.list() == {'models': []}
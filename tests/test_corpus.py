@@ -0,0 +1,79 @@
+import pytest
+from pytest_httpserver import HTTPServer
+
+from ollama._client import Client
+from ollama._corpus import EmbeddingFile
+from ollama._types import ResponseError
+
+from handlers import EmbedHandler
+
+
+def corpus_embedding(text):
+  return [int(text), -int(text), 0.5]
+
+
+def texts(n):
+  return (str(i) for i in range(n))
+
+
+def test_client_embed_corpus(threaded_httpserver: HTTPServer, tmp_path):
+  handler = EmbedHandler(corpus_embedding)
+  threaded_httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+
+  client = Client(threaded_httpserver.url_for('/'))
+  matrix = client.embed_corpus('dummy', texts(103), tmp_path / 'corpus.f32', batch_size=10, concurrency=4)
+
+  assert (matrix.model, matrix.dimensions, len(matrix)) == ('dummy', 3, 103)
+  assert len(handler.inputs) == 11
+  assert (tmp_path / 'corpus.f32').stat().st_size == 103 * 3 * 4
+  assert [matrix[i] for i in (0, 57, -1)] == [[0, 0, 0.5], [57, -57, 0.5], [102, -102, 0.5]]
+
+  with pytest.raises(IndexError):
+    matrix[103]
+
+  reopened = EmbeddingFile(tmp_path / 'corpus.f32')
+  assert (reopened.model, reopened.dimensions, reopened.rows) == ('dummy', 3, 103)
+
+
+def test_client_embed_corpus_resume(httpserver: HTTPServer, tmp_path):
+  handler = EmbedHandler(corpus_embedding, fail=lambda _: len(handler.inputs) >= 3)
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(handler)
+
+  client = Client(httpserver.url_for('/'))
+  with pytest.raises(ResponseError):
+    client.embed_corpus('dummy', texts(50), tmp_path / 'corpus.f32', batch_size=8, concurrency=1)
+
+  assert EmbeddingFile(tmp_path / 'corpus.f32').rows == 24
+
+  handler.fail = None
+  handler.inputs.clear()
+  matrix = client.embed_corpus('dummy', texts(50), tmp_path / 'corpus.f32', batch_size=8, concurrency=1)
+
+  assert handler.inputs[0] == [str(i) for i in range(24, 32)]
+  assert sum(len(batch) for batch in handler.inputs) == 26
+  assert len(matrix) == 50
+  assert [matrix[i][0] for i in range(50)] == list(range(50))
+
+  handler.inputs.clear()
+  client.embed_corpus('dummy', texts(50), tmp_path / 'corpus.f32', batch_size=8)
+  assert handler.inputs == []
+
+
+def test_client_embed_corpus_other_model(httpserver: HTTPServer, tmp_path):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(EmbedHandler(corpus_embedding))
+
+  client = Client(httpserver.url_for('/'))
+  client.embed_corpus('dummy', texts(4), tmp_path / 'corpus.f32')
+  with pytest.raises(ValueError):
+    client.embed_corpus('other', texts(4), tmp_path / 'corpus.f32')
+
+
+def test_embedding_file_memmap(httpserver: HTTPServer, tmp_path):
+  numpy = pytest.importorskip('numpy')
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(EmbedHandler(corpus_embedding))
+
+  matrix = Client(httpserver.url_for('/')).embed_corpus('dummy', texts(20), tmp_path / 'corpus.f32', batch_size=6)
+  array = matrix.memmap()
+  assert array.shape == (20, 3)
+  assert array.dtype == numpy.dtype('<f4')
+  assert array[7].tolist() == [7, -7, 0.5]
@@ -0,0 +1,73 @@
+import json
+import pytest
+from array import array
+from pytest_httpserver import HTTPServer
+
+from ollama._client import Client, AsyncClient
+from ollama._embedding import decode_embeddings
+
+EMBEDDINGS = [[0.25, -1.5, 3e-3], [1e10, 0, -2.0]]
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_decode_embeddings_array(indent):
+  content = json.dumps({'model': 'dummy', 'embeddings': EMBEDDINGS, 'total_duration': 12}, indent=indent).encode()
+  response = decode_embeddings(content, json.loads, 'embeddings', 'array')
+  assert response == {'model': 'dummy', 'embeddings': array('f', [value for embedding in EMBEDDINGS for value in embedding]), 'total_duration': 12}
+  assert response['embeddings'].itemsize == 4
+
+
+def test_decode_embeddings_empty():
+  assert decode_embeddings(b'{"embeddings": []}', json.loads, 'embeddings', 'array') == {'embeddings': array('f')}
+
+
+def test_decode_embeddings_list():
+  content = json.dumps({'embeddings': EMBEDDINGS}).encode()
+  assert decode_embeddings(content, json.loads, 'embeddings', 'list') == {'embeddings': EMBEDDINGS}
+
+
+def test_decode_embeddings_missing():
+  assert decode_embeddings(b'{"error": "failed"}', json.loads, 'embeddings', 'array') == {'error': 'failed'}
+
+
+def test_decode_embeddings_invalid_format():
+  with pytest.raises(ValueError):
+    decode_embeddings(b'{}', json.loads, 'embeddings', 'tuple')
+
+
+def test_decode_embedding_numpy():
+  numpy = pytest.importorskip('numpy')
+  content = json.dumps({'embeddings': EMBEDDINGS, 'model': 'dummy'}).encode()
+  response = decode_embeddings(content, json.loads, 'embeddings', 'numpy')
+  assert response['embeddings'].dtype == numpy.float32
+  assert response['embeddings'].shape == (2, 3)
+  numpy.testing.assert_allclose(response['embeddings'], numpy.array(EMBEDDINGS, dtype=numpy.float32))
+
+  response = decode_embeddings(json.dumps({'embedding': EMBEDDINGS[0]}).encode(), json.loads, 'embedding', 'numpy')
+  assert response['embedding'].shape == (3,)
+
+
+def test_client_embed_array(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_json({'model': 'dummy', 'embeddings': EMBEDDINGS})
+
+  client = Client(httpserver.url_for('/'))
+  response = client.embed('dummy', ['a', 'b'], embedding_format='array')
+  assert response['model'] == 'dummy'
+  assert response['embeddings'].tolist() == pytest.approx([value for embedding in EMBEDDINGS for value in embedding], rel=1e-6)
+
+
+def test_client_embeddings_array(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embeddings', method='POST').respond_with_json({'embedding': EMBEDDINGS[0]})
+
+  client = Client(httpserver.url_for('/'))
+  response = client.embeddings('dummy', 'a', embedding_format='array')
+  assert response['embedding'] == array('f', EMBEDDINGS[0])
+
+
+@pytest.mark.asyncio
+async def test_async_client_embed_array(httpserver: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_json({'model': 'dummy', 'embeddings': EMBEDDINGS})
+
+  client = AsyncClient(httpserver.url_for('/'))
+  response = await client.embed('dummy', ['a', 'b'], embedding_format='array')
+  assert len(response['embeddings']) == 6
@@ -0,0 +1,46 @@
+import sys
+import subprocess
+
+import pytest
+
+# generous enough for slow CI machines, but an eager httpx import alone blows through it
+IMPORT_BUDGET_US = 100_000
+
+
+def importtime(module: str) -> dict:
+  result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True, check=True)
+
+  times = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    _, cumulative, name = line[len('import time:') :].split('|')
+    times[name.strip()] = int(cumulative)
+  return times
+
+
+@pytest.mark.parametrize('module', ['ollama', 'ollama_aipm'])
+def test_import_time(module: str):
+  times = importtime(module)
+  assert 'httpx' not in times
+  assert times[module] < IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize('module', ['ollama', 'ollama_aipm'])
+def test_lazy_default_client(module: str):
+  code = f"""
+import sys, {module}
+assert 'httpx' not in sys.modules
+assert {module}.chat.__self__ is {module}.generate.__self__
+assert {module}.chat.__self__ is {module}._default
+assert isinstance({module}._default, {module}.Client)
+assert 'httpx' in sys.modules
+"""
+  subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_lazy_unknown_attribute():
+  import ollama
+
+  with pytest.raises(AttributeError):
+    ollama.does_not_exist  # noqa: B018
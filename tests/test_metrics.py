@@ -0,0 +1,160 @@
+import json
+import time
+import pytest
+from array import array
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import Client, AsyncClient
+from ollama._metrics import ServerStats, StreamLatency
+
+
+def test_stream_latency():
+  latency = StreamLatency()
+  latency.request_sent = 10.0
+  latency.headers_received = 10.1
+  latency.chunks = array('d', [10.5, 10.6, 10.7, 10.8, 11.5])
+
+  assert latency.time_to_headers == pytest.approx(0.1)
+  assert latency.ttft == pytest.approx(0.5)
+  assert latency.gap_p50 == pytest.approx(0.1)
+  assert latency.gap_p99 == pytest.approx(0.7)
+  assert latency.tokens_per_second == pytest.approx(4 / 1.0)
+  assert latency.summary()['chunks'] == 5
+
+
+def test_stream_latency_empty():
+  latency = StreamLatency()
+  assert latency.summary() == {'time_to_headers': None, 'ttft': None, 'gap_p50': None, 'gap_p99': None, 'tokens_per_second': None, 'chunks': 0}
+
+
+def slow_stream_handler(_: Request):
+  def generate():
+    time.sleep(0.1)
+    for message in ['Because ', 'it ', 'is.']:
+      yield json.dumps({'model': 'dummy', 'response': message, 'done': False}) + '\n'
+      time.sleep(0.05)
+    yield json.dumps({'model': 'dummy', 'response': '', 'done': True}) + '\n'
+
+  return Response(generate())
+
+
+def test_client_stream_latency(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(slow_stream_handler)
+
+  client = Client(httpserver.url_for('/'), stream_latency=True)
+  stream = client.generate('dummy', 'Why is the sky blue?', stream=True)
+  assert stream.collect()['response'] == 'Because it is.'
+
+  latency = stream.latency
+  assert len(latency.chunks) == 4
+  assert latency.time_to_headers < latency.ttft
+  assert latency.ttft >= 0.1
+  assert 0.04 <= latency.gap_p50 < 0.2
+  assert latency.tokens_per_second < 25
+
+
+def test_client_stream_latency_disabled(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(slow_stream_handler)
+
+  client = Client(httpserver.url_for('/'))
+  stream = client.generate('dummy', 'Why is the sky blue?', stream=True)
+  stream.collect()
+  assert stream.latency is None
+
+
+@pytest.mark.asyncio
+async def test_async_client_stream_latency(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(slow_stream_handler)
+
+  client = AsyncClient(httpserver.url_for('/'), stream_latency=True)
+  stream = await client.generate('dummy', 'Why is the sky blue?', stream=True)
+  await stream.collect()
+
+  latency = stream.latency
+  assert len(latency.chunks) == 4
+  assert latency.ttft >= 0.1
+  assert latency.gap_p50 >= 0.04
+
+
+def final_response(model: str, load: float):
+  return {
+    'model': model,
+    'response': '',
+    'done': True,
+    'total_duration': int(2e9),
+    'load_duration': int(load * 1e9),
+    'prompt_eval_count': 100,
+    'prompt_eval_duration': int(0.1e9),
+    'eval_count': 50,
+    'eval_duration': int(1e9),
+  }
+
+
+def test_model_stats():
+  stats = ServerStats(cold_load=0.5)
+  stats._record('http://a', final_response('llama3.1', 3))
+  stats._record('http://a', final_response('llama3.1', 0.01))
+  stats._record('http://b', final_response('llama3.1', 0.01))
+  stats._record('http://b', final_response('mistral', 0.01))
+  stats._record('http://b', {'status': 'success'})
+
+  assert sorted(stats.keys()) == [('llama3.1', 'http://a'), ('llama3.1', 'http://b'), ('mistral', 'http://b')]
+
+  a = stats.get('llama3.1', 'http://a')
+  assert (a.requests, a.cold_loads, a.cold_load_rate) == (2, 1, 0.5)
+  assert a.percentile('prompt_tokens_per_second', 50) == pytest.approx(1000)
+  assert a.percentile('eval_tokens_per_second', 50) == pytest.approx(50)
+  assert a.percentile('load_seconds', 99) == pytest.approx(3)
+  assert (a.prompt_tokens, a.eval_tokens) == (200, 100)
+
+  assert stats.get('llama3.1').requests == 3
+  assert stats.get(host='http://b').requests == 2
+  assert stats.get().requests == 4
+  assert stats.get('phi3').requests == 0
+
+  summary = stats.summary()[('llama3.1', 'http://a')]
+  assert summary['requests'] == 2
+  assert summary['eval_tokens_per_second']['p50'] == pytest.approx(50)
+
+
+def test_model_stats_window():
+  stats = ServerStats(window=2)
+  for load in (1, 2, 3):
+    stats._record('http://a', final_response('llama3.1', load))
+
+  a = stats.get('llama3.1', 'http://a')
+  assert a.requests == 3
+  assert a.samples('load_seconds') == [2, 3]
+
+
+def test_client_stats(httpserver: HTTPServer, httpserver2: HTTPServer):
+  def stream_handler(_: Request):
+    return Response(json.dumps({'model': 'dummy', 'response': 'Because it is.', 'done': False}) + '\n' + json.dumps(final_response('dummy', 3)) + '\n')
+
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+    server.expect_request('/api/chat', method='POST').respond_with_json({**final_response('dummy', 0), 'message': {'role': 'assistant', 'content': ''}})
+
+  stats = ServerStats()
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], stats=stats)
+  for _ in range(2):
+    client.generate('dummy', 'Why is the sky blue?', stream=True).collect()
+    client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}])
+
+  hosts = {host for _, host in stats.keys()}
+  assert hosts == {httpserver.url_for('/').rstrip('/'), httpserver2.url_for('/').rstrip('/')}
+
+  merged = stats.get('dummy')
+  assert merged.requests == 4
+  assert merged.cold_loads == 2
+
+
+@pytest.mark.asyncio
+async def test_async_client_stats(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_json(final_response('dummy', 0))
+
+  stats = ServerStats()
+  client = AsyncClient(httpserver.url_for('/'), stats=stats)
+  await client.generate('dummy', 'Why is the sky blue?')
+  assert stats.get('dummy', httpserver.url_for('/').rstrip('/')).requests == 1
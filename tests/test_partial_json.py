@@ -0,0 +1,97 @@
+import json
+import pytest
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import Client, AsyncClient
+from ollama._partial_json import IncrementalJSONParser
+
+DOCUMENTS = [
+  {'title': 'Why is the sky blue?', 'escaped': 'a "quoted" \\ path } ]', 'tags': ['physics', {'nested': [1, 2]}], 'score': -1.5e3, 'ok': True, 'none': None, 'empty': {}, 'unicode': 'é 🌈'},
+  [1, 'two', [3], {'four': 4}, None, False, 2.5],
+  {},
+  [],
+]
+
+
+def parse(text: str, size: int):
+  parser = IncrementalJSONParser()
+  items = []
+  for i in range(0, len(text), size):
+    items.extend(parser.feed(text[i : i + size]))
+  items.extend(parser.close())
+  return items
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 1000])
+def test_incremental_json(document, indent, size):
+  items = parse(json.dumps(document, indent=indent, ensure_ascii=False), size)
+  if isinstance(document, dict):
+    assert items == list(document.items())
+  else:
+    assert items == list(enumerate(document))
+
+
+@pytest.mark.parametrize('scalar', ['42', ' "a{b" ', 'null'])
+def test_incremental_json_scalar(scalar):
+  assert parse(scalar, 1) == [(None, json.loads(scalar))]
+
+
+def test_incremental_json_early():
+  parser = IncrementalJSONParser()
+  assert parser.feed('{"a": "b"') == [('a', 'b')]
+  assert parser.feed(', "c": [1, 2]') == [('c', [1, 2])]
+  assert parser.feed(', "d": 1') == []
+  assert parser.feed('}') == [('d', 1)]
+  assert parser.feed('trailing') == []
+
+
+def test_incremental_json_trailing_text():
+  parser = IncrementalJSONParser()
+  assert parser.feed('{"a": 1') == []
+  assert parser.feed('}\nNote: {"b": 2}') == [('a', 1)]
+  assert parser.done
+  assert parser.close() == []
+
+  parser = IncrementalJSONParser()
+  assert parser.feed('{"a":1} {"b":2}') == [('a', 1)]
+  assert parser.feed('[3]') == []
+  assert parser.done
+
+
+FRAGMENTS = ['{"ti', 'tle": "Why', ' the sky is blue"', ', "reasons": ["ray', 'leigh", "scattering"]', ', "confidence": 0.', '9}']
+
+
+def json_handler(_: Request):
+  def generate():
+    for fragment in FRAGMENTS:
+      yield json.dumps({'model': 'dummy', 'response': fragment, 'done': False}) + '\n'
+    yield json.dumps({'model': 'dummy', 'response': '', 'done': True}) + '\n'
+
+  return Response(generate())
+
+
+def test_client_iter_json(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(json_handler)
+
+  client = Client(httpserver.url_for('/'))
+  stream = client.generate('dummy', 'Why is the sky blue?', format='json', stream=True)
+
+  items = []
+  for key, value in stream.iter_json():
+    items.append((key, value, len(stream._accumulator._text)))
+
+  assert items == [('title', 'Why the sky is blue', 3), ('reasons', ['rayleigh', 'scattering'], 5), ('confidence', 0.9, 7)]
+  assert json.loads(stream.collect()['response']) == {'title': 'Why the sky is blue', 'reasons': ['rayleigh', 'scattering'], 'confidence': 0.9}
+
+
+@pytest.mark.asyncio
+async def test_async_client_iter_json(httpserver: HTTPServer):
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(json_handler)
+
+  client = AsyncClient(httpserver.url_for('/'))
+  stream = await client.generate('dummy', 'Why is the sky blue?', format='json', stream=True)
+  items = [item async for item in stream.iter_json()]
+  assert dict(items) == {'title': 'Why the sky is blue', 'reasons': ['rayleigh', 'scattering'], 'confidence': 0.9}
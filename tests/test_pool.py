@@ -0,0 +1,290 @@
+import json
+import time
+import asyncio
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import Client, AsyncClient
+from ollama._pool import HedgePolicy, CircuitBreaker
+from ollama._types import ResponseError
+
+
+def stream_handler(_: Request):
+  def generate():
+    for message in ['Because ', 'it ', 'is.']:
+      yield json.dumps({'model': 'dummy', 'response': message}) + '\n'
+
+  return Response(generate())
+
+
+def test_client_pool_round_robin(httpserver: HTTPServer, httpserver2: HTTPServer):
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')])
+  for _ in range(4):
+    client.list()
+
+  assert len(httpserver.log) == 2
+  assert len(httpserver2.log) == 2
+
+
+def test_client_pool_least_outstanding(httpserver: HTTPServer, httpserver2: HTTPServer):
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+    server.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')])
+
+  stream = client.generate('dummy', 'Why is the sky blue?', stream=True)
+  next(stream)
+  busy, idle = (httpserver, httpserver2) if httpserver.log else (httpserver2, httpserver)
+
+  for _ in range(3):
+    client.list()
+
+  assert len(busy.log) == 1
+  assert len(idle.log) == 3
+
+  stream.close()
+  client.list()
+  client.list()
+  assert len(busy.log) == 2
+  assert len(idle.log) == 4
+
+
+def test_client_pool_weights(httpserver: HTTPServer, httpserver2: HTTPServer):
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+
+  client = Client({httpserver.url_for('/'): 3, httpserver2.url_for('/'): 1})
+
+  streams = [client.generate('dummy', 'Why is the sky blue?', stream=True) for _ in range(2)]
+  for stream in streams:
+    next(stream)
+
+  assert len(httpserver.log) == 2
+  assert len(httpserver2.log) == 0
+
+
+def test_client_pool_invalid_weight(httpserver: HTTPServer, httpserver2: HTTPServer):
+  with pytest.raises(ValueError):
+    Client({httpserver.url_for('/'): 1, httpserver2.url_for('/'): 0})
+
+
+@pytest.mark.asyncio
+async def test_async_client_pool_least_outstanding(httpserver: HTTPServer, httpserver2: HTTPServer):
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/generate', method='POST').respond_with_handler(stream_handler)
+    server.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = AsyncClient([httpserver.url_for('/'), httpserver2.url_for('/')])
+
+  stream = await client.generate('dummy', 'Why is the sky blue?', stream=True)
+  await stream.__anext__()
+  busy, idle = (httpserver, httpserver2) if httpserver.log else (httpserver2, httpserver)
+
+  for _ in range(3):
+    await client.list()
+
+  assert len(busy.log) == 1
+  assert len(idle.log) == 3
+
+  await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_async_client_pool_http2(httpserver: HTTPServer, httpserver2: HTTPServer):
+  pytest.importorskip('h2')
+  client = AsyncClient([httpserver.url_for('/'), httpserver2.url_for('/')], http2=True)
+  assert all(host.transport._pool._http2 for host in client._client._transport.hosts)
+
+
+def slow_handler(_: Request):
+  time.sleep(0.5)
+  return Response(json.dumps({'embeddings': [[0.0]]}), content_type='application/json')
+
+
+def wait_idle(client, timeout: float = 2):
+  deadline = time.monotonic() + timeout
+  while any(host.inflight for host in client._pool.hosts) and time.monotonic() < deadline:
+    time.sleep(0.01)
+  return [host.inflight for host in client._pool.hosts]
+
+
+def test_client_pool_hedge(httpserver: HTTPServer, httpserver2: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(slow_handler)
+  httpserver2.expect_request('/api/embed', method='POST').respond_with_json({'embeddings': [[1.0]]})
+
+  hedge = HedgePolicy(delay=0.05)
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], hedge=hedge)
+
+  start = time.monotonic()
+  response = client.embed('dummy', 'Why is the sky blue?')
+  assert time.monotonic() - start < 0.4
+  assert response == {'embeddings': [[1.0]]}
+
+  assert (hedge.requests, hedge.hedged, hedge.wins) == (1, 1, 1)
+  assert hedge.hedge_rate == 1.0
+  assert wait_idle(client) == [0, 0]
+
+
+def test_client_pool_hedge_not_needed(httpserver: HTTPServer, httpserver2: HTTPServer):
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/embed', method='POST').respond_with_json({'embeddings': [[1.0]]})
+
+  hedge = HedgePolicy(delay=1)
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], hedge=hedge)
+  for _ in range(4):
+    client.embed('dummy', 'Why is the sky blue?')
+
+  assert (hedge.requests, hedge.hedged, hedge.wins) == (4, 0, 0)
+  assert len(httpserver.log) == len(httpserver2.log) == 2
+
+
+def test_client_pool_hedge_queued(httpserver: HTTPServer, httpserver2: HTTPServer):
+  for server in (httpserver, httpserver2):
+    server.expect_request('/api/embed', method='POST').respond_with_json({'embeddings': [[1.0]]})
+
+  hedge = HedgePolicy(delay=0.1)
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], hedge=hedge)
+  transport = client._pool
+  transport._executor = ThreadPoolExecutor(max_workers=1)
+  # the attempt waits for the only worker for longer than the hedge delay
+  transport._executor.submit(time.sleep, 0.3)
+  client.embed('dummy', 'Why is the sky blue?')
+
+  assert (hedge.requests, hedge.hedged) == (1, 0)
+  assert len(httpserver.log) + len(httpserver2.log) == 1
+
+
+def test_client_pool_hedge_not_idempotent(httpserver: HTTPServer, httpserver2: HTTPServer):
+  httpserver.expect_request('/api/pull', method='POST').respond_with_handler(slow_handler)
+
+  hedge = HedgePolicy(delay=0.05)
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], hedge=hedge)
+  client.pull('dummy')
+
+  assert hedge.requests == 0
+  assert len(httpserver2.log) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_pool_hedge(httpserver: HTTPServer, httpserver2: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(slow_handler)
+  httpserver2.expect_request('/api/embed', method='POST').respond_with_json({'embeddings': [[1.0]]})
+
+  hedge = HedgePolicy(delay=0.05)
+  client = AsyncClient([httpserver.url_for('/'), httpserver2.url_for('/')], hedge=hedge)
+
+  start = time.monotonic()
+  response = await client.embed('dummy', 'Why is the sky blue?')
+  assert time.monotonic() - start < 0.4
+  assert response == {'embeddings': [[1.0]]}
+
+  assert (hedge.requests, hedge.hedged, hedge.wins) == (1, 1, 1)
+  for _ in range(100):
+    if not any(host.inflight for host in client._pool.hosts):
+      break
+    await asyncio.sleep(0.01)
+
+  assert [host.inflight for host in client._pool.hosts] == [0, 0]
+
+
+def test_client_circuit_breaker(httpserver: HTTPServer):
+  httpserver.expect_request('/api/tags', method='GET').respond_with_response(Response(status=500))
+
+  client = Client(httpserver.url_for('/'), circuit_breaker=CircuitBreaker(failures=2, reset_timeout=60))
+  for _ in range(2):
+    with pytest.raises(ResponseError) as e:
+      client.list()
+    assert e.value.status_code == 500
+
+  with pytest.raises(ResponseError) as e:
+    client.list()
+
+  assert e.value.status_code == 503
+  assert len(httpserver.log) == 2
+
+
+def test_client_circuit_breaker_failover(httpserver: HTTPServer, httpserver2: HTTPServer):
+  httpserver.expect_request('/api/tags', method='GET').respond_with_response(Response(status=500))
+  httpserver2.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], circuit_breaker=CircuitBreaker(failures=1, reset_timeout=60))
+  with pytest.raises(ResponseError):
+    client.list()
+
+  for _ in range(4):
+    assert client.list() == {'models': []}
+
+  assert len(httpserver.log) == 1
+  assert len(httpserver2.log) == 4
+
+
+def test_client_circuit_breaker_probe(httpserver: HTTPServer):
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_response(Response(status=500))
+  httpserver.expect_ordered_request('/api/ps', method='GET').respond_with_json({'models': []})
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client(httpserver.url_for('/'), circuit_breaker=CircuitBreaker(failures=1, reset_timeout=0.05))
+  with pytest.raises(ResponseError):
+    client.list()
+
+  time.sleep(0.1)
+  with pytest.raises(ResponseError) as e:
+    client.list()
+  assert e.value.status_code == 503
+
+  host = client._pool.hosts[0]
+  deadline = time.monotonic() + 2
+  while host.open_until and time.monotonic() < deadline:
+    time.sleep(0.01)
+
+  assert client.list() == {'models': []}
+  assert [request.path for request, _ in httpserver.log] == ['/api/tags', '/api/ps', '/api/tags']
+
+
+def test_client_circuit_breaker_latency(httpserver: HTTPServer, httpserver2: HTTPServer):
+  httpserver.expect_request('/api/embed', method='POST').respond_with_handler(slow_handler)
+  httpserver2.expect_request('/api/embed', method='POST').respond_with_json({'embeddings': [[1.0]]})
+
+  client = Client([httpserver.url_for('/'), httpserver2.url_for('/')], circuit_breaker=CircuitBreaker(latency=0.1, reset_timeout=60))
+  stuck = threading.Thread(target=client.embed, args=('dummy', 'Why is the sky blue?'))
+  stuck.start()
+  time.sleep(0.2)
+
+  for _ in range(4):
+    assert client.embed('dummy', 'Why is the sky blue?') == {'embeddings': [[1.0]]}
+
+  stuck.join()
+  assert len(httpserver.log) == 1
+  assert len(httpserver2.log) == 4
+  assert client._pool.hosts[0].open_until
+
+
+@pytest.mark.asyncio
+async def test_async_client_circuit_breaker_probe(httpserver: HTTPServer):
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_response(Response(status=500))
+  httpserver.expect_ordered_request('/api/ps', method='GET').respond_with_json({'models': []})
+  httpserver.expect_ordered_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = AsyncClient(httpserver.url_for('/'), circuit_breaker=CircuitBreaker(failures=1, reset_timeout=0.05))
+  with pytest.raises(ResponseError):
+    await client.list()
+
+  await asyncio.sleep(0.1)
+  with pytest.raises(ResponseError) as e:
+    await client.list()
+  assert e.value.status_code == 503
+
+  host = client._pool.hosts[0]
+  for _ in range(200):
+    if not host.open_until:
+      break
+    await asyncio.sleep(0.01)
+
+  assert await client.list() == {'models': []}
@@ -0,0 +1,89 @@
+import pickle
+import pytest
+from pytest_httpserver import HTTPServer
+
+from ollama._client import Client, AsyncClient
+from ollama._response import CompactChatResponse, CompactGenerateResponse, CompactMessage
+
+from handlers import chat_handler
+
+
+def test_compact_response_mapping():
+  data = {'model': 'dummy', 'created_at': 'now', 'response': 'Because ', 'done': False}
+  response = CompactGenerateResponse(data)
+
+  assert response == data
+  assert dict(response) == data
+  assert len(response) == 4
+  assert response['response'] == response.response == 'Because '
+  assert response.get('eval_count') is None
+  assert 'eval_count' not in response
+  assert 'response' in response
+
+  with pytest.raises(KeyError):
+    response['eval_count']
+
+  with pytest.raises(AttributeError):
+    response.eval_count  # noqa: B018
+
+
+def test_compact_response_nested():
+  data = {'model': 'dummy', 'message': {'role': 'assistant', 'content': 'Because '}, 'done': False}
+  response = CompactChatResponse(data)
+
+  assert isinstance(response['message'], CompactMessage)
+  assert response.message.content == 'Because '
+  assert response == data
+
+
+def test_compact_response_extra():
+  data = {'model': 'dummy', 'response': '', 'done': True, 'new_field': [1, 2]}
+  response = CompactGenerateResponse(data)
+
+  assert response == data
+  assert response['new_field'] == response.new_field == [1, 2]
+
+
+def test_compact_response_read_only():
+  response = CompactGenerateResponse({'model': 'dummy'})
+  with pytest.raises(AttributeError):
+    response.model = 'other'
+
+
+def test_compact_response_pickle():
+  response = CompactChatResponse({'model': 'dummy', 'message': {'role': 'assistant', 'content': 'Because '}, 'extra': 1})
+  assert pickle.loads(pickle.dumps(response)) == response
+
+
+def test_client_compact_responses(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(chat_handler)
+  httpserver.expect_request('/api/generate', method='POST').respond_with_json({'model': 'dummy', 'response': 'Because it is.', 'done': True})
+
+  client = Client(httpserver.url_for('/'), compact_responses=True)
+  parts = list(client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True))
+  assert all(isinstance(part, CompactChatResponse) for part in parts)
+  assert ''.join(part.message.content for part in parts) == 'Because it is.'
+  assert parts[-1]['eval_count'] == 3
+
+  response = client.generate('dummy', 'Why is the sky blue?')
+  assert isinstance(response, CompactGenerateResponse)
+  assert response == {'model': 'dummy', 'response': 'Because it is.', 'done': True}
+
+
+def test_client_compact_responses_default(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(chat_handler)
+
+  client = Client(httpserver.url_for('/'))
+  parts = list(client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True))
+  assert all(type(part) is dict for part in parts)
+
+
+@pytest.mark.asyncio
+async def test_async_client_compact_responses(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(chat_handler)
+
+  client = AsyncClient(httpserver.url_for('/'), compact_responses=True)
+  response = await client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True)
+  parts = [part async for part in response]
+  assert all(isinstance(part, CompactChatResponse) for part in parts)
+  assert ''.join(part.message.content for part in parts) == 'Because it is.'
@@ -0,0 +1,131 @@
+import json
+import asyncio
+import pytest
+import threading
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import Client, AsyncClient
+from ollama._stop import StopOnRegex, StopOnLength, StopOnJSON, StopUnless, _checkers
+
+from handlers import endless_handler
+
+
+def run(checker, fragments):
+  for i, fragment in enumerate(fragments):
+    if checker(fragment, {'response': fragment}):
+      return i
+
+
+def test_stop_on_regex():
+  assert run(StopOnRegex(r'\bEND\b').checker(), ['Count ', 'E', 'N', 'D', ' now']) == 3
+  assert run(StopOnRegex('END').checker(), ['Count ', 'to ', 'ten']) is None
+
+
+def test_stop_on_regex_overlap():
+  assert run(StopOnRegex('ab', overlap=1).checker(), ['a', 'b']) == 1
+  assert run(StopOnRegex('abc', overlap=1).checker(), ['a', 'b', 'c']) is None
+
+
+def test_stop_on_length():
+  assert run(StopOnLength(6).checker(), ['abc', 'de', 'f', 'g']) == 2
+
+
+def test_stop_on_json():
+  assert run(StopOnJSON().checker(), ['{"a": "}', '", "b": [1', ']}', ' and more']) == 2
+  assert run(StopOnJSON().checker(), ['{"a": 1', '}\n\nHope this helps', ' more']) == 1
+  assert run(StopOnJSON().checker(), ['"a scalar"', ' is not']) is None
+
+
+def test_stop_unless():
+  assert run(StopUnless(lambda part: 'stop' not in part['response']).checker(), ['go', 'go', 'stop']) == 2
+
+
+def test_stop_condition_shared():
+  condition = StopOnLength(3)
+  first, second = condition.checker(), condition.checker()
+  assert not first('ab', {})
+  assert not second('ab', {})
+  assert first('c', {})
+
+
+def test_stop_checkers_callable():
+  (checker,) = _checkers([lambda part: part['response'] != 'x'])
+  assert not checker('a', {'response': 'a'})
+  assert checker('x', {'response': 'x'})
+
+
+def test_client_stop_conditions_stream(httpserver: HTTPServer):
+  stopped = threading.Event()
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(endless_handler(stopped))
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client(httpserver.url_for('/'), max_connections=1, timeout=2)
+  stream = client.generate('dummy', 'Count.', stream=True, stop_conditions=[StopOnRegex(r'\b3 ')])
+  assert [part['response'] for part in stream] == ['0 ', '1 ', '2 ', '3 ']
+  assert stream.stopped
+  assert stopped.wait(2)
+
+  response = stream.collect()
+  assert response['response'] == '0 1 2 3 '
+  assert response['done_reason'] == 'client_stop'
+  assert client.list() == {'models': []}
+
+
+def test_client_stop_conditions(httpserver: HTTPServer):
+  stopped = threading.Event()
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(endless_handler(stopped))
+
+  client = Client(httpserver.url_for('/'), timeout=2)
+  response = client.generate('dummy', 'Count.', stop_conditions=[StopOnLength(6)])
+  assert response['response'] == '0 1 2 '
+  assert response['done'] is True
+  assert response['done_reason'] == 'client_stop'
+  assert stopped.wait(2)
+
+  request, _ = httpserver.log[0]
+  assert json.loads(request.data)['stream'] is True
+
+
+def test_client_chat_stop_conditions_callable(httpserver: HTTPServer):
+  def handler(_: Request):
+    def generate():
+      for message in ['Because ', 'it ', 'is.']:
+        yield json.dumps({'model': 'dummy', 'message': {'role': 'assistant', 'content': message}, 'done': False}) + '\n'
+
+    return Response(generate())
+
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(handler)
+
+  client = Client(httpserver.url_for('/'))
+  response = client.chat('dummy', messages=[{'role': 'user', 'content': 'Why?'}], stop_conditions=[lambda part: part['message']['content'] != 'it '])
+  assert response['message'] == {'role': 'assistant', 'content': 'Because it '}
+  assert response['done_reason'] == 'client_stop'
+
+
+def test_client_stop_conditions_not_matched(httpserver: HTTPServer):
+  parts = [{'model': 'dummy', 'response': 'Because ', 'done': False}, {'model': 'dummy', 'response': 'it is.', 'done': True, 'done_reason': 'stop'}]
+  httpserver.expect_request('/api/generate', method='POST').respond_with_data(''.join(json.dumps(part) + '\n' for part in parts))
+
+  client = Client(httpserver.url_for('/'))
+  response = client.generate('dummy', 'Why?', stop_conditions=[StopOnRegex('never')])
+  assert response['response'] == 'Because it is.'
+  assert response['done_reason'] == 'stop'
+
+
+@pytest.mark.asyncio
+async def test_async_client_stop_conditions(httpserver: HTTPServer):
+  stopped = threading.Event()
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(endless_handler(stopped))
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = AsyncClient(httpserver.url_for('/'), max_connections=1, timeout=2)
+  response = await client.generate('dummy', 'Count.', stop_conditions=[StopOnRegex('2 ')])
+  assert response['response'] == '0 1 2 '
+  assert response['done_reason'] == 'client_stop'
+  assert await asyncio.get_running_loop().run_in_executor(None, stopped.wait, 2)
+  assert await client.list() == {'models': []}
+
+  stream = await client.generate('dummy', 'Count.', stream=True, stop_conditions=[StopOnLength(4)])
+  assert [part['response'] async for part in stream] == ['0 ', '1 ']
+  assert stream.stopped
@@ -0,0 +1,190 @@
+import json
+import asyncio
+import pytest
+import threading
+from pytest_httpserver import HTTPServer
+from werkzeug.wrappers import Request, Response
+
+from ollama._client import Client, AsyncClient
+from ollama._codec import CODECS, get_codec
+from ollama._response import CompactChatResponse
+from ollama._stream import NDJSONDecoder, Stream, AsyncStream, StreamAccumulator
+from ollama._types import ResponseError
+
+from handlers import chat_handler, endless_handler
+
+PARTS = [{'model': 'dummy', 'response': message, 'done': False} for message in ['Because ', 'it ', 'is ', '🌈.']] + [{'model': 'dummy', 'response': '', 'done': True}]
+DATA = b''.join(json.dumps(part, ensure_ascii=False).encode('utf-8') + b'\n' for part in PARTS)
+
+
+@pytest.fixture(params=list(CODECS))
+def decoder(request) -> NDJSONDecoder:
+  pytest.importorskip(request.param)
+  return NDJSONDecoder(get_codec(request.param).loads)
+
+
+def decode(decoder: NDJSONDecoder, chunks):
+  parts = []
+  for chunk in chunks:
+    parts.extend(decoder.decode(chunk))
+  parts.extend(decoder.flush())
+  return parts
+
+
+@pytest.mark.parametrize('size', [1, 7, 64, len(DATA)])
+def test_decoder_chunks(decoder: NDJSONDecoder, size: int):
+  chunks = [DATA[i : i + size] for i in range(0, len(DATA), size)]
+  assert decode(decoder, chunks) == PARTS
+
+
+def test_decoder_no_trailing_newline(decoder: NDJSONDecoder):
+  assert decode(decoder, [DATA.rstrip(b'\n')]) == PARTS
+
+
+def test_decoder_blank_lines(decoder: NDJSONDecoder):
+  assert decode(decoder, [DATA.replace(b'\n', b'\r\n\n')]) == PARTS
+
+
+def test_decoder_error(decoder: NDJSONDecoder):
+  data = b'{"response": "Because "}\n{"response": "it "}\n{"error": "out of memory"}\n{"response": "is."}\n'
+  parts = []
+  with pytest.raises(ResponseError) as e:
+    for part in decoder.decode(data):
+      parts.append(part)
+
+  assert e.value.error == 'out of memory'
+  assert parts == [{'response': 'Because '}, {'response': 'it '}]
+
+
+def test_decoder_error_across_chunks(decoder: NDJSONDecoder):
+  with pytest.raises(ResponseError):
+    decode(decoder, [b'{"response": "Because "}\n{"err', b'or": "out of memory"}\n'])
+
+
+def test_decoder_error_key_in_content(decoder: NDJSONDecoder):
+  data = b'{"response": "\\"error\\""}\n'
+  assert decode(decoder, [data]) == [{'response': '"error"'}]
+
+
+def test_accumulator_chat():
+  accumulator = StreamAccumulator()
+  parts = [
+    {'model': 'dummy', 'message': {'role': 'assistant', 'content': 'Because '}, 'done': False},
+    {'model': 'dummy', 'message': {'role': 'assistant', 'content': '', 'tool_calls': [{'function': {'name': 'a', 'arguments': {}}}]}, 'done': False},
+    {'model': 'dummy', 'message': {'role': 'assistant', 'content': 'it is.', 'tool_calls': [{'function': {'name': 'b', 'arguments': {}}}]}, 'done': False},
+    {'model': 'dummy', 'message': {'role': 'assistant', 'content': ''}, 'done': True, 'done_reason': 'stop', 'eval_count': 3},
+  ]
+  for part in parts:
+    accumulator.add(part)
+
+  assert accumulator.result() == {
+    'model': 'dummy',
+    'message': {
+      'role': 'assistant',
+      'content': 'Because it is.',
+      'tool_calls': [{'function': {'name': 'a', 'arguments': {}}}, {'function': {'name': 'b', 'arguments': {}}}],
+    },
+    'done': True,
+    'done_reason': 'stop',
+    'eval_count': 3,
+  }
+  assert parts[-1]['message'] == {'role': 'assistant', 'content': ''}
+
+
+def test_accumulator_empty():
+  assert StreamAccumulator().result() == {}
+
+
+CHAT_RESPONSE = {'model': 'dummy', 'message': {'role': 'assistant', 'content': 'Because it is.'}, 'done': True, 'eval_count': 3}
+
+
+def test_client_stream_collect(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(chat_handler)
+
+  client = Client(httpserver.url_for('/'))
+  stream = client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True)
+  assert isinstance(stream, Stream)
+  assert next(stream)['message']['content'] == 'Because '
+  assert stream.collect() == CHAT_RESPONSE
+
+
+def test_client_stream_collect_generate(httpserver: HTTPServer):
+  def generate_handler(_: Request):
+    return Response(''.join(json.dumps({'model': 'dummy', 'response': message, 'done': not message}) + '\n' for message in ['Because ', 'it is.', '']))
+
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(generate_handler)
+
+  client = Client(httpserver.url_for('/'))
+  with client.generate('dummy', 'Why is the sky blue?', stream=True) as stream:
+    assert stream.collect() == {'model': 'dummy', 'response': 'Because it is.', 'done': True}
+
+
+def test_client_stream_collect_compact(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(chat_handler)
+
+  client = Client(httpserver.url_for('/'), compact_responses=True)
+  response = client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True).collect()
+  assert isinstance(response, CompactChatResponse)
+  assert response.message.content == 'Because it is.'
+  assert response == CHAT_RESPONSE
+
+
+@pytest.mark.asyncio
+async def test_async_client_stream_collect(httpserver: HTTPServer):
+  httpserver.expect_request('/api/chat', method='POST').respond_with_handler(chat_handler)
+
+  client = AsyncClient(httpserver.url_for('/'))
+  stream = await client.chat('dummy', messages=[{'role': 'user', 'content': 'Why is the sky blue?'}], stream=True)
+  assert isinstance(stream, AsyncStream)
+  assert (await stream.__anext__())['message']['content'] == 'Because '
+  assert await stream.collect() == CHAT_RESPONSE
+
+
+def test_client_stream_cancel(httpserver: HTTPServer):
+  stopped = threading.Event()
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(endless_handler(stopped))
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client(httpserver.url_for('/'), max_connections=1, timeout=2)
+  stream = client.generate('dummy', 'Why is the sky blue?', stream=True)
+  for part in stream:
+    if part['response'] == '2 ':
+      break
+
+  stream.cancel()
+  assert stopped.wait(2)
+  assert list(stream) == []
+
+  pool = client._client._transport._pool
+  assert all(connection.is_idle() for connection in pool.connections)
+  assert client.list() == {'models': []}
+
+
+def test_client_stream_context_manager(httpserver: HTTPServer):
+  stopped = threading.Event()
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(endless_handler(stopped))
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = Client(httpserver.url_for('/'), max_connections=1, timeout=2)
+  with client.generate('dummy', 'Why is the sky blue?', stream=True) as stream:
+    next(stream)
+
+  assert stopped.wait(2)
+  assert client.list() == {'models': []}
+
+
+@pytest.mark.asyncio
+async def test_async_client_stream_cancel(httpserver: HTTPServer):
+  stopped = threading.Event()
+  httpserver.expect_request('/api/generate', method='POST').respond_with_handler(endless_handler(stopped))
+  httpserver.expect_request('/api/tags', method='GET').respond_with_json({'models': []})
+
+  client = AsyncClient(httpserver.url_for('/'), max_connections=1, timeout=2)
+  stream = await client.generate('dummy', 'Why is the sky blue?', stream=True)
+  async for _ in stream:
+    break
+
+  await stream.cancel()
+  assert await asyncio.get_running_loop().run_in_executor(None, stopped.wait, 2)
+  assert [part async for part in stream] == []
+  assert await client.list() == {'models': []}